@@ -13,6 +13,14 @@ class SimulationCreateSerializer(serializers.Serializer):
     var_aggressive = serializers.FloatField(default=0.1)
     mean_laziness = serializers.FloatField(default=0.5)
     var_laziness = serializers.FloatField(default=0.05)
+    graph_generator = serializers.ChoiceField(
+        choices=["legacy", "fast"], default="legacy"
+    )
+    friendgroup_mode = serializers.ChoiceField(
+        choices=["auto", "exact", "greedy", "components"], default="auto"
+    )
+    convergence_window = serializers.IntegerField(default=0)
+    convergence_threshold = serializers.FloatField(default=0.001)
 
     def validate_iterations(self, value):
         if not 1 <= value <= 10000:
@@ -20,6 +28,18 @@ class SimulationCreateSerializer(serializers.Serializer):
 
         return value
 
+    def validate_convergence_window(self, value):
+        if not 0 <= value <= 10000:
+            raise serializers.ValidationError("Must be between 0 and 10000")
+
+        return value
+
+    def validate_convergence_threshold(self, value):
+        if not 0 <= value <= 1:
+            raise serializers.ValidationError("Must be between 0 and 1")
+
+        return value
+
     def validate_cat_amount(self, value):
         if not 2 <= value <= 200:
             raise serializers.ValidationError("Must be between 2 and 200")
@@ -27,8 +47,8 @@ class SimulationCreateSerializer(serializers.Serializer):
         return value
 
     def validate_node_amount(self, value):
-        if not 3 <= value <= 1000:
-            raise serializers.ValidationError("Must be between 3 and 1000")
+        if not 3 <= value <= 100000:
+            raise serializers.ValidationError("Must be between 3 and 100000")
 
         return value
 
@@ -79,6 +99,11 @@ class SimulationCreateSerializer(serializers.Serializer):
                 "The mean of edges cant be more than half the amount of nodes"
             )
 
+        if data["node_amount"] > 1000 and data["graph_generator"] != "fast":
+            raise serializers.ValidationError(
+                "More than 1000 nodes need the fast graph generator"
+            )
+
         if data["var_edges"] * 3 >= data["mean_edges"]:
             raise serializers.ValidationError(
                 "The variance of edges can be more than a third of the mean"
@@ -87,10 +112,20 @@ class SimulationCreateSerializer(serializers.Serializer):
         return data
 
 
+class SimulationExtendSerializer(serializers.Serializer):
+    iterations = serializers.IntegerField()
+
+    def validate_iterations(self, value):
+        if not 1 <= value <= 10000:
+            raise serializers.ValidationError("Must be between 1 and 10000")
+
+        return value
+
+
 class SimulationStatusSerializer(serializers.ModelSerializer):
     class Meta:
         model = SimulationRun
-        fields = ["id", "status", "created_at", "started_at", "finished_at", "params", "user"]
+        fields = ["id", "status", "created_at", "started_at", "finished_at", "params", "user", "parent"]
 
 
 class SimulationErrorSerializer(serializers.ModelSerializer):
@@ -2,6 +2,7 @@ from django.urls import path
 from .views import (
     SimulationDetailView,
     SimulationErrorView,
+    SimulationExtendView,
     SimulationListView,
     SimulationResultView,
     SimulationStartView,
@@ -21,6 +22,11 @@ urlpatterns = [
         SimulationErrorView.as_view(),
         name="simulation-get-error",
     ),
+    path(
+        "api/simulations/<int:id>/extend/",
+        SimulationExtendView.as_view(),
+        name="simulation-extend",
+    ),
     path(
         "api/simulations/<int:pk>/",
         SimulationDetailView.as_view(),
@@ -10,11 +10,12 @@ from rest_framework.permissions import IsAuthenticated
 from cats.api.permissions import IsOwnerOrAdmin
 from cats.api.serializers import (
     SimulationCreateSerializer,
+    SimulationExtendSerializer,
     SimulationErrorSerializer,
     SimulationResultSerializer,
     SimulationStatusSerializer,
 )
-from cats.models import SimulationResults, SimulationRun
+from cats.models import InvalidSimulationState, SimulationResults, SimulationRun
 from cats.tasks import run_simulation
 
 logger = logging.getLogger(__name__)
@@ -44,6 +45,30 @@ class SimulationStartView(APIView):
         )
 
 
+class SimulationExtendView(APIView):
+    permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
+
+    def post(self, request, id):
+        parent = get_object_or_404(SimulationRun, id=id)
+        self.check_object_permissions(request, parent)
+        serializer = SimulationExtendSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        try:
+            run = parent.extend(serializer.validated_data["iterations"])
+        except InvalidSimulationState as e:
+            return Response({"detail": str(e)}, status=status.HTTP_409_CONFLICT)
+        run_simulation.delay(run.id)
+        logger.info(
+            f"Queued simulation {run.id} extending {parent.id} to {run.params['iterations']} iterations"
+        )
+
+        return Response(
+            {"id": run.id, "status": run.status, "parent": parent.id},
+            status=status.HTTP_201_CREATED,
+        )
+
+
 class SimulationDetailView(RetrieveAPIView):
     permission_classes = [IsAuthenticated, IsOwnerOrAdmin]
     serializer_class = SimulationStatusSerializer
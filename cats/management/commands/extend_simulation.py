@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from cats.models import InvalidSimulationState, SimulationRun
+
+import logging
+
+from cats.tasks import run_simulation
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Queue a run continuing a finished simulation for more iterations"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-r", "--run_id", type=int, required=True, help="Id of the finished run"
+        )
+        parser.add_argument(
+            "-i",
+            "--iterations",
+            type=int,
+            required=True,
+            help="Number of additional iterations",
+        )
+
+    def handle(self, *args, **options):
+        if options["iterations"] < 1:
+            raise CommandError("iterations must be at least 1")
+        parent = SimulationRun.objects.get(id=options["run_id"])
+        try:
+            run = parent.extend(options["iterations"])
+        except InvalidSimulationState as e:
+            raise CommandError(str(e))
+        run_simulation.delay(run.id)
+        logger.info(
+            f"Queued simulation {run.id} extending {parent.id} to {run.params['iterations']} iterations"
+        )
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+import json
+
+from cats.tasks import get_topology_cache
+from simulation.eventlog import Replay
+
+
+class Command(BaseCommand):
+    help = "Recompute the metrics of a logged run at any iteration from its event log"
+
+    def add_arguments(self, parser):
+        parser.add_argument("log", help="Event log written by a simulation run")
+        parser.add_argument(
+            "-i",
+            "--iterations",
+            type=int,
+            nargs="+",
+            help="Iterations to compute the metrics after, the end of the log by default",
+        )
+        parser.add_argument(
+            "-o", "--output", help="JSON file for the metrics, printed by default"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            replay = Replay(options["log"], topology_cache=get_topology_cache())
+        except ValueError as e:
+            raise CommandError(str(e))
+        iterations = options["iterations"] or [replay.end]
+        metrics = {}
+        for iteration in sorted(iterations):
+            try:
+                metrics[iteration] = replay.metrics_at(iteration)
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        if options["output"]:
+            with open(options["output"], "w") as file:
+                json.dump(metrics, file)
+        else:
+            for iteration, iteration_metrics in metrics.items():
+                self.stdout.write(
+                    f"{iteration}: {json.dumps(iteration_metrics['simulation'])}"
+                )
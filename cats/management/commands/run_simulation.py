@@ -67,6 +67,34 @@ class Command(BaseCommand):
             default=0.05,
             help="The variance of laziness",
         )
+        parser.add_argument(
+            "-gg",
+            "--graph_generator",
+            choices=["legacy", "fast"],
+            default="legacy",
+            help="How the node graph is built. Use fast for large amounts of nodes",
+        )
+        parser.add_argument(
+            "-fm",
+            "--friendgroup_mode",
+            choices=["auto", "exact", "greedy", "components"],
+            default="auto",
+            help="How friend groups are detected. auto enumerates cliques up to a budget",
+        )
+        parser.add_argument(
+            "-cw",
+            "--convergence_window",
+            type=int,
+            default=0,
+            help="Stop early once the relationships settled, checked every that many iterations. 0 never stops early",
+        )
+        parser.add_argument(
+            "-ct",
+            "--convergence_threshold",
+            type=float,
+            default=0.001,
+            help="Largest average change of relationship values between two checks that counts as converged",
+        )
 
     def handle(self, *args, **options):
         seed = secrets.randbits(32)
@@ -81,6 +109,10 @@ class Command(BaseCommand):
             "var_aggressive",
             "mean_laziness",
             "var_laziness",
+            "graph_generator",
+            "friendgroup_mode",
+            "convergence_window",
+            "convergence_threshold",
         ]
         params = {key: options[key] for key in param_keys}
         params["seed"] = seed
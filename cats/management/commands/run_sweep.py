@@ -0,0 +1,120 @@
+import csv
+from dataclasses import asdict
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import CustomUser
+from cats.models import SimulationRun
+from cats.tasks import get_topology_cache, run_simulation
+from simulation.sweep import ParameterSpace, SweepJournal, run_sweep, sweep_table
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = "Run a sweep over a space of simulation parameters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "spec",
+            help="JSON file with the parameter space: base, grid, ranges, method, samples, sample_seed",
+        )
+        parser.add_argument(
+            "-j",
+            "--journal",
+            required=True,
+            help="JSON lines file of finished points, rerun with it to resume the sweep",
+        )
+        parser.add_argument("-o", "--output", help="CSV file for the table of results")
+        parser.add_argument(
+            "-w",
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of local worker processes, one per CPU by default",
+        )
+        parser.add_argument(
+            "--celery",
+            action="store_true",
+            help="Queue every point as a simulation run instead of running it locally",
+        )
+        parser.add_argument(
+            "-u",
+            "--user_id",
+            type=int,
+            help="Id of user the queued runs should be attached to",
+        )
+
+    def handle(self, *args, **options):
+        with open(options["spec"]) as file:
+            try:
+                space = ParameterSpace.from_dict(json.load(file))
+            except (TypeError, ValueError) as e:
+                raise CommandError(f"Invalid parameter space: {e}")
+        points = space.expand()
+        journal = SweepJournal(options["journal"])
+
+        if options["celery"]:
+            if options["user_id"] is None:
+                raise CommandError("--celery needs the --user_id to queue runs for")
+            table = self.queue_points(points, journal, options["user_id"])
+        else:
+            table = run_sweep(
+                points,
+                workers=options["workers"],
+                journal=journal,
+                topology_cache=get_topology_cache(),
+                on_progress=self.report_progress,
+            )
+
+        self.stdout.write(f"{len(table)} of {len(points)} points finished")
+        if options["output"] and table:
+            with open(options["output"], "w", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=list(table[0]))
+                writer.writeheader()
+                writer.writerows(table)
+
+    def report_progress(self, done, total):
+        self.stdout.write(f"{done}/{total}")
+
+    def queue_points(self, points, journal, user_id):
+        """
+        Queue a run for every point without one and collect finished runs.
+
+        The journal maps points to their runs, so calling this again queues
+        nothing twice and picks up the results of runs finished since. Points
+        whose run failed are queued again with a new run.
+        """
+        user = CustomUser.objects.get(id=user_id)
+        metrics = {}
+        failed = 0
+        for point in points:
+            entry = journal.entries.get(point.key)
+            if entry is None:
+                self.queue_point(point, journal, user)
+            elif "metrics" in entry:
+                metrics[point.key] = entry["metrics"]
+            else:
+                run = SimulationRun.objects.get(id=entry["run_id"])
+                if run.status == SimulationRun.Status.FINISHED:
+                    metrics[point.key] = run.result.metrics["simulation"]
+                    journal.record(point.key, {**entry, "metrics": metrics[point.key]})
+                elif run.status == SimulationRun.Status.FAILED:
+                    logger.info(
+                        f"Simulation {run.id} for sweep point {point.overrides} "
+                        f"failed: {run.error_message}"
+                    )
+                    self.queue_point(point, journal, user)
+                    failed += 1
+        if failed:
+            self.stdout.write(f"{failed} failed points queued again")
+        return sweep_table(points, metrics)
+
+    def queue_point(self, point, journal, user):
+        run = SimulationRun.objects.create(params=asdict(point.params), user=user)
+        run_simulation.delay(run.id)
+        journal.record(point.key, {"overrides": point.overrides, "run_id": run.id})
+        logger.info(f"Queued simulation {run.id} for sweep point {point.overrides}")
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cats', '0005_alter_simulationrun_user'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulationresults',
+            name='final_state',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='simulationrun',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='extensions', to='cats.simulationrun'),
+        ),
+    ]
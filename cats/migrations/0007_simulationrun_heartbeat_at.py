@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cats', '0006_simulationrun_parent_simulationresults_final_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='simulationrun',
+            name='heartbeat_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
@@ -1,4 +1,4 @@
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 from django_project import settings
@@ -15,10 +15,20 @@ class SimulationRun(models.Model):
         related_name="simulations",
     )
     params = models.JSONField()
+    # the run this one continues, see `extend`
+    parent = models.ForeignKey(
+        "self",
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="extensions",
+    )
 
     created_at = models.DateTimeField(auto_now_add=True)
     started_at = models.DateTimeField(null=True)
     finished_at = models.DateTimeField(null=True)
+    # renewed while a worker runs the simulation, see `claim`
+    heartbeat_at = models.DateTimeField(null=True)
 
     class Status(models.TextChoices):
         PENDING = "pending", "PENDING"
@@ -38,8 +48,38 @@ class SimulationRun(models.Model):
                 f"Cannot start simulation in state '{self.status}'"
             )
         self.status = self.Status.RUNNING
-        self.started_at = timezone.now()
-        self.save(update_fields=["status", "started_at"])
+        self.started_at = self.heartbeat_at = timezone.now()
+        self.save(update_fields=["status", "started_at", "heartbeat_at"])
+
+    def heartbeat(self):
+        """Renew the lease of the worker running the simulation."""
+        self.heartbeat_at = timezone.now()
+        self.save(update_fields=["heartbeat_at"])
+
+    def claim(self, lease):
+        """
+        Take the run for a worker, returns whether it resumes a running one.
+
+        A running simulation is only taken over when its worker has not sent
+        a heartbeat for `lease`, the row is locked meanwhile so only one of
+        several deliveries of a run gets it.
+        """
+        with transaction.atomic():
+            run = SimulationRun.objects.select_for_update().get(pk=self.pk)
+            if run.status == self.Status.RUNNING:
+                if run.heartbeat_at is not None and (
+                    run.heartbeat_at > timezone.now() - lease
+                ):
+                    raise InvalidSimulationState(
+                        "Cannot claim simulation running on another worker"
+                    )
+                run.heartbeat()
+                resuming = True
+            else:
+                run.mark_running()
+                resuming = False
+        self.refresh_from_db()
+        return resuming
 
     def mark_completed(self):
         if self.status != self.Status.RUNNING:
@@ -60,9 +100,30 @@ class SimulationRun(models.Model):
         self.error_message = error_message
         self.save(update_fields=["status", "finished_at", "error_message"])
 
+    def extend(self, iterations):
+        """Create a run continuing this finished one for more iterations."""
+        if self.status != self.Status.FINISHED:
+            raise InvalidSimulationState(
+                f"Cannot extend simulation in state '{self.status}'"
+            )
+        result = getattr(self, "result", None)
+        if result is None or result.final_state is None:
+            raise InvalidSimulationState(
+                "Cannot extend simulation without a stored final state"
+            )
+        # a run that converged early continues from where it stopped
+        iterations_run = result.metrics.get("simulation", {}).get(
+            "iterations_run", self.params["iterations"]
+        )
+        params = {**self.params, "iterations": iterations_run + iterations}
+        return SimulationRun.objects.create(user=self.user, params=params, parent=self)
+
 
 class SimulationResults(models.Model):
     run = models.OneToOneField(
         SimulationRun, on_delete=models.CASCADE, related_name="result"
     )
     metrics = models.JSONField()
+    # checkpoint of the finished simulation, runs extending this one start
+    # from it
+    final_state = models.BinaryField(null=True, editable=False)
@@ -1,39 +1,117 @@
 from celery import shared_task
+from django.conf import settings
 
-from cats.models import SimulationResults, SimulationRun
+from cats.models import InvalidSimulationState, SimulationResults, SimulationRun
+from simulation.cache import TopologyCache
+from simulation.checkpoint import dump_checkpoint, load_checkpoint, save_checkpoint
+from simulation.eventlog import EventLogWriter
 from simulation.metrics import extract_metrics
 from simulation.simulation import Simulation, SimulationParameters
 
+from dataclasses import asdict, replace
+from datetime import timedelta
 import logging
+from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 
-@shared_task(bind=True)
+def get_topology_cache():
+    if not settings.SIMULATION_TOPOLOGY_CACHE_DIR:
+        return None
+    return TopologyCache(
+        settings.SIMULATION_TOPOLOGY_CACHE_DIR,
+        max_entries=settings.SIMULATION_TOPOLOGY_CACHE_SIZE,
+    )
+
+
+def get_checkpoint_path(run):
+    if not settings.SIMULATION_CHECKPOINT_DIR:
+        return None
+    directory = Path(settings.SIMULATION_CHECKPOINT_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"run-{run.id}.npz"
+
+
+def get_event_log_path(run, iteration):
+    """Log of `run` from `iteration` on, a resumed run starts a new one."""
+    if not settings.SIMULATION_EVENT_LOG_DIR:
+        return None
+    directory = Path(settings.SIMULATION_EVENT_LOG_DIR)
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory / f"run-{run.id}-{iteration}.events"
+
+
+# acknowledged only once done, so the run is redelivered when a worker dies
+@shared_task(bind=True, acks_late=True, reject_on_worker_lost=True)
 def run_simulation(self, run_id):
     return run_simulation_logic(run_id)
 
 
 def run_simulation_logic(run_id):
     run = SimulationRun.objects.get(id=run_id)
-    run.mark_running()
+    # a redelivered run is still marked as running, it is resumed once the
+    # worker running it stopped sending heartbeats
+    try:
+        resuming = run.claim(timedelta(seconds=settings.SIMULATION_LEASE_TIMEOUT))
+    except InvalidSimulationState as e:
+        logger.info(f"Simulation {run.id} not started: {e}")
+        return
+    checkpoint_path = get_checkpoint_path(run)
 
     logger.info(f"Simulation {run.id} started")
 
     try:
-        params = SimulationParameters(**run.params)
-        sim = Simulation(params=params)
-        sim.generate_initial_state()
-        sim.run()
+        if resuming and checkpoint_path is not None and checkpoint_path.exists():
+            sim = load_checkpoint(checkpoint_path, topology_cache=get_topology_cache())
+            logger.info(f"Simulation {run.id} resumed at iteration {sim.iteration}")
+        elif run.parent is not None:
+            sim = load_checkpoint(
+                bytes(run.parent.result.final_state),
+                topology_cache=get_topology_cache(),
+            )
+            sim.params = replace(sim.params, iterations=run.params["iterations"])
+            sim.converged_at = None
+            logger.info(
+                f"Simulation {run.id} continues {run.parent.id} "
+                f"at iteration {sim.iteration}"
+            )
+        else:
+            params = SimulationParameters(**run.params)
+            sim = Simulation(params=params, topology_cache=get_topology_cache())
+            sim.generate_initial_state()
+
+        def checkpoint(sim):
+            run.heartbeat()
+            if checkpoint_path is not None:
+                save_checkpoint(sim, checkpoint_path)
+            logger.info(
+                f"Simulation {run.id} at iteration {sim.iteration}: "
+                f"{asdict(sim.metrics_snapshot())}"
+            )
+
+        run_options = {
+            "checkpoint": checkpoint,
+            "checkpoint_every": settings.SIMULATION_CHECKPOINT_EVERY,
+        }
+        event_log_path = get_event_log_path(run, sim.iteration)
+        if event_log_path is not None:
+            run_options["event_log"] = EventLogWriter(event_log_path)
+        sim.run(**run_options)
 
         metrics = extract_metrics(sim)
 
         results = SimulationResults.objects.create(
             run=run,
             metrics=metrics,
+            final_state=dump_checkpoint(sim)
+            if settings.SIMULATION_KEEP_FINAL_STATE
+            else None,
         )
         run.mark_completed()
         logger.info(f"Simulation id:{run.id} finished with Results id:{results.id}")
+        if checkpoint_path is not None:
+            checkpoint_path.unlink(missing_ok=True)
 
     except Exception as e:
         run.mark_failed(str(e))
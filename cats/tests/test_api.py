@@ -154,4 +154,82 @@ def test_simulation_start(mock_delay,api_client,  create_user, login):
     run = SimulationRun.objects.get(id = data["id"])
     assert run.status == data["status"]
 
-    mock_delay.assert_called_once_with(run.id)
\ No newline at end of file
+    mock_delay.assert_called_once_with(run.id)
+
+@pytest.mark.django_db
+@patch("cats.management.commands.run_simulation.run_simulation.delay")
+def test_simulation_start_large_graph_needs_fast_generator(mock_delay, api_client, create_user, login):
+    user = create_user(email="test1@email.com",password="test1password")
+
+    access_token, _ = login(user=user,api_client=api_client, password="test1password")
+    headers = {
+        "Authorization": f"Bearer {access_token}"
+    }
+    url = reverse("simulation-start")
+    response = api_client.post(url, {"node_amount": 5000}, headers=headers, format="json")
+    assert response.status_code == 400
+
+    response = api_client.post(
+        url, {"node_amount": 5000, "graph_generator": "fast"}, headers=headers, format="json"
+    )
+    assert response.status_code == 201
+    run = SimulationRun.objects.get(id=response.data["id"])
+    assert run.params["graph_generator"] == "fast"
+
+@pytest.mark.django_db
+@patch("cats.management.commands.run_simulation.run_simulation.delay")
+def test_simulation_extend(mock_delay, api_client, create_results, create_user, login):
+    user = create_user(email="test1@email.com",password="test1password")
+    result = create_results(user=user)
+    parent = result.run
+    parent.mark_running()
+    parent.mark_completed()
+    result.final_state = b"state"
+    result.save()
+
+    access_token, _ = login(user=user,api_client=api_client, password="test1password")
+    headers = {
+        "Authorization": f"Bearer {access_token}"
+    }
+    url = reverse("simulation-extend", args=[parent.id])
+    response = api_client.post(url, {"iterations": 0}, headers=headers, format="json")
+    assert response.status_code == 400
+
+    response = api_client.post(url, {"iterations": 20}, headers=headers, format="json")
+    assert response.status_code == 201
+    run = SimulationRun.objects.get(id=response.data["id"])
+    assert response.data["parent"] == parent.id
+    assert run.parent == parent
+    assert run.params["iterations"] == 30
+    mock_delay.assert_called_once_with(run.id)
+
+@pytest.mark.django_db
+@patch("cats.management.commands.run_simulation.run_simulation.delay")
+def test_simulation_extend_if_not_finished(mock_delay, api_client, create_simulation, create_user, login):
+    user = create_user(email="test1@email.com",password="test1password")
+    sim = create_simulation(user=user)
+
+    access_token, _ = login(user=user,api_client=api_client, password="test1password")
+    headers = {
+        "Authorization": f"Bearer {access_token}"
+    }
+    url = reverse("simulation-extend", args=[sim.id])
+    response = api_client.post(url, {"iterations": 20}, headers=headers, format="json")
+    assert response.status_code == 409
+    mock_delay.assert_not_called()
+
+@pytest.mark.django_db
+@patch("cats.management.commands.run_simulation.run_simulation.delay")
+def test_simulation_extend_other_users_run(mock_delay, api_client, create_simulation, create_user, login):
+    owner = create_user(email="owner@email.com",password="ownerpassword")
+    user = create_user(email="test1@email.com",password="test1password")
+    sim = create_simulation(user=owner)
+
+    access_token, _ = login(user=user,api_client=api_client, password="test1password")
+    headers = {
+        "Authorization": f"Bearer {access_token}"
+    }
+    url = reverse("simulation-extend", args=[sim.id])
+    response = api_client.post(url, {"iterations": 20}, headers=headers, format="json")
+    assert response.status_code == 403
+    mock_delay.assert_not_called()
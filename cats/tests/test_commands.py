@@ -1,9 +1,16 @@
+import csv
+from dataclasses import asdict
+from io import StringIO
+import json
 from unittest.mock import patch
 import pytest
 
 from django.core.management import call_command
 
-from cats.models import SimulationRun
+from cats.models import SimulationResults, SimulationRun
+from simulation.eventlog import EventLogWriter
+from simulation.simulation import Simulation, SimulationParameters
+from simulation.sweep import SweepJournal
 
 
 @pytest.mark.django_db
@@ -28,3 +35,164 @@ def test_run_simulation_command_creates_run_and_queues_task(mock_delay, create_u
     assert isinstance(run.params["seed"], int)
 
     mock_delay.assert_called_once_with(run.id)
+
+
+@pytest.fixture
+def sweep_spec(tmp_path):
+    path = tmp_path / "space.json"
+    path.write_text(
+        json.dumps(
+            {
+                "base": {"iterations": 10, "cat_amount": 3, "node_amount": 7},
+                "grid": {"seed": [1, 2]},
+            }
+        )
+    )
+    return path
+
+
+@pytest.mark.django_db
+def test_run_sweep_command_runs_locally(sweep_spec, tmp_path):
+    output = tmp_path / "table.csv"
+    call_command(
+        "run_sweep",
+        str(sweep_spec),
+        journal=str(tmp_path / "sweep.jsonl"),
+        output=str(output),
+        workers=1,
+        stdout=StringIO(),
+    )
+
+    rows = list(csv.DictReader(output.open()))
+    assert [row["seed"] for row in rows] == ["1", "2"]
+    assert "interaction_density" in rows[0]
+
+
+@pytest.mark.django_db
+@patch("cats.management.commands.run_sweep.run_simulation.delay")
+def test_run_sweep_command_queues_runs_once(
+    mock_delay, create_user, sweep_spec, tmp_path
+):
+    user = create_user()
+    journal = str(tmp_path / "sweep.jsonl")
+    call_command(
+        "run_sweep", str(sweep_spec), journal=journal, celery=True, user_id=user.id
+    )
+
+    runs = SimulationRun.objects.order_by("id")
+    assert [run.params["seed"] for run in runs] == [1, 2]
+    assert mock_delay.call_count == 2
+
+    run = runs[0]
+    run.status = SimulationRun.Status.FINISHED
+    run.save()
+    SimulationResults.objects.create(
+        run=run, metrics={"simulation": {"interaction_density": 0.5}}
+    )
+    output = tmp_path / "table.csv"
+    call_command(
+        "run_sweep",
+        str(sweep_spec),
+        journal=journal,
+        celery=True,
+        user_id=user.id,
+        output=str(output),
+    )
+
+    assert SimulationRun.objects.count() == 2
+    assert mock_delay.call_count == 2
+    assert list(csv.DictReader(output.open())) == [
+        {"seed": "1", "interaction_density": "0.5"}
+    ]
+
+
+@pytest.mark.django_db
+@patch("cats.management.commands.run_sweep.run_simulation.delay")
+def test_run_sweep_command_queues_failed_runs_again(
+    mock_delay, create_user, sweep_spec, tmp_path
+):
+    user = create_user()
+    journal = str(tmp_path / "sweep.jsonl")
+    call_command(
+        "run_sweep", str(sweep_spec), journal=journal, celery=True, user_id=user.id
+    )
+    failed, pending = SimulationRun.objects.order_by("id")
+    failed.mark_running()
+    failed.mark_failed("worker ran out of memory")
+
+    stdout = StringIO()
+    call_command(
+        "run_sweep",
+        str(sweep_spec),
+        journal=journal,
+        celery=True,
+        user_id=user.id,
+        stdout=stdout,
+    )
+
+    assert "1 failed points queued again" in stdout.getvalue()
+    assert mock_delay.call_count == 3
+    retry = SimulationRun.objects.latest("id")
+    assert retry.params == failed.params
+    assert retry.status == SimulationRun.Status.PENDING
+    entries = SweepJournal(journal).entries.values()
+    assert {entry["run_id"] for entry in entries} == {retry.id, pending.id}
+
+    # the retry finishes, the sweep completes
+    retry.mark_running()
+    retry.mark_completed()
+    SimulationResults.objects.create(
+        run=retry, metrics={"simulation": {"interaction_density": 0.5}}
+    )
+    pending.mark_running()
+    pending.mark_completed()
+    SimulationResults.objects.create(
+        run=pending, metrics={"simulation": {"interaction_density": 0.25}}
+    )
+    stdout = StringIO()
+    call_command(
+        "run_sweep",
+        str(sweep_spec),
+        journal=journal,
+        celery=True,
+        user_id=user.id,
+        stdout=stdout,
+    )
+    assert "2 of 2 points finished" in stdout.getvalue()
+    assert mock_delay.call_count == 3
+
+
+@pytest.mark.django_db
+@patch("cats.management.commands.extend_simulation.run_simulation.delay")
+def test_extend_simulation_command(mock_delay, create_results):
+    result = create_results()
+    parent = result.run
+    parent.mark_running()
+    parent.mark_completed()
+    result.final_state = b"state"
+    result.save()
+
+    call_command("extend_simulation", run_id=parent.id, iterations=5)
+
+    run = SimulationRun.objects.get(parent=parent)
+    assert run.params["iterations"] == 15
+    mock_delay.assert_called_once_with(run.id)
+
+
+def test_replay_event_log_command(tmp_path):
+    params = SimulationParameters(iterations=20, seed=1, cat_amount=4, node_amount=7)
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    sim.run(event_log=EventLogWriter(tmp_path / "run.events"))
+    output = tmp_path / "metrics.json"
+
+    call_command(
+        "replay_event_log",
+        str(tmp_path / "run.events"),
+        iterations=[20, 10],
+        output=str(output),
+    )
+
+    metrics = json.loads(output.read_text())
+    assert list(metrics) == ["10", "20"]
+    assert metrics["20"]["simulation"] == asdict(sim.metrics)
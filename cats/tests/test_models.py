@@ -1,4 +1,7 @@
+from datetime import timedelta
+
 import pytest
+from django.utils import timezone
 
 from cats.models import InvalidSimulationState, SimulationResults, SimulationRun
 from cats.tests.conftest import DUMMY_METRICS
@@ -67,6 +70,28 @@ def test_cannot_start_if_not_pending(create_simulation):
         sim.mark_running()
 
 
+@pytest.mark.django_db
+def test_claim_simulation_run(create_simulation):
+    sim = create_simulation()
+    lease = timedelta(minutes=10)
+
+    assert sim.claim(lease) is False
+    assert sim.status == SimulationRun.Status.RUNNING
+    assert sim.heartbeat_at == sim.started_at
+    # the first worker is still alive
+    with pytest.raises(InvalidSimulationState):
+        sim.claim(lease)
+
+    sim.heartbeat_at = timezone.now() - 2 * lease
+    sim.save(update_fields=["heartbeat_at"])
+    assert sim.claim(lease) is True
+    assert sim.heartbeat_at > timezone.now() - lease
+
+    sim.mark_completed()
+    with pytest.raises(InvalidSimulationState):
+        sim.claim(lease)
+
+
 @pytest.mark.django_db
 def test_simulation_results_link_to_run(create_results):
     results = create_results()
@@ -74,3 +99,32 @@ def test_simulation_results_link_to_run(create_results):
     assert results.run
     assert results.metrics == DUMMY_METRICS
 
+
+
+@pytest.mark.django_db
+def test_extend_finished_simulation(create_results):
+    result = create_results()
+    sim = result.run
+    sim.mark_running()
+    sim.mark_completed()
+    result.final_state = b"state"
+    result.save()
+
+    extension = sim.extend(5)
+    assert extension.parent == sim
+    assert extension.params == {"iterations": 15}
+    assert extension.status == SimulationRun.Status.PENDING
+    assert list(sim.extensions.all()) == [extension]
+
+
+@pytest.mark.django_db
+def test_cannot_extend_without_final_state(create_simulation, create_results):
+    sim = create_simulation()
+    with pytest.raises(InvalidSimulationState):
+        sim.extend(5)
+
+    sim.mark_running()
+    sim.mark_completed()
+    create_results(user=sim.user, run=sim)
+    with pytest.raises(InvalidSimulationState):
+        sim.extend(5)
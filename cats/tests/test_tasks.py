@@ -1,7 +1,20 @@
+from datetime import timedelta
+import json
+
 import pytest
+from django.utils import timezone
 
-from cats.models import SimulationRun
+from cats.models import SimulationResults, SimulationRun
 from cats.tasks import run_simulation_logic
+from simulation.checkpoint import save_checkpoint
+from simulation.eventlog import Replay
+from simulation.simulation import Simulation, SimulationParameters
+
+
+def expire_lease(run):
+    """Make `run` look like its worker died an hour ago."""
+    run.heartbeat_at = timezone.now() - timedelta(hours=1)
+    run.save(update_fields=["heartbeat_at"])
 
 
 @pytest.mark.django_db
@@ -28,3 +41,159 @@ def test_simulation_run_logic_fail(create_user):
     run.refresh_from_db()
     assert run.status == SimulationRun.Status.FAILED
     assert run.error_message == "iterations must be greater than 0"
+
+
+@pytest.mark.django_db
+def test_simulation_run_logic_uses_topology_cache(create_user, settings, tmp_path):
+    settings.SIMULATION_TOPOLOGY_CACHE_DIR = str(tmp_path)
+    user = create_user()
+    for _ in range(2):
+        run = SimulationRun.objects.create(
+            params={"iterations": 10, "cat_amount": 3, "node_amount": 10},
+            user=user
+        )
+        run_simulation_logic(run.id)
+        run.refresh_from_db()
+        assert run.status == SimulationRun.Status.FINISHED
+
+    assert len(list(tmp_path.glob("*.npz"))) == 1
+
+
+@pytest.mark.django_db
+def test_simulation_run_logic_removes_checkpoint(create_user, settings, tmp_path):
+    settings.SIMULATION_CHECKPOINT_DIR = str(tmp_path)
+    settings.SIMULATION_CHECKPOINT_EVERY = 3
+    user = create_user()
+    run = SimulationRun.objects.create(
+        params={"iterations": 10, "cat_amount": 3, "node_amount": 10},
+        user=user
+    )
+    run_simulation_logic(run.id)
+    run.refresh_from_db()
+    assert run.status == SimulationRun.Status.FINISHED
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.django_db
+def test_simulation_run_logic_resumes_redelivered_run(create_user, settings, tmp_path):
+    settings.SIMULATION_CHECKPOINT_DIR = str(tmp_path)
+    user = create_user()
+    params = {"iterations": 20, "seed": 3, "cat_amount": 4, "node_amount": 10}
+    uninterrupted = SimulationRun.objects.create(params=params, user=user)
+    run_simulation_logic(uninterrupted.id)
+
+    # a worker died after checkpointing iteration 10
+    run = SimulationRun.objects.create(params=params, user=user)
+    run.mark_running()
+    expire_lease(run)
+    sim = Simulation(SimulationParameters(**params))
+    sim.generate_initial_state()
+    for _ in range(10):
+        sim.movement_step()
+        sim.engagement_step()
+        sim.iteration += 1
+    save_checkpoint(sim, tmp_path / f"run-{run.id}.npz")
+
+    run_simulation_logic(run.id)
+    run.refresh_from_db()
+    assert run.status == SimulationRun.Status.FINISHED
+    assert run.result.metrics == SimulationResults.objects.get(
+        run=uninterrupted
+    ).metrics
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.django_db
+def test_simulation_run_logic_ignores_run_with_fresh_lease(
+    create_user, settings, tmp_path
+):
+    settings.SIMULATION_CHECKPOINT_DIR = str(tmp_path)
+    user = create_user()
+    params = {"iterations": 20, "seed": 3, "cat_amount": 4, "node_amount": 10}
+    # another worker is running it and checkpointed iteration 10
+    run = SimulationRun.objects.create(params=params, user=user)
+    run.mark_running()
+    sim = Simulation(SimulationParameters(**params))
+    sim.generate_initial_state()
+    checkpoint_path = tmp_path / f"run-{run.id}.npz"
+    save_checkpoint(sim, checkpoint_path)
+    heartbeat_at = run.heartbeat_at
+
+    run_simulation_logic(run.id)
+    run.refresh_from_db()
+    assert run.status == SimulationRun.Status.RUNNING
+    assert run.heartbeat_at == heartbeat_at
+    assert not SimulationResults.objects.filter(run=run).exists()
+    assert list(tmp_path.iterdir()) == [checkpoint_path]
+
+
+@pytest.mark.django_db
+def test_simulation_run_logic_renews_lease(create_user, settings, monkeypatch):
+    settings.SIMULATION_CHECKPOINT_EVERY = 5
+    user = create_user()
+    run = SimulationRun.objects.create(
+        params={"iterations": 20, "cat_amount": 3, "node_amount": 10}, user=user
+    )
+    heartbeats = []
+    original = SimulationRun.heartbeat
+    monkeypatch.setattr(
+        SimulationRun,
+        "heartbeat",
+        lambda self: heartbeats.append(self.id) or original(self),
+    )
+
+    run_simulation_logic(run.id)
+    run.refresh_from_db()
+    assert run.status == SimulationRun.Status.FINISHED
+    assert heartbeats == [run.id] * 4
+
+
+@pytest.mark.django_db
+def test_simulation_run_logic_restarts_run_without_checkpoint(create_user):
+    user = create_user()
+    run = SimulationRun.objects.create(
+        params={"iterations": 10, "cat_amount": 3, "node_amount": 10},
+        user=user
+    )
+    run.mark_running()
+    expire_lease(run)
+
+    run_simulation_logic(run.id)
+    run.refresh_from_db()
+    assert run.status == SimulationRun.Status.FINISHED
+
+
+@pytest.mark.django_db
+def test_simulation_run_logic_extends_finished_run(create_user):
+    user = create_user()
+    params = {"iterations": 10, "seed": 3, "cat_amount": 4, "node_amount": 10}
+    parent = SimulationRun.objects.create(params=params, user=user)
+    run_simulation_logic(parent.id)
+    parent.refresh_from_db()
+    assert parent.result.final_state is not None
+
+    run = parent.extend(15)
+    run_simulation_logic(run.id)
+    run.refresh_from_db()
+    assert run.status == SimulationRun.Status.FINISHED
+
+    fresh = SimulationRun.objects.create(params={**params, "iterations": 25}, user=user)
+    run_simulation_logic(fresh.id)
+    fresh.refresh_from_db()
+    assert run.result.metrics == fresh.result.metrics
+
+
+@pytest.mark.django_db
+def test_simulation_run_logic_writes_event_log(create_user, settings, tmp_path):
+    settings.SIMULATION_EVENT_LOG_DIR = str(tmp_path)
+    user = create_user()
+    run = SimulationRun.objects.create(
+        params={"iterations": 10, "seed": 2, "cat_amount": 4, "node_amount": 10},
+        user=user
+    )
+    run_simulation_logic(run.id)
+    run.refresh_from_db()
+
+    replay = Replay(tmp_path / f"run-{run.id}-0.events")
+    replayed = json.loads(json.dumps(replay.metrics_at(10)))
+    assert replayed == json.loads(json.dumps(run.result.metrics))
@@ -144,6 +144,35 @@ CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 
 CELERY_TIMEZONE = TIME_ZONE
+# Simulation tasks are acknowledged late, Redis redelivers a task that is not
+# acknowledged within this many seconds, keep it above the longest run
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    "visibility_timeout": config("CELERY_VISIBILITY_TIMEOUT", default=86400, cast=int)
+}
+
+# Generated node graphs are reused across runs when a cache directory is set
+SIMULATION_TOPOLOGY_CACHE_DIR = config("SIMULATION_TOPOLOGY_CACHE_DIR", default=None)
+SIMULATION_TOPOLOGY_CACHE_SIZE = config(
+    "SIMULATION_TOPOLOGY_CACHE_SIZE", default=128, cast=int
+)
+
+# Running simulations are checkpointed when a directory is set, a redelivered
+# run resumes from its latest checkpoint
+SIMULATION_CHECKPOINT_DIR = config("SIMULATION_CHECKPOINT_DIR", default=None)
+SIMULATION_CHECKPOINT_EVERY = config(
+    "SIMULATION_CHECKPOINT_EVERY", default=100, cast=int
+)
+# Running simulations renew a lease every SIMULATION_CHECKPOINT_EVERY
+# iterations, a redelivered run is only resumed once its lease is older than
+# this many seconds
+SIMULATION_LEASE_TIMEOUT = config("SIMULATION_LEASE_TIMEOUT", default=600, cast=int)
+# Finished runs keep their final state so they can be extended
+SIMULATION_KEEP_FINAL_STATE = config(
+    "SIMULATION_KEEP_FINAL_STATE", default=True, cast=bool
+)
+# Runs write an event log there to be replayed later, one file per start or
+# resume of a run
+SIMULATION_EVENT_LOG_DIR = config("SIMULATION_EVENT_LOG_DIR", default=None)
 
 LOGGING = {
     "version": 1,
@@ -0,0 +1,363 @@
+from collections.abc import Iterable
+from dataclasses import replace
+from typing import Optional
+
+import numpy as np
+
+from simulation.cache import TopologyCache
+from simulation.simulation import (
+    Simulation,
+    SimulationParameters,
+    lazy_weight,
+    relationship_weight,
+)
+from simulation.state import CAT_COUNTERS, BitSet
+from simulation.vectorized import CatArrays, build_csr, choose_in_segments, expand_rows
+
+
+class BatchedSimulation:
+    """
+    Advances one replica of `params` per seed in lockstep.
+
+    The node graphs of all replicas are joined into one graph of disjoint
+    components, node `n` of replica `k` becoming `k * node_amount + n` and cat
+    `c` becoming `k * cat_amount + c`. Positions and counters are flat arrays
+    over all cats, relationships a `(replica, cat, cat)` array, so every step
+    of the numpy engines runs once for the whole batch.
+
+    Each replica starts from the initial state of a `Simulation` with its seed,
+    the steps draw from one generator shared by the batch. Replicas are
+    therefore independent runs of the numpy engines, but do not reproduce a
+    single run with the same seed draw for draw. With a `convergence_window`
+    every replica is checked on its own and a converged one stays frozen,
+    its cats left out of the steps while the others go on. After `run` the
+    replicas' results are written back into `simulations`, one finished
+    `Simulation` per seed whose metrics are calculated as usual.
+    """
+
+    def __init__(
+        self,
+        params: SimulationParameters,
+        seeds: Iterable[int],
+        topology_cache: Optional[TopologyCache] = None,
+    ):
+        self.params = params
+        self.seeds = list(seeds)
+        if not self.seeds:
+            raise ValueError("A batch needs at least one seed")
+        self.rng = np.random.default_rng(np.random.SeedSequence(self.seeds))
+
+        self.simulations = [
+            Simulation(
+                replace(
+                    params,
+                    seed=seed,
+                    relationship_store="matrix",
+                    movement_engine="numpy",
+                    engagement_engine="numpy",
+                ),
+                topology_cache=topology_cache,
+            )
+            for seed in self.seeds
+        ]
+        self.replica_amount = len(self.seeds)
+        self.cat_amount = params.cat_amount
+        self.node_amount = params.node_amount
+
+        self.position = np.zeros(0, dtype=np.int64)
+        self.target = np.zeros(0, dtype=np.int64)
+        self.needs_to_run = np.zeros(0, dtype=bool)
+        # cats of replicas that have not converged yet
+        self.active = np.zeros(0, dtype=bool)
+        self.interactions = np.zeros(self.replica_amount, dtype=np.int64)
+        self.iteration = 0
+
+    def generate_initial_state(self):
+        replicas, cats, nodes = self.replica_amount, self.cat_amount, self.node_amount
+        for sim in self.simulations:
+            sim.generate_initial_state()
+
+        # disjoint union of the node graphs
+        indptr = [np.zeros(1, dtype=np.int64)]
+        indices = []
+        for k, sim in enumerate(self.simulations):
+            sim_indptr, sim_indices = build_csr(sim.adjacency, nodes)
+            indptr.append(sim_indptr[1:] + indptr[-1][-1])
+            indices.append(sim_indices + k * nodes)
+        self.indptr = np.concatenate(indptr)
+        self.indices = np.concatenate(indices)
+
+        arrays = [CatArrays.from_cats(sim.cats, nodes) for sim in self.simulations]
+        offsets = np.repeat(np.arange(replicas) * nodes, cats)
+        self.home = np.concatenate([a.home for a in arrays]) + offsets
+        self.aggressive = np.concatenate([a.aggressive for a in arrays])
+        self.lazy = np.concatenate([a.lazy for a in arrays])
+        self.home_index = np.concatenate([a.home_index for a in arrays])
+        self.home_precedes = np.stack([a.home_precedes for a in arrays])
+        homes = max(a.home_onehot.shape[1] for a in arrays)
+        self.home_onehot = np.zeros((replicas, cats, homes))
+        for k, a in enumerate(arrays):
+            self.home_onehot[k, :, : a.home_onehot.shape[1]] = a.home_onehot
+
+        self.position = self.home.copy()
+        self.target = np.full(replicas * cats, -1, dtype=np.int64)
+        self.needs_to_run = np.zeros(replicas * cats, dtype=bool)
+        self.active = np.ones(replicas * cats, dtype=bool)
+        self.visited = np.zeros((replicas * cats, nodes), dtype=bool)
+        self.visited[np.arange(replicas * cats), self.home - offsets] = True
+        self.interacted_with = np.zeros((replicas * cats, cats), dtype=bool)
+
+        # the replicas' relationship matrices and stat tables become views
+        # into the batch arrays
+        for name in ("value", "absolute_delta", "min_value", "max_value"):
+            setattr(self, name, np.zeros((replicas, cats, cats)))
+        self.number_of_sign_flips = np.zeros((replicas, cats, cats), dtype=np.int64)
+        self.interacted = np.zeros((replicas, cats, cats), dtype=bool)
+        self.columns = {
+            name: np.zeros(replicas * cats, dtype=np.int64) for name in CAT_COUNTERS
+        }
+        for k, sim in enumerate(self.simulations):
+            matrix = sim.relationships
+            for name in (
+                "value",
+                "absolute_delta",
+                "min_value",
+                "max_value",
+                "number_of_sign_flips",
+                "interacted",
+            ):
+                batch = getattr(self, name)
+                batch[k] = getattr(matrix, name)
+                setattr(matrix, name, batch[k])
+            for name, column in self.columns.items():
+                rows = column[k * cats : (k + 1) * cats]
+                rows[:] = sim.cat_stats.columns[name]
+                sim.cat_stats.columns[name] = rows
+
+    def pair_index(self, cat1: np.ndarray, cat2: np.ndarray):
+        """Flat index into the `(replica, cat, cat)` arrays of batch cat pairs."""
+        return cat1 * self.cat_amount + cat2 % self.cat_amount
+
+    def movement_step(self):
+        """`Simulation.vectorized_movement_step` over all replicas at once."""
+        cats = self.cat_amount
+        position = self.position
+        movers = np.flatnonzero((position >= 0) & self.active)
+
+        # cats on a node are represented by the lowest id there, pressure is
+        # the summed relationship value towards each representative's node
+        representative = np.full(len(self.home_index), cats, dtype=np.int64)
+        np.minimum.at(representative, position[movers], movers % cats)
+        slot = representative[position[movers]]
+        presence = np.zeros((self.replica_amount, cats, cats))
+        presence[movers // cats, movers % cats, slot] = 1
+        pressure = (self.value @ presence).reshape(-1, cats)
+
+        blocking = (self.value > 0) & self.home_precedes
+        blocked_homes = (blocking.astype(np.float64) @ self.home_onehot) > 0
+        blocked_homes = blocked_homes.reshape(-1, self.home_onehot.shape[2])
+
+        owner, entries, degree = expand_rows(self.indptr, position[movers])
+        target = self.indices[entries]
+        cat_ids = movers[owner]
+
+        target_slot = representative[target]
+        target_pressure = np.where(
+            target_slot < cats,
+            pressure[cat_ids, np.minimum(target_slot, cats - 1)],
+            0.0,
+        )
+        weights = (1 - self.lazy[cat_ids]) * (1 - lazy_weight) + (
+            self.aggressive[cat_ids] * target_pressure * relationship_weight
+        )
+        weights *= self.rng.uniform(0.9, 1.1, len(weights))
+        weights = np.clip(weights, 0, 1)
+        target_home = self.home_index[target]
+        forbidden = (target_home >= 0) & blocked_homes[
+            cat_ids, np.maximum(target_home, 0)
+        ]
+        weights[forbidden] = 0.0
+
+        stay = self.lazy[movers] * lazy_weight + (
+            self.aggressive[movers] * pressure[movers, slot] * relationship_weight
+        )
+        stay *= self.rng.uniform(0.9, 1.1, len(movers))
+        stay = np.clip(stay, 0, 1)
+        stay[self.needs_to_run[movers]] = 0.0
+
+        choice = choose_in_segments(weights, owner, degree, stay, self.rng)
+        moves = choice < degree
+        destination = target[(np.cumsum(degree) - degree + choice)[moves]]
+
+        columns = self.columns
+        at_home = position[movers] == self.home[movers]
+        neutral = ~at_home & (self.home_index[position[movers]] < 0)
+        friendly = ~at_home & ~neutral
+        columns["iter_on_edge"][(position < 0) & self.active] += 1
+        columns["iter_at_home"][movers[at_home]] += 1
+        columns["times_at_home"][movers[at_home & moves]] += 1
+        columns["iter_at_neutral"][movers[neutral]] += 1
+        columns["times_at_neutral"][movers[neutral & moves]] += 1
+        columns["iter_at_friendly"][movers[friendly]] += 1
+        columns["times_at_friendly"][movers[friendly & moves]] += 1
+
+        arriving = np.flatnonzero((position < 0) & self.active)
+        position[arriving] = self.target[arriving]
+        self.target[arriving] = -1
+        self.visited[arriving, position[arriving] % self.node_amount] = True
+        self.needs_to_run[self.active] = False
+        position[movers[moves]] = -1
+        self.target[movers[moves]] = destination
+
+    def engagement_step(self):
+        """`Simulation.vectorized_engagement_step` over all replicas at once."""
+        position = self.position
+        on_node = np.flatnonzero((position >= 0) & self.active)
+        self.columns["sleeps"][on_node] += 1
+
+        # all pairs of co-located cats, lower id first; nodes of different
+        # replicas are distinct, so pairs never cross replicas
+        grouped = on_node[np.argsort(position[on_node], kind="stable")]
+        _, group_start, group_size = np.unique(
+            position[grouped], return_index=True, return_counts=True
+        )
+        member = np.arange(len(grouped))
+        group_end = np.repeat(group_start + group_size, group_size)
+        partners = group_end - member - 1
+        first = np.repeat(member, partners)
+        offset = np.arange(len(first)) - np.repeat(
+            np.cumsum(partners) - partners, partners
+        )
+        cat1 = grouped[first]
+        cat2 = grouped[first + 1 + offset]
+
+        values = self.value.reshape(-1)
+        pair = self.pair_index(cat1, cat2)
+        noise = self.rng.uniform(-0.3, 0.3, len(cat1))
+        mutual_intent = (self.aggressive[cat1] + self.aggressive[cat2]) * values[
+            pair
+        ] + noise
+        candidates = np.flatnonzero(mutual_intent > 0.2)
+        candidates = candidates[
+            np.argsort(-mutual_intent[candidates], kind="stable")
+        ]
+
+        matched = greedy_matching(
+            cat1[candidates], cat2[candidates], len(self.position)
+        )
+        if not matched.any():
+            return
+
+        c1 = cat1[candidates[matched]]
+        c2 = cat2[candidates[matched]]
+        index = pair[candidates[matched]]
+        mirrored = self.pair_index(c2, c1)
+        value = values[index]
+        fight = self.aggressive[c1] + self.aggressive[c2] + value > 0
+        new_value = np.where(
+            fight, np.minimum(1, value + 0.05), np.maximum(-1, value - 0.05)
+        )
+
+        self.absolute_delta.reshape(-1)[index] += 0.05
+        self.interacted.reshape(-1)[index] = True
+        self.number_of_sign_flips.reshape(-1)[index] += value == 0
+        values[index] = values[mirrored] = new_value
+        max_value = self.max_value.reshape(-1)
+        min_value = self.min_value.reshape(-1)
+        max_value[index] = np.where(
+            fight, np.maximum(max_value[index], new_value), max_value[index]
+        )
+        min_value[index] = np.where(
+            fight, min_value[index], np.minimum(min_value[index], new_value)
+        )
+        self.interactions += np.bincount(
+            c1 // self.cat_amount, minlength=self.replica_amount
+        )
+
+        friendly = ~fight
+        for cats, others in ((c1, c2), (c2, c1)):
+            self.columns["fights"][cats[fight]] += 1
+            self.columns["friendly_interaction"][cats[friendly]] += 1
+            self.interacted_with[cats, others % self.cat_amount] = True
+
+        runs = np.where(self.aggressive[c1] > self.aggressive[c2], c2, c1)
+        self.needs_to_run[runs[fight]] = True
+
+    def finish(self):
+        """Write the batch state back into the replicas' `Simulation`s."""
+        cats = self.cat_amount
+        self.columns["friends"][:] = (self.value < 0).sum(axis=2).reshape(-1)
+        self.columns["enemies"][:] = (self.value > 0).sum(axis=2).reshape(-1)
+        for k, sim in enumerate(self.simulations):
+            sim.iteration = (
+                self.iteration if sim.converged_at is None else sim.converged_at
+            )
+            sim.stats.total_number_interactions = int(self.interactions[k])
+            sim.occupancy.clear()
+            sim.forbidden_nodes.clear()
+            for cat in sim.cats:
+                i = k * cats + cat.traits.id
+                position = self.position[i].item() % self.node_amount
+                target = self.target[i].item() % self.node_amount
+                cat.current_node = position if self.position[i] >= 0 else None
+                cat.target_node = target if self.target[i] >= 0 else None
+                cat.needs_to_run = bool(self.needs_to_run[i])
+                if cat.current_node is not None:
+                    sim.occupancy.setdefault(position, set()).add(cat.traits.id)
+                sim.cat_stats.interacted_with[cat.traits.id] = BitSet(
+                    np.flatnonzero(self.interacted_with[i]).tolist()
+                )
+                sim.cat_stats.nodes_visited[cat.traits.id] = BitSet(
+                    np.flatnonzero(self.visited[i]).tolist()
+                )
+            sim.recount_metric_aggregates()
+            sim.calculate_metrics()
+
+    def check_convergence(self):
+        """Freeze the replicas whose relationships settled since the last check."""
+        cats = self.cat_amount
+        for k, sim in enumerate(self.simulations):
+            if sim.converged_at is not None:
+                continue
+            sim.stats.interacted_relationships = int(
+                np.count_nonzero(self.interacted[k])
+            )
+            if sim.check_convergence():
+                sim.converged_at = self.iteration
+                self.active[k * cats : (k + 1) * cats] = False
+
+    def run(self):
+        window = self.params.convergence_window
+        if window:
+            for sim in self.simulations:
+                sim.convergence_reference = sim.relationship_values()
+        while self.iteration < self.params.iterations and self.active.any():
+            self.movement_step()
+            self.engagement_step()
+            self.iteration += 1
+            if window and self.iteration % window == 0:
+                self.check_convergence()
+
+        self.finish()
+
+
+def greedy_matching(cat1: np.ndarray, cat2: np.ndarray, cat_amount: int):
+    """
+    Mask of the pairs a greedy matching in the given order picks.
+
+    Instead of walking the pairs one by one, every round takes all pairs that
+    come first for both of their cats, which is the same matching.
+    """
+    rank = np.arange(len(cat1))
+    matched = np.zeros(len(cat1), dtype=bool)
+    alive = np.ones(len(cat1), dtype=bool)
+    while alive.any():
+        first = np.full(cat_amount, len(cat1))
+        np.minimum.at(first, cat1[alive], rank[alive])
+        np.minimum.at(first, cat2[alive], rank[alive])
+        picked = alive & (first[cat1] == rank) & (first[cat2] == rank)
+        matched |= picked
+        engaged = np.zeros(cat_amount, dtype=bool)
+        engaged[cat1[matched]] = engaged[cat2[matched]] = True
+        alive &= ~engaged[cat1] & ~engaged[cat2]
+    return matched
@@ -0,0 +1,116 @@
+import contextlib
+from dataclasses import dataclass
+import hashlib
+import os
+from pathlib import Path
+from typing import Optional
+import tempfile
+
+import numpy as np
+
+
+@dataclass
+class Topology:
+    """A generated node graph, as stored in the `TopologyCache`."""
+
+    degrees: np.ndarray
+    edges: np.ndarray
+    # state of the simulation's scalar generator right after building the
+    # graph, so cats drawn after a cache hit match an uncached run
+    rng_state: Optional[tuple] = None
+
+
+class TopologyCache:
+    """
+    Content addressed on-disk cache of generated node graphs.
+
+    Entries are keyed by everything that determines the graph (generator,
+    seed, node_amount, mean_edges, var_edges) and stored as compressed `.npz`
+    files. Reading an entry marks it as recently used; once more than
+    `max_entries` are stored, the least recently used ones are evicted.
+    """
+
+    def __init__(self, directory, max_entries: int = 128):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+
+    def key(self, params) -> str:
+        content = ":".join(
+            str(value)
+            for value in (
+                params.graph_generator,
+                params.seed,
+                params.node_amount,
+                params.mean_edges,
+                params.var_edges,
+            )
+        )
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def path(self, params) -> Path:
+        return self.directory / f"{self.key(params)}.npz"
+
+    def load(self, params) -> Optional[Topology]:
+        path = self.path(params)
+        try:
+            with np.load(path) as data:
+                topology = Topology(
+                    degrees=data["degrees"].astype(np.int64),
+                    edges=data["edges"].astype(np.int64),
+                    rng_state=decode_rng_state(data) if "rng_state" in data else None,
+                )
+        except (FileNotFoundError, OSError, ValueError, KeyError):
+            return None
+        # another process may have evicted the entry since
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(path)
+        return topology
+
+    def store(self, params, topology: Topology):
+        arrays = {
+            "degrees": topology.degrees.astype(np.int32),
+            "edges": topology.edges.astype(np.int32),
+        }
+        if topology.rng_state is not None:
+            arrays.update(encode_rng_state(topology.rng_state))
+
+        # write to a temporary file first so readers never see partial entries
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(handle, "wb") as file:
+            np.savez_compressed(file, **arrays)
+        os.replace(temporary, self.path(params))
+        self.evict()
+
+    def evict(self):
+        # entries another process removed meanwhile are skipped
+        entries = []
+        for path in self.directory.glob("*.npz"):
+            with contextlib.suppress(FileNotFoundError):
+                entries.append((path.stat().st_mtime, path))
+        entries.sort()
+        for _, path in entries[: max(0, len(entries) - self.max_entries)]:
+            path.unlink(missing_ok=True)
+
+    def __len__(self):
+        return len(list(self.directory.glob("*.npz")))
+
+
+def encode_rng_state(state: tuple):
+    version, internal, gauss_next = state
+    return {
+        "rng_version": np.array([version]),
+        "rng_state": np.array(internal, dtype=np.uint64),
+        "rng_gauss_next": np.array([] if gauss_next is None else [gauss_next]),
+    }
+
+
+def decode_rng_state(data) -> tuple:
+    gauss_next = data["rng_gauss_next"]
+    return (
+        int(data["rng_version"][0]),
+        tuple(int(value) for value in data["rng_state"]),
+        float(gauss_next[0]) if len(gauss_next) else None,
+    )
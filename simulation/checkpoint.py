@@ -0,0 +1,215 @@
+from dataclasses import asdict
+import io
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from simulation.cache import (
+    Topology,
+    TopologyCache,
+    decode_rng_state,
+    encode_rng_state,
+)
+from simulation.simulation import Simulation, SimulationParameters
+from simulation.state import (
+    CAT_COUNTERS,
+    RELATIONSHIP_STATS,
+    BitSet,
+    Cat,
+    CatStats,
+    CatTraits,
+    Relationship,
+    RelationshipTraits,
+)
+
+NUMPY_GENERATORS = ("movement_rng", "engagement_rng", "graph_rng")
+
+
+def encode_members(sets: list[BitSet]):
+    """Flatten per-cat sets into CSR form, `(indptr, members)`."""
+    sizes = np.array([len(members) for members in sets], dtype=np.int64)
+    indptr = np.concatenate(([0], np.cumsum(sizes)))
+    members = np.fromiter(
+        (member for members in sets for member in members),
+        dtype=np.int64,
+        count=int(indptr[-1]),
+    )
+    return indptr, members
+
+
+def decode_members(indptr: np.ndarray, members: np.ndarray) -> list[BitSet]:
+    return [
+        BitSet(members[indptr[i] : indptr[i + 1]].tolist())
+        for i in range(len(indptr) - 1)
+    ]
+
+
+def checkpoint_arrays(sim: Simulation) -> dict[str, np.ndarray]:
+    topology = sim.export_topology()
+    table = sim.stats_table()
+    keys, values, relationship_stats = sim.relationship_arrays()
+    interacted_indptr, interacted_members = encode_members(table.interacted_with)
+    visited_indptr, visited_members = encode_members(table.nodes_visited)
+
+    arrays = {
+        "params": np.array(json.dumps(asdict(sim.params))),
+        "iteration": np.array(sim.iteration),
+        "converged_at": np.array(-1 if sim.converged_at is None else sim.converged_at),
+        "total_number_interactions": np.array(sim.stats.total_number_interactions),
+        "degrees": topology.degrees,
+        "edges": topology.edges,
+        "cat_home": np.array([cat.traits.home for cat in sim.cats], dtype=np.int64),
+        "cat_aggressive": np.array([cat.traits.aggressive for cat in sim.cats]),
+        "cat_lazy": np.array([cat.traits.lazy for cat in sim.cats]),
+        "cat_name": np.array([cat.traits.name for cat in sim.cats]),
+        "cat_current_node": np.array(
+            [-1 if cat.current_node is None else cat.current_node for cat in sim.cats],
+            dtype=np.int64,
+        ),
+        "cat_target_node": np.array(
+            [-1 if cat.target_node is None else cat.target_node for cat in sim.cats],
+            dtype=np.int64,
+        ),
+        "cat_needs_to_run": np.array([cat.needs_to_run for cat in sim.cats]),
+        "cat_time_at_current_node": np.array(
+            [cat.time_at_current_node for cat in sim.cats], dtype=np.int64
+        ),
+        "interacted_indptr": interacted_indptr,
+        "interacted_members": interacted_members,
+        "visited_indptr": visited_indptr,
+        "visited_members": visited_members,
+        "relationship_keys": keys,
+        "relationship_value": values,
+        "numpy_rng_states": np.array(
+            json.dumps(
+                {
+                    name: getattr(sim, name).bit_generator.state
+                    for name in NUMPY_GENERATORS
+                }
+            )
+        ),
+    }
+    arrays.update({f"counter_{name}": table.columns[name] for name in CAT_COUNTERS})
+    arrays.update(
+        {f"relationship_{name}": stats for name, stats in relationship_stats.items()}
+    )
+    if sim.convergence_reference is not None:
+        arrays["convergence_reference"] = sim.convergence_reference
+    arrays.update(encode_rng_state(sim.rng.getstate()))
+    return arrays
+
+
+def save_checkpoint(sim: Simulation, path):
+    """
+    Write the full state of a simulation between two iterations to `path`.
+
+    The checkpoint is a compressed `.npz` file holding the parameters, the node
+    graph, the cats and relationships with all their stats, the state of
+    every random generator and the iteration counter. It is written to a
+    temporary file first, so `path` always holds a complete checkpoint.
+    """
+    path = Path(path)
+    handle, temporary = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    with os.fdopen(handle, "wb") as file:
+        np.savez_compressed(file, **checkpoint_arrays(sim))
+    os.replace(temporary, path)
+
+
+def dump_checkpoint(sim: Simulation) -> bytes:
+    """The checkpoint `save_checkpoint` writes, as bytes."""
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **checkpoint_arrays(sim))
+    return buffer.getvalue()
+
+
+def load_checkpoint(source, topology_cache: Optional[TopologyCache] = None) -> Simulation:
+    """
+    Rebuild a checkpointed simulation, ready to `run` on.
+
+    `source` is a path or a binary file, `bytes` from `dump_checkpoint` are
+    read as well.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    with np.load(source) as data:
+        params = SimulationParameters(**json.loads(data["params"].item()))
+        sim = Simulation(params, topology_cache=topology_cache)
+        sim.iteration = int(data["iteration"])
+        converged_at = int(data["converged_at"])
+        sim.converged_at = None if converged_at < 0 else converged_at
+        if "convergence_reference" in data:
+            sim.convergence_reference = data["convergence_reference"]
+        sim.stats.total_number_interactions = int(data["total_number_interactions"])
+        sim.load_topology(Topology(degrees=data["degrees"], edges=data["edges"]))
+
+        interacted_with = decode_members(
+            data["interacted_indptr"], data["interacted_members"]
+        )
+        nodes_visited = decode_members(data["visited_indptr"], data["visited_members"])
+        counters = {name: data[f"counter_{name}"].tolist() for name in CAT_COUNTERS}
+        if sim.cat_stats is not None:
+            for name in CAT_COUNTERS:
+                sim.cat_stats.columns[name][:] = data[f"counter_{name}"]
+            sim.cat_stats.interacted_with = interacted_with
+            sim.cat_stats.nodes_visited = nodes_visited
+
+        for i, (home, aggressive, lazy, cat_name) in enumerate(
+            zip(
+                data["cat_home"].tolist(),
+                data["cat_aggressive"].tolist(),
+                data["cat_lazy"].tolist(),
+                data["cat_name"].tolist(),
+            )
+        ):
+            if sim.cat_stats is not None:
+                stats = sim.cat_stats.row(i)
+            else:
+                stats = CatStats(
+                    **{name: counters[name][i] for name in CAT_COUNTERS},
+                    interacted_with=interacted_with[i],
+                    nodes_visited=nodes_visited[i],
+                )
+            sim.home_cats.setdefault(home, []).append(i)
+            cat = Cat(
+                CatTraits(
+                    id=i, name=cat_name, home=home, aggressive=aggressive, lazy=lazy
+                ),
+                stats=stats,
+            )
+            current_node = data["cat_current_node"][i].item()
+            target_node = data["cat_target_node"][i].item()
+            cat.current_node = None if current_node < 0 else current_node
+            cat.target_node = None if target_node < 0 else target_node
+            cat.needs_to_run = bool(data["cat_needs_to_run"][i])
+            cat.time_at_current_node = data["cat_time_at_current_node"][i].item()
+            cat.occupancy = sim.occupancy
+            if cat.current_node is not None:
+                sim.occupancy.setdefault(cat.current_node, set()).add(i)
+            sim.cats.append(cat)
+
+        relationship_stats = {
+            name: data[f"relationship_{name}"].tolist() for name in RELATIONSHIP_STATS
+        }
+        for index, ((cat1, cat2), value) in enumerate(
+            zip(data["relationship_keys"].tolist(), data["relationship_value"].tolist())
+        ):
+            relationship = Relationship(RelationshipTraits(cat1=cat1, cat2=cat2))
+            relationship.value = value
+            for name in RELATIONSHIP_STATS:
+                setattr(relationship.stats, name, relationship_stats[name][index])
+            relationship.stats.interacted = bool(relationship.stats.interacted)
+            relationship.stats.number_of_sign_flips = int(
+                relationship.stats.number_of_sign_flips
+            )
+            sim.relationships[(cat1, cat2)] = relationship
+        sim.recount_metric_aggregates()
+
+        sim.rng.setstate(decode_rng_state(data))
+        for name, state in json.loads(data["numpy_rng_states"].item()).items():
+            getattr(sim, name).bit_generator.state = state
+
+    return sim
@@ -0,0 +1,167 @@
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, fields, replace
+import os
+from typing import Optional
+
+import numpy as np
+
+from simulation.batched import BatchedSimulation
+from simulation.cache import TopologyCache
+from simulation.metrics import extract_metrics
+from simulation.simulation import Simulation, SimulationMetrics, SimulationParameters
+
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+@dataclass
+class ReplicaResult:
+    seed: int
+    metrics: SimulationMetrics
+    # the full `extract_metrics` output, only kept when asked for
+    details: Optional[dict] = None
+
+
+@dataclass
+class MetricSummary:
+    mean: float
+    # sample variance, 0 for a single replica
+    variance: float
+    quantiles: dict[float, float]
+
+
+@dataclass
+class EnsembleResult:
+    # in the order of the seeds passed in
+    replicas: list[ReplicaResult]
+    summary: dict[str, MetricSummary]
+
+
+def run_replica(
+    params: SimulationParameters,
+    topology_cache: Optional[TopologyCache] = None,
+    detailed: bool = False,
+) -> ReplicaResult:
+    sim = Simulation(params, topology_cache=topology_cache)
+    sim.generate_initial_state()
+    sim.run()
+    return ReplicaResult(
+        seed=params.seed,
+        metrics=sim.metrics,
+        details=extract_metrics(sim) if detailed else None,
+    )
+
+
+def run_batch(
+    params: SimulationParameters,
+    seeds: list[int],
+    topology_cache: Optional[TopologyCache] = None,
+    detailed: bool = False,
+) -> list[ReplicaResult]:
+    batch = BatchedSimulation(params, seeds, topology_cache=topology_cache)
+    batch.generate_initial_state()
+    batch.run()
+    return [
+        ReplicaResult(
+            seed=sim.params.seed,
+            metrics=sim.metrics,
+            details=extract_metrics(sim) if detailed else None,
+        )
+        for sim in batch.simulations
+    ]
+
+
+def iter_ensemble(
+    params: SimulationParameters,
+    seeds: Iterable[int],
+    workers: Optional[int] = None,
+    topology_cache: Optional[TopologyCache] = None,
+    detailed: bool = False,
+    batched: bool = False,
+) -> Iterator[ReplicaResult]:
+    """
+    Run one replica of `params` per seed and yield the results as they finish.
+
+    Replicas are spread over a pool of `workers` processes (one per CPU by
+    default) that live for the whole ensemble, `workers=1` runs them one
+    after another in this process. With `batched` every worker advances its
+    share of the seeds together as one `BatchedSimulation` instead, whose
+    results depend on how the seeds are shared out.
+    """
+    all_params = [replace(params, seed=seed) for seed in seeds]
+    if not all_params:
+        raise ValueError("An ensemble needs at least one seed")
+
+    if batched:
+        seeds = [replica_params.seed for replica_params in all_params]
+        chunks = min(len(seeds), workers or os.cpu_count() or 1)
+        batches = [seeds[i::chunks] for i in range(chunks)]
+        if chunks == 1:
+            yield from run_batch(params, seeds, topology_cache, detailed)
+            return
+        with ProcessPoolExecutor(max_workers=chunks) as pool:
+            futures = [
+                pool.submit(run_batch, params, batch, topology_cache, detailed)
+                for batch in batches
+            ]
+            for future in as_completed(futures):
+                yield from future.result()
+        return
+
+    if workers == 1:
+        for replica_params in all_params:
+            yield run_replica(replica_params, topology_cache, detailed)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(run_replica, replica_params, topology_cache, detailed)
+            for replica_params in all_params
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def summarize(metrics: list[SimulationMetrics]) -> dict[str, MetricSummary]:
+    """Mean, variance and `QUANTILES` of every `SimulationMetrics` field."""
+    summary = {}
+    for field in fields(SimulationMetrics):
+        values = np.array([getattr(m, field.name) for m in metrics], dtype=float)
+        summary[field.name] = MetricSummary(
+            mean=float(values.mean()),
+            variance=float(values.var(ddof=1)) if len(values) > 1 else 0.0,
+            quantiles=dict(zip(QUANTILES, np.quantile(values, QUANTILES).tolist())),
+        )
+    return summary
+
+
+def run_ensemble(
+    params: SimulationParameters,
+    seeds: Iterable[int],
+    workers: Optional[int] = None,
+    topology_cache: Optional[TopologyCache] = None,
+    detailed: bool = False,
+    on_result: Optional[Callable[[ReplicaResult], None]] = None,
+    batched: bool = False,
+) -> EnsembleResult:
+    """
+    Run `params` once per seed and aggregate the `SimulationMetrics`.
+
+    `on_result` is called with every replica as soon as it finishes, see
+    `iter_ensemble` for how the replicas are scheduled.
+    """
+    seeds = list(seeds)
+    by_seed = {}
+    for result in iter_ensemble(
+        params, seeds, workers, topology_cache, detailed, batched
+    ):
+        by_seed[result.seed] = result
+        if on_result is not None:
+            on_result(result)
+
+    replicas = [by_seed[seed] for seed in seeds]
+    return EnsembleResult(
+        replicas=replicas,
+        summary=summarize([replica.metrics for replica in replicas]),
+    )
+
@@ -0,0 +1,224 @@
+from dataclasses import replace
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from simulation.cache import TopologyCache
+from simulation.checkpoint import dump_checkpoint, load_checkpoint
+from simulation.metrics import extract_metrics
+from simulation.simulation import Simulation
+from simulation.state import BEFRIEND, END, FIGHT, MOVE
+
+MAGIC = b"CATLOG1\n"
+HEADER_LENGTH = np.dtype("<u8")
+
+# one fixed-width record per event, `iteration` is the iteration it happened
+# in, counting from 1
+EVENT = np.dtype(
+    [("iteration", "<u4"), ("kind", "u1"), ("cat", "<i4"), ("other", "<i4")]
+)
+
+BUFFER_SIZE = 65536
+
+
+class EventLogWriter:
+    """
+    Compact binary log of everything that happens in a run, passed to
+    `Simulation.run`.
+
+    The log starts with a checkpoint of the simulation before its first
+    logged iteration, followed by one `EVENT` record per move, arrival and
+    interaction. Everything else in the model follows from those
+    deterministically, so `Replay` rebuilds the state at any iteration
+    without drawing a single random number.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.file = None
+        self.sim: Optional[Simulation] = None
+        self.buffer = np.empty(BUFFER_SIZE, dtype=EVENT)
+        self.size = 0
+
+    def start(self, sim: Simulation):
+        header = dump_checkpoint(sim)
+        self.sim = sim
+        self.file = self.path.open("wb")
+        self.file.write(MAGIC)
+        self.file.write(np.array(len(header), dtype=HEADER_LENGTH).tobytes())
+        self.file.write(header)
+
+    def record(self, kind: int, cat: int, other: int):
+        if self.size == BUFFER_SIZE:
+            self.flush()
+        self.buffer[self.size] = (self.sim.iteration + 1, kind, cat, other)
+        self.size += 1
+
+    def record_many(self, kind: int, cats: np.ndarray, others: np.ndarray):
+        if self.size + len(cats) > BUFFER_SIZE:
+            self.flush()
+        if len(cats) > BUFFER_SIZE:
+            self.write(self.records(kind, cats, others))
+            return
+        end = self.size + len(cats)
+        self.buffer["iteration"][self.size : end] = self.sim.iteration + 1
+        self.buffer["kind"][self.size : end] = kind
+        self.buffer["cat"][self.size : end] = cats
+        self.buffer["other"][self.size : end] = others
+        self.size = end
+
+    def records(self, kind: int, cats: np.ndarray, others: np.ndarray):
+        records = np.empty(len(cats), dtype=EVENT)
+        records["iteration"] = self.sim.iteration + 1
+        records["kind"] = kind
+        records["cat"] = cats
+        records["other"] = others
+        return records
+
+    def write(self, records: np.ndarray):
+        self.file.write(records.tobytes())
+
+    def flush(self):
+        self.write(self.buffer[: self.size])
+        self.size = 0
+        self.file.flush()
+
+    def finish(self, sim: Simulation):
+        end = np.array(
+            [(sim.iteration, END, sim.converged_at is not None, -1)], dtype=EVENT
+        )
+        self.flush()
+        self.write(end)
+        self.file.close()
+        self.file = None
+        self.sim = None
+
+
+def read_event_log(path) -> tuple[bytes, np.ndarray]:
+    """
+    The checkpoint and the events of a log.
+
+    The events are memory-mapped, a partly written last record of a log
+    that was cut off is left out.
+    """
+    path = Path(path)
+    with path.open("rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an event log")
+        length = int(np.frombuffer(file.read(HEADER_LENGTH.itemsize), HEADER_LENGTH)[0])
+        header = file.read(length)
+    offset = len(MAGIC) + HEADER_LENGTH.itemsize + length
+    count = (path.stat().st_size - offset) // EVENT.itemsize
+    if count == 0:
+        return header, np.empty(0, dtype=EVENT)
+    events = np.memmap(path, dtype=EVENT, mode="r", offset=offset, shape=(count,))
+    return header, events
+
+
+class Replay:
+    """
+    Rebuild the state of a logged run at any iteration from its event log.
+
+    The replayed simulation moves forward only, asking for an earlier
+    iteration starts over from the checkpoint at the start of the log.
+    """
+
+    def __init__(self, path, topology_cache: Optional[TopologyCache] = None):
+        self.header, self.events = read_event_log(path)
+        self.topology_cache = topology_cache
+        self.sim = load_checkpoint(self.header, topology_cache)
+        self.start = self.sim.iteration
+        self.converged = False
+        ends = np.flatnonzero(self.events["kind"] == END)
+        if len(ends):
+            self.end = int(self.events["iteration"][ends[0]])
+            self.converged = bool(self.events["cat"][ends[0]])
+            self.events = self.events[: ends[0]]
+        elif len(self.events):
+            # the log was cut off, maybe in the middle of its last iteration
+            self.end = max(self.start, int(self.events["iteration"][-1]) - 1)
+        else:
+            self.end = self.start
+        # events of iteration i are events[bounds[i - start - 1] : bounds[i - start]]
+        self.bounds = np.searchsorted(
+            self.events["iteration"], np.arange(self.start, self.end + 1), side="right"
+        )
+
+    def state_at(self, iteration: int) -> Simulation:
+        """The simulation after `iteration`, without its metrics."""
+        if not self.start <= iteration <= self.end:
+            raise ValueError(
+                f"The log covers iterations {self.start} to {self.end}, not {iteration}"
+            )
+        if iteration < self.sim.iteration:
+            self.sim = load_checkpoint(self.header, self.topology_cache)
+        while self.sim.iteration < iteration:
+            index = self.sim.iteration - self.start
+            events = self.events[self.bounds[index] : self.bounds[index + 1]]
+            replay_iteration(self.sim, events)
+        return self.sim
+
+    def metrics_at(self, iteration: int) -> dict:
+        """
+        The `extract_metrics` of the run as if it had stopped after
+        `iteration`, which has to be one of the run's iterations, not 0.
+        """
+        if iteration == 0:
+            raise ValueError("There are no metrics before the first iteration")
+        sim = self.state_at(iteration)
+        sim.params = replace(sim.params, iterations=iteration)
+        sim.converged_at = (
+            iteration if self.converged and iteration == self.end else None
+        )
+        sim.calculate_metrics()
+        return extract_metrics(sim)
+
+
+def replay_iteration(sim: Simulation, events: np.ndarray):
+    """Apply the events of the next iteration, see the movement and engagement steps."""
+    kinds = events["kind"]
+    moves = events[kinds == MOVE]
+    targets = dict(zip(moves["cat"].tolist(), moves["other"].tolist()))
+
+    for cat in sim.cats:
+        if cat.is_on_the_edge():
+            cat.arrive()
+            cat.stats.iter_on_edge += 1
+        else:
+            cat.time_at_current_node += 1
+            moved = cat.traits.id in targets
+            if cat.is_at_home():
+                cat.stats.iter_at_home += 1
+                cat.stats.times_at_home += moved
+            elif sim.is_neutral_node(cat.current_node, cat.traits.id):
+                cat.stats.iter_at_neutral += 1
+                cat.stats.times_at_neutral += moved
+            else:
+                cat.stats.iter_at_friendly += 1
+                cat.stats.times_at_friendly += moved
+        cat.needs_to_run = False
+    for cat_id, node_id in targets.items():
+        sim.cats[cat_id].leave(node_id)
+
+    # both engagement engines count every cat on a node as asleep, engaged
+    # or not
+    for cat_ids in sim.occupancy.values():
+        for cat_id in cat_ids:
+            sim.cats[cat_id].stats.sleeps += 1
+
+    # the outcome of an interaction follows from the state, it is recomputed
+    # by the model and only checked against the log
+    interactions = events[(kinds == FIGHT) | (kinds == BEFRIEND)]
+    for kind, c1, c2 in zip(
+        interactions["kind"].tolist(),
+        interactions["cat"].tolist(),
+        interactions["other"].tolist(),
+    ):
+        if sim.interact(c1, c2) != kind:
+            raise ValueError(
+                f"Interaction of cats {c1} and {c2} in iteration "
+                f"{sim.iteration + 1} does not match the log"
+            )
+
+    sim.iteration += 1
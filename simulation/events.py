@@ -0,0 +1,250 @@
+from bisect import bisect_right
+import heapq
+from itertools import accumulate
+from typing import Optional
+
+import numpy as np
+
+from simulation.cache import TopologyCache
+from simulation.simulation import Simulation, SimulationParameters
+
+# decisions of a waiting cat drawn one by one, then in batches doubling in size
+SCALAR_TRIALS = 8
+FIRST_BATCH = 16
+MAX_BATCH = 65536
+
+
+class EventDrivenSimulation:
+    """
+    Runs the python engines' model by jumping from event to event.
+
+    Most iterations of a sparse world change nothing but counters: a cat
+    alone on a node stays or leaves with the same chances every iteration as
+    long as no cat arrives at or leaves its node or a neighbouring one. Such
+    a cat gets the iteration it leaves at and where to drawn up front, as
+    a run of per-iteration decisions that ends at the first move, kept in a
+    priority queue. A cat whose surroundings change has the rest of its run
+    drawn anew, which gives the same distribution as the iterations are
+    independent. Cats sharing a node decide and engage every iteration as in
+    `Simulation`, and counters are settled when a cat leaves a node.
+
+    Like the numpy engines, all cats decide on the positions at the start
+    of an iteration. The result is statistically equivalent to the python
+    engines but does not reproduce a run with the same seed draw for draw.
+    Work grows with the number of moves and encounters instead of
+    iterations times cats.
+    """
+
+    def __init__(
+        self,
+        params: SimulationParameters,
+        topology_cache: Optional[TopologyCache] = None,
+    ):
+        if params.movement_engine != "python" or params.engagement_engine != "python":
+            raise ValueError("The event driven engine replaces the python engines")
+        self.simulation = Simulation(params, topology_cache=topology_cache)
+        self.params = params
+        # decisions of waiting cats are drawn in batches from this generator
+        self.rng = self.simulation.movement_rng
+
+        self.queue: list[tuple[int, int, int]] = []
+        self.generation: list[int] = []
+        # cat id -> (iteration, node) of its next move, for waiting cats
+        self.scheduled: dict[int, tuple[int, int]] = {}
+        # cat id -> first iteration it is on its node after moving, and the
+        # first iteration it decides there
+        self.since: list[int] = []
+        self.decides_from: list[int] = []
+        # cats that left in the previous iteration
+        self.walking: list[int] = []
+
+    def generate_initial_state(self):
+        sim = self.simulation
+        sim.generate_initial_state()
+        self.generation = [0] * len(sim.cats)
+        self.since = [0] * len(sim.cats)
+        self.decides_from = [0] * len(sim.cats)
+        for cat in sim.cats:
+            self.schedule(cat, 0)
+
+    def crowded(self, cat) -> bool:
+        return len(self.simulation.occupancy[cat.current_node]) > 1
+
+    def schedule(self, cat, start: int):
+        """Draw when and where `cat` leaves, deciding from `start` on alone."""
+        cat_id = cat.traits.id
+        self.generation[cat_id] += 1
+        self.scheduled.pop(cat_id, None)
+        if self.crowded(cat):
+            return
+        move = self.draw_move(cat, start)
+        if move is not None:
+            self.scheduled[cat_id] = move
+            heapq.heappush(self.queue, (move[0], self.generation[cat_id], cat_id))
+
+    def draw_move(self, cat, start: int):
+        """
+        The iteration from `start` on in which `cat` first moves and the node
+        it moves to, `None` when it stays until the end of the run.
+
+        Draws the decisions of `Simulation.choose_move` for the chances of the
+        cat computed once, in numpy batches that grow once it keeps staying.
+        """
+        _, means, stay = self.simulation.movement_means(cat)
+        nodes = list(means)
+        node_means = list(means.values())
+        if not any(mean > 0 for mean in node_means):
+            return None
+
+        random = self.simulation.rng.random
+        end = self.params.iterations
+        for iteration in range(start, min(start + SCALAR_TRIALS, end)):
+            cumulative = list(
+                accumulate(
+                    max(0, min(mean * (0.9 + 0.2 * random()), 1)) for mean in node_means
+                )
+            )
+            stay_weight = max(0, min(stay * (0.9 + 0.2 * random()), 1))
+            draw = random() * (cumulative[-1] + stay_weight)
+            if draw < cumulative[-1]:
+                return iteration, nodes[bisect_right(cumulative, draw)]
+
+        node_means = np.array(node_means, dtype=np.float64)
+        iteration = start + SCALAR_TRIALS
+        batch = FIRST_BATCH
+        while iteration < end:
+            size = min(batch, end - iteration)
+            noise = self.rng.uniform(0.9, 1.1, (size, len(nodes) + 1))
+            weights = np.clip(noise[:, :-1] * node_means, 0, 1)
+            stay_weight = np.clip(noise[:, -1] * stay, 0, 1)
+            cumulative = np.cumsum(weights, axis=1)
+            draw = self.rng.random(size) * (cumulative[:, -1] + stay_weight)
+            moves = np.flatnonzero(draw < cumulative[:, -1])
+            if len(moves):
+                first = moves[0]
+                choice = np.searchsorted(cumulative[first], draw[first], side="right")
+                return iteration + int(first), nodes[choice]
+            iteration += size
+            batch = min(batch * 2, MAX_BATCH)
+        return None
+
+    def settle(self, cat, end: int, moved: bool):
+        """Count the iterations `cat` spent on its node up to `end`."""
+        sim = self.simulation
+        cat_id = cat.traits.id
+        decisions = end - self.decides_from[cat_id]
+        cat.time_at_current_node += decisions
+        cat.stats.sleeps += end - self.since[cat_id] - moved
+        if cat.is_at_home():
+            cat.stats.iter_at_home += decisions
+            cat.stats.times_at_home += moved
+        elif sim.is_neutral_node(cat.current_node, cat_id):
+            cat.stats.iter_at_neutral += decisions
+            cat.stats.times_at_neutral += moved
+        else:
+            cat.stats.iter_at_friendly += decisions
+            cat.stats.times_at_friendly += moved
+
+    def next_iteration(self, iteration: int) -> int:
+        """The next iteration from `iteration` on in which something happens."""
+        sim = self.simulation
+        if self.walking or any(len(cats) > 1 for cats in sim.occupancy.values()):
+            return iteration
+        while self.queue:
+            when, generation, cat_id = self.queue[0]
+            if generation == self.generation[cat_id]:
+                return when
+            heapq.heappop(self.queue)
+        return self.params.iterations
+
+    def step(self, iteration: int):
+        sim = self.simulation
+        moves = {}
+        # cats sharing a node decide every iteration, on the positions at its
+        # start
+        deciding = [
+            cat_id
+            for cat_ids in sim.occupancy.values()
+            if len(cat_ids) > 1
+            for cat_id in sorted(cat_ids)
+        ]
+        for cat_id in deciding:
+            source = sim.choose_move(sim.cats[cat_id])
+            if source != "stay":
+                moves[cat_id] = source
+        # outdated entries can be left before the iteration
+        while self.queue and self.queue[0][0] <= iteration:
+            _, generation, cat_id = heapq.heappop(self.queue)
+            if generation == self.generation[cat_id]:
+                moves[cat_id] = self.scheduled.pop(cat_id)[1]
+
+        changed = set()
+        arrived = self.walking
+        for cat_id in arrived:
+            cat = sim.cats[cat_id]
+            cat.arrive()
+            cat.stats.iter_on_edge += 1
+            self.since[cat_id] = iteration
+            self.decides_from[cat_id] = iteration + 1
+            changed.add(cat.current_node)
+        for cat_id, node_id in moves.items():
+            cat = sim.cats[cat_id]
+            self.settle(cat, iteration + 1, moved=True)
+            changed.add(cat.current_node)
+            cat.leave(node_id)
+        for cat_id in deciding:
+            sim.cats[cat_id].needs_to_run = False
+        self.walking = list(moves)
+
+        crowded = sorted(
+            node_id for node_id, cat_ids in sim.occupancy.items() if len(cat_ids) > 1
+        )
+        for c1, c2 in sim.encounters(crowded):
+            sim.interact(c1, c2)
+
+        # everyone whose chances to stay or move may have changed, the
+        # interactions only change those of cats sharing a node
+        affected = set(arrived)
+        for node_id in changed:
+            affected.update(sim.occupancy.get(node_id, ()))
+            for neighbour in sim.adjacency[node_id]:
+                affected.update(sim.occupancy.get(neighbour, ()))
+        for cat_id in sorted(affected):
+            if cat_id not in moves:
+                self.schedule(sim.cats[cat_id], iteration + 1)
+
+    def finish(self, end: int):
+        sim = self.simulation
+        for cat in sim.cats:
+            if cat.is_on_the_edge():
+                continue
+            self.settle(cat, end, moved=False)
+        sim.iteration = end
+        sim.calculate_metrics()
+
+    def run(self):
+        sim = self.simulation
+        window = self.params.convergence_window
+        if window:
+            sim.convergence_reference = sim.relationship_values()
+        iteration = 0
+        end = self.params.iterations
+        while iteration < end:
+            following = self.next_iteration(iteration)
+            if window:
+                # the state is unchanged up to the next event, check there
+                check = (iteration // window + 1) * window
+                while check <= min(following, end):
+                    if sim.check_convergence():
+                        sim.converged_at = end = check
+                        break
+                    check += window
+                if sim.converged_at is not None:
+                    break
+            if following >= end:
+                break
+            self.step(following)
+            iteration = following + 1
+            if window and iteration % window == 0 and sim.check_convergence():
+                sim.converged_at = end = iteration
+        self.finish(end)
@@ -0,0 +1,53 @@
+import networkx as nx
+
+
+def greedy_clique_cover(G: nx.Graph):
+    """
+    Partition the graph into cliques, largest first, in O(V * d^2).
+
+    Starting from the best connected node left, each clique greedily adds the
+    candidate adjacent to most of the remaining candidates.
+    """
+    remaining = set(G.nodes)
+    groups = []
+    for node in sorted(G.nodes, key=lambda n: (-G.degree(n), n)):
+        if node not in remaining:
+            continue
+        clique = [node]
+        candidates = set(G[node]) & remaining
+        while candidates:
+            best = max(candidates, key=lambda n: (len(candidates & set(G[n])), -n))
+            clique.append(best)
+            candidates &= set(G[best])
+        remaining.difference_update(clique)
+        groups.append(clique)
+    return groups
+
+
+def find_friendgroups(G: nx.Graph, mode: str = "auto", clique_budget: int = 10000):
+    """
+    Friend groups (of three or more cats) in the friendship graph.
+
+    - `exact`: all maximal cliques, exponential in the worst case
+    - `auto`: maximal cliques while there are at most `clique_budget` of
+      them, otherwise a greedy clique cover
+    - `greedy`: a greedy clique cover, each cat is in at most one group
+    - `components`: connected components
+    """
+    if mode == "exact":
+        groups = list(nx.find_cliques(G))
+    elif mode == "auto":
+        groups = []
+        for clique in nx.find_cliques(G):
+            if len(groups) >= clique_budget:
+                groups = greedy_clique_cover(G)
+                break
+            groups.append(clique)
+    elif mode == "greedy":
+        groups = greedy_clique_cover(G)
+    elif mode == "components":
+        groups = [list(component) for component in nx.connected_components(G)]
+    else:
+        raise ValueError(f"Unknown friend group mode '{mode}'")
+
+    return [group for group in groups if len(group) > 2]
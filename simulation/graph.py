@@ -0,0 +1,44 @@
+import numpy as np
+
+
+def generate_graph(
+    node_amount: int, mean_edges: float, var_edges: float, rng: np.random.Generator
+):
+    """
+    Random connected graph with a normally distributed degree sequence.
+
+    A random recursive tree makes the graph connected, the stubs each node
+    still misses on its drawn degree are then paired up at random
+    (configuration model), dropping self-loops and multi-edges. Runs in
+    O(E log E), so 100k node graphs take well under a second.
+
+    Returns the drawn degree of every node and an `(E, 2)` array of edges.
+    """
+    degrees = np.maximum(
+        1,
+        np.round(
+            np.minimum(
+                rng.normal(mean_edges, var_edges**0.5, node_amount), node_amount - 1
+            )
+        ),
+    ).astype(np.int64)
+
+    # every node after the first attaches to a uniformly chosen earlier one
+    order = rng.permutation(node_amount)
+    parents = order[
+        (rng.random(node_amount - 1) * np.arange(1, node_amount)).astype(np.int64)
+    ]
+    tree = np.column_stack((parents, order[1:]))
+
+    missing = degrees - np.bincount(tree.ravel(), minlength=node_amount)
+    stubs = np.repeat(np.arange(node_amount), np.maximum(0, missing))
+    rng.shuffle(stubs)
+    extra = stubs[: len(stubs) // 2 * 2].reshape(-1, 2)
+    extra = extra[extra[:, 0] != extra[:, 1]]
+
+    edges = np.concatenate((tree, extra))
+    low = edges.min(axis=1)
+    high = edges.max(axis=1)
+    # keep the first occurrence of every node pair, tree edges come first
+    _, first = np.unique(low * node_amount + high, return_index=True)
+    return degrees, edges[np.sort(first)]
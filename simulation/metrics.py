@@ -3,9 +3,28 @@ from simulation.simulation import Simulation
 
 
 def extract_metrics(sim:Simulation):
-     
-    cat_metrics = [{'id': cat.traits.id, 'traits': asdict(cat.traits), **(asdict(cat.metrics) if cat.metrics else {})} for cat in sim.cats]
-    rel_metrics = [{'key':(rel.traits.cat1,rel.traits.cat2),'value':rel.value,**(asdict(rel.metrics) if rel.metrics else {})} for rel in sim.relationships.values()]
+    columns = sim.metric_columns
+    if columns is None:
+        cat_metrics = [{'id': cat.traits.id, 'traits': asdict(cat.traits)} for cat in sim.cats]
+        rel_metrics = [{'key':(rel.traits.cat1,rel.traits.cat2),'value':rel.value} for rel in sim.relationships.values()]
+        return {
+            'cats': cat_metrics,
+            'relationships': rel_metrics,
+            'simulation': {}
+        }
+
+    # built straight from the metric columns, one dict per row
+    cat_names = list(columns.cats)
+    cat_rows = list(zip(*(column.tolist() for column in columns.cats.values())))
+    cat_metrics = [{'id': cat.traits.id, 'traits': asdict(cat.traits), **dict(zip(cat_names, cat_rows[cat.traits.id]))} for cat in sim.cats]
+
+    rel_names = list(columns.relationships)
+    rel_rows = zip(
+        columns.relationship_keys.tolist(),
+        columns.relationship_values.tolist(),
+        *(column.tolist() for column in columns.relationships.values()),
+    )
+    rel_metrics = [{'key':(cat1,cat2),'value':value,**dict(zip(rel_names, row))} for (cat1, cat2), value, *row in rel_rows]
     sim_metrics = asdict(sim.metrics) if sim.metrics else {}
 
     return {
@@ -13,4 +32,3 @@ def extract_metrics(sim:Simulation):
         'relationships': rel_metrics,
         'simulation': sim_metrics
     }
-
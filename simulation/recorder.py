@@ -0,0 +1,119 @@
+from collections.abc import Callable, Iterable
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from simulation.simulation import Simulation
+
+
+def node_occupancy(sim: Simulation) -> np.ndarray:
+    """Number of cats on every node, cats on an edge are not counted."""
+    counts = np.zeros(len(sim.nodes), dtype=np.int32)
+    for node_id, cats in sim.occupancy.items():
+        counts[node_id] = len(cats)
+    return counts
+
+
+# name -> (width of a sample, dtype, function taking a sample)
+SERIES: dict[str, tuple[Callable[[Simulation], int], type, Callable]] = {
+    "relationship_values": (
+        lambda sim: len(sim.relationships),
+        np.float64,
+        Simulation.relationship_values,
+    ),
+    "occupancy": (lambda sim: len(sim.nodes), np.int32, node_occupancy),
+}
+# series with one number per sample, kept by the recorder itself
+SCALAR_SERIES = ("interactions",)
+
+
+class TimeSeriesRecorder:
+    """
+    Per-iteration series of a run, passed to `Simulation.run`.
+
+    Every `stride` iterations one sample of each of the `series` is taken:
+
+    - `relationship_values`: the value of every relationship, in insertion
+      order
+    - `occupancy`: the number of cats on every node
+    - `interactions`: the interactions since the previous sample, so no
+      interaction is lost to the stride
+
+    The arrays for all samples of the run are allocated when it starts, so
+    memory does not grow while it runs. With a `directory` they are `.npy`
+    files memory-mapped from there instead, which keeps long runs of large
+    worlds out of memory and can be read back with `np.load`. Rows after
+    the last sample of a run that converged early have iteration -1 there.
+    """
+
+    def __init__(
+        self,
+        series: Iterable[str] = ("relationship_values", "occupancy", "interactions"),
+        stride: int = 1,
+        directory=None,
+    ):
+        self.names = list(series)
+        for name in self.names:
+            if name not in SERIES and name not in SCALAR_SERIES:
+                raise ValueError(f"Unknown series '{name}'")
+        if stride <= 0:
+            raise ValueError("stride must be greater than 0")
+        self.stride = stride
+        self.directory = None if directory is None else Path(directory)
+        self.samples = 0
+        self.iterations: Optional[np.ndarray] = None
+        self.buffers: dict[str, np.ndarray] = {}
+        self.last_interactions = 0
+
+    def allocate(self, name: str, shape: tuple, dtype) -> np.ndarray:
+        if self.directory is None:
+            return np.zeros(shape, dtype=dtype)
+        return np.lib.format.open_memmap(
+            self.directory / f"{name}.npy", mode="w+", dtype=dtype, shape=shape
+        )
+
+    def start(self, sim: Simulation):
+        """Allocate room for the samples of the iterations `sim` has left."""
+        capacity = sim.params.iterations // self.stride - sim.iteration // self.stride
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self.samples = 0
+        self.iterations = self.allocate("iterations", (capacity,), np.int64)
+        self.iterations[:] = -1
+        self.buffers = {}
+        for name in self.names:
+            if name in SCALAR_SERIES:
+                self.buffers[name] = self.allocate(name, (capacity,), np.int64)
+            else:
+                width, dtype, _ = SERIES[name]
+                self.buffers[name] = self.allocate(name, (capacity, width(sim)), dtype)
+        self.last_interactions = sim.stats.total_number_interactions
+
+    def record(self, sim: Simulation):
+        """Take a sample after an iteration, if it is one of every `stride`."""
+        if sim.iteration % self.stride or self.samples == len(self.iterations):
+            return
+        row = self.samples
+        self.iterations[row] = sim.iteration
+        for name, buffer in self.buffers.items():
+            if name == "interactions":
+                total = sim.stats.total_number_interactions
+                buffer[row] = total - self.last_interactions
+                self.last_interactions = total
+            else:
+                buffer[row] = SERIES[name][2](sim)
+        self.samples += 1
+
+    def finish(self, sim: Simulation):
+        if self.directory is None:
+            return
+        self.iterations.flush()
+        for buffer in self.buffers.values():
+            buffer.flush()
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """The samples of a series, one row per recorded iteration."""
+        if name == "iterations":
+            return self.iterations[: self.samples]
+        return self.buffers[name][: self.samples]
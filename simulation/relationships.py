@@ -0,0 +1,141 @@
+from collections.abc import Iterator, MutableMapping
+from typing import Optional
+
+import numpy as np
+
+from simulation.state import (
+    RELATIONSHIP_STATS,
+    Relationship,
+    RelationshipMetrics,
+    RelationshipTraits,
+)
+
+
+class MatrixField:
+    """Exposes one cell of a `RelationshipMatrix` array as a plain attribute."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return getattr(obj.matrix, self.name)[obj.index].item()
+
+    def __set__(self, obj, value):
+        getattr(obj.matrix, self.name)[obj.index] = value
+
+
+class MatrixRelationshipStats:
+    __slots__ = ("matrix", "index")
+
+    absolute_delta = MatrixField()
+    min_value = MatrixField()
+    max_value = MatrixField()
+    number_of_sign_flips = MatrixField()
+    interacted = MatrixField()
+
+    def __init__(self, matrix: "RelationshipMatrix", index: tuple[int, int]):
+        self.matrix = matrix
+        self.index = index
+
+
+class MatrixRelationship(Relationship):
+    """A `Relationship` whose value and stats live in a `RelationshipMatrix`."""
+
+    __slots__ = ("matrix", "index")
+
+    def __init__(self, matrix: "RelationshipMatrix", traits: RelationshipTraits):
+        self.traits = traits
+        self.matrix = matrix
+        self.index = (traits.cat1, traits.cat2)
+        self.stats = MatrixRelationshipStats(matrix, self.index)  # type: ignore[assignment]
+
+    @property  # type: ignore[override]
+    def metrics(self) -> Optional[RelationshipMetrics]:
+        return self.matrix.metrics_of(self.index)
+
+    @property  # type: ignore[override]
+    def value(self):
+        return self.matrix.value[self.index].item()
+
+    @value.setter
+    def value(self, value):
+        self.matrix.value[self.traits.cat1, self.traits.cat2] = value
+        self.matrix.value[self.traits.cat2, self.traits.cat1] = value
+
+
+class RelationshipMatrix(MutableMapping):
+    """
+    Array backed relationship store.
+
+    Values are kept in a symmetric `cat_amount x cat_amount` matrix, the
+    `RelationshipStats` fields in parallel arrays indexed by `(cat1, cat2)`
+    with `cat1 < cat2`. It behaves like the `dict[tuple[int, int],
+    Relationship]` used by default, handing out `MatrixRelationship` views.
+    """
+
+    def __init__(self, cat_amount: int):
+        shape = (cat_amount, cat_amount)
+        self.value = np.zeros(shape)
+        self.absolute_delta = np.zeros(shape)
+        self.min_value = np.zeros(shape)
+        self.max_value = np.zeros(shape)
+        self.number_of_sign_flips = np.zeros(shape, dtype=np.int64)
+        self.interacted = np.zeros(shape, dtype=bool)
+
+        self.views: dict[tuple[int, int], MatrixRelationship] = {}
+        # set by `Simulation.calculate_metrics`, the metrics of the views are
+        # derived from the stats arrays instead of being stored per view
+        self.metrics_iterations: Optional[int] = None
+
+    def __getitem__(self, key: tuple[int, int]) -> MatrixRelationship:
+        return self.views[key]
+
+    def __setitem__(self, key: tuple[int, int], relationship: Relationship):
+        cat1, cat2 = key
+        if cat1 >= cat2:
+            raise ValueError("Relationship keys must be sorted cat id pairs")
+        view = MatrixRelationship(self, RelationshipTraits(cat1=cat1, cat2=cat2))
+        view.value = relationship.value
+        stats = relationship.stats
+        view.stats.absolute_delta = stats.absolute_delta
+        view.stats.min_value = stats.min_value
+        view.stats.max_value = stats.max_value
+        view.stats.number_of_sign_flips = stats.number_of_sign_flips
+        view.stats.interacted = stats.interacted
+        self.views[key] = view
+
+    def __delitem__(self, key: tuple[int, int]):
+        del self.views[key]
+        self.value[key] = self.value[key[::-1]] = 0
+        for name in RELATIONSHIP_STATS:
+            getattr(self, name)[key] = 0
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        return iter(self.views)
+
+    def __len__(self) -> int:
+        return len(self.views)
+
+    def values(self):  # type: ignore[override]
+        return self.views.values()
+
+    def items(self):  # type: ignore[override]
+        return self.views.items()
+
+    def key_array(self) -> np.ndarray:
+        """The keys as an `(R, 2)` array, in insertion order."""
+        return np.array(list(self.views), dtype=np.int64).reshape(-1, 2)
+
+    def metrics_of(self, index: tuple[int, int]) -> Optional[RelationshipMetrics]:
+        if self.metrics_iterations is None:
+            return None
+        absolute_delta = self.absolute_delta[index].item()
+        return RelationshipMetrics(
+            stability=1 / (1 + absolute_delta),
+            volatility=absolute_delta / self.metrics_iterations,
+            min_value=self.min_value[index].item(),
+            max_value=self.max_value[index].item(),
+            number_of_sign_flips=self.number_of_sign_flips[index].item(),
+        )
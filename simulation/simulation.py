@@ -1,18 +1,41 @@
+from collections.abc import Callable, MutableMapping
 from dataclasses import dataclass
 import math
-from typing import Optional
+from operator import attrgetter
+from typing import TYPE_CHECKING, Optional
+from simulation.cache import Topology, TopologyCache
+from simulation.friendgroups import find_friendgroups
+from simulation.graph import generate_graph
+from simulation.relationships import RelationshipMatrix
+from simulation.vectorized import (
+    CatArrays,
+    build_csr,
+    choose_in_segments,
+    expand_rows,
+)
 from simulation.state import (
+    ARRIVE,
+    BEFRIEND,
+    FIGHT,
+    MOVE,
     Cat,
     CatMetrics,
+    CatStatsTable,
     CatTraits,
     Edge,
     Node,
+    RELATIONSHIP_STATS,
     Relationship,
     RelationshipMetrics,
     RelationshipTraits,
 )
 import random
 import networkx as nx
+import numpy as np
+
+if TYPE_CHECKING:
+    from simulation.eventlog import EventLogWriter
+    from simulation.recorder import TimeSeriesRecorder
 
 lazy_weight = 0.1
 relationship_weight = 0.2
@@ -24,6 +47,23 @@ def safe_log(x):
     return math.log(x)
 
 
+def xlogx(x):
+    """Elementwise x * safe_log(x)."""
+    positive = x > 0
+    return np.where(positive, x * np.log(np.where(positive, x, 1)), 0.0)
+
+
+def ratio(numerator, denominator):
+    """Elementwise numerator / denominator, 0 where the denominator is 0."""
+    numerator = np.asarray(numerator, dtype=np.float64)
+    return np.divide(
+        numerator,
+        denominator,
+        out=np.zeros_like(numerator),
+        where=np.asarray(denominator) != 0,
+    )
+
+
 @dataclass
 class SimulationMetrics:
     friendgroups_total: int
@@ -32,6 +72,21 @@ class SimulationMetrics:
     isolated_cats_count: int
     mean_relationship_value: float
     interaction_density: float
+    # fewer than params.iterations when the run converged early
+    iterations_run: int
+    converged: bool
+
+
+@dataclass
+class MetricColumns:
+    """Per-cat and per-relationship metrics, one array per metrics field."""
+
+    # indexed by cat id
+    cats: dict[str, np.ndarray]
+    # `(R, 2)` cat id pairs and the values, in relationship insertion order
+    relationship_keys: np.ndarray
+    relationship_values: np.ndarray
+    relationships: dict[str, np.ndarray]
 
 
 @dataclass(frozen=True)
@@ -46,56 +101,150 @@ class SimulationParameters:
     var_aggressive: float = 0.1
     mean_laziness: float = 0.5
     var_laziness: float = 0.05
+    relationship_store: str = "dict"
+    movement_engine: str = "python"
+    engagement_engine: str = "python"
+    graph_generator: str = "legacy"
+    friendgroup_mode: str = "auto"
+    clique_budget: int = 10000
+    # check for convergence every convergence_window iterations, 0 disables it
+    convergence_window: int = 0
+    convergence_threshold: float = 0.001
 
     def __post_init__(self):
         if self.iterations <= 0:
             raise ValueError("iterations must be greater than 0")
+        if self.seed < 0:
+            raise ValueError("seed must not be negative")
+        if self.relationship_store not in ("dict", "matrix"):
+            raise ValueError("relationship_store must be 'dict' or 'matrix'")
+        if self.movement_engine not in ("python", "numpy"):
+            raise ValueError("movement_engine must be 'python' or 'numpy'")
+        if self.movement_engine == "numpy" and self.relationship_store != "matrix":
+            raise ValueError(
+                "The numpy movement engine needs the matrix relationship store"
+            )
+        if self.graph_generator not in ("legacy", "fast"):
+            raise ValueError("graph_generator must be 'legacy' or 'fast'")
+        if self.friendgroup_mode not in ("auto", "exact", "greedy", "components"):
+            raise ValueError(
+                "friendgroup_mode must be 'auto', 'exact', 'greedy' or 'components'"
+            )
+        if self.clique_budget <= 0:
+            raise ValueError("clique_budget must be greater than 0")
+        if self.convergence_window < 0:
+            raise ValueError("convergence_window must not be negative")
+        if self.convergence_threshold < 0:
+            raise ValueError("convergence_threshold must not be negative")
+        if self.engagement_engine not in ("python", "numpy"):
+            raise ValueError("engagement_engine must be 'python' or 'numpy'")
+        if self.engagement_engine == "numpy" and self.relationship_store != "matrix":
+            raise ValueError(
+                "The numpy engagement engine needs the matrix relationship store"
+            )
 
 
 @dataclass
 class SimulationStats:
     total_number_interactions: int = 0
+    # running aggregates of the relationships for `metrics_snapshot`, values
+    # only change through interactions, so the sum over all relationships is
+    # the sum over those that interacted
+    interacted_relationships: int = 0
+    relationship_value_sum: float = 0.0
 
 
 class Simulation:
-    def __init__(self, params: SimulationParameters):
+    def __init__(
+        self,
+        params: SimulationParameters,
+        topology_cache: Optional[TopologyCache] = None,
+    ):
         self.params = params
+        self.topology_cache = topology_cache
 
-        random.seed(self.params.seed)
+        # scalar draws of the python engines, same sequence as the global
+        # generator seeded with params.seed used to produce
+        self.rng = random.Random(self.params.seed)
+        # independent child streams for the batched draws of the numpy engines
+        self.seed_sequence = np.random.SeedSequence(self.params.seed)
+        self.movement_rng = self.spawn_rng()
+        self.engagement_rng = self.spawn_rng()
+        self.graph_rng = self.spawn_rng()
 
         self.cats: list[Cat] = []
-        self.relationships: dict[tuple[int, int], Relationship] = {}
+        self.relationships: MutableMapping[tuple[int, int], Relationship]
+        if self.params.relationship_store == "matrix":
+            self.relationships = RelationshipMatrix(self.params.cat_amount)
+        else:
+            self.relationships = {}
         self.edges: list[Edge] = []
         self.nodes: list[Node] = []
+        # node id -> neighbour ids / incident edges, in edge insertion order
+        self.adjacency: dict[int, list[int]] = {}
+        self.incident_edges: dict[int, list[Edge]] = {}
+        # node id -> ids of cats currently on it, only occupied nodes are kept
+        self.occupancy: dict[int, set[int]] = {}
+        # node id -> ids of cats living there (traits are frozen)
+        self.home_cats: dict[int, list[int]] = {}
+        # cat id -> nodes it may not enter, dropped when a relationship flips sign
+        self.forbidden_nodes: dict[int, set[int]] = {}
         self.stats = SimulationStats()
+        # the numpy engines keep per-cat counters in columns, the python
+        # engines in plain CatStats objects that are cheaper to increment
+        self.cat_stats: Optional[CatStatsTable] = None
+        if "numpy" in (self.params.movement_engine, self.params.engagement_engine):
+            self.cat_stats = CatStatsTable(self.params.cat_amount)
 
+        # number of finished iterations, `run` continues from here
+        self.iteration = 0
+        self.converged_at: Optional[int] = None
+        # relationship values at the last convergence check
+        self.convergence_reference: Optional[np.ndarray] = None
         self.metrics: Optional[SimulationMetrics] = None
+        # friend groups of the last snapshot, dropped when a friendship starts
+        # or ends
+        self.snapshot_friendgroups: Optional[list] = None
+        self.metric_columns: Optional[MetricColumns] = None
+        # built from the initial state on first use by the numpy engines
+        self.adjacency_csr: Optional[tuple[np.ndarray, np.ndarray]] = None
+        self.cat_arrays: Optional[CatArrays] = None
+        # set by `run` while it writes an event log
+        self.event_log: Optional["EventLogWriter"] = None
+
+    def spawn_rng(self):
+        """A new numpy generator, independent of all previously spawned ones."""
+        return np.random.default_rng(self.seed_sequence.spawn(1)[0])
+
+    def add_node(self, node: Node):
+        self.nodes.append(node)
+        self.adjacency[node.id] = []
+        self.incident_edges[node.id] = []
+
+    def add_edge(self, edge: Edge):
+        self.edges.append(edge)
+        self.adjacency[edge.node1].append(edge.node2)
+        self.incident_edges[edge.node1].append(edge)
+        if edge.node1 != edge.node2:
+            self.adjacency[edge.node2].append(edge.node1)
+            self.incident_edges[edge.node2].append(edge)
 
     def get_node(self, node_id: int):
-        for node in self.nodes:
-            if node.id == node_id:
-                return node
+        # nodes are generated with ids matching their position
+        if 0 <= node_id < len(self.nodes):
+            return self.nodes[node_id]
 
     def get_nodes_edges(self, node_id: int):
-        result = []
-        for edge in self.edges:
-            if edge.node_in_edge(node_id):
-                result.append(edge)
-        return result
+        return list(self.incident_edges.get(node_id, ()))
 
     def get_nodes_edge_partners(self, node_id):
-        result = []
-        for edge in self.edges:
-            if edge.node_in_edge(node_id):
-                result.append(edge.other_node(node_id))
-        return result
+        return list(self.adjacency.get(node_id, ()))
 
     def what_node_is_cat_at(self, cat):
         cat.current_node
 
     def is_home_of_enemy(self, node_id, cat_id):
-        home_cats = [cat.traits.id for cat in self.cats if cat.traits.home == node_id]
-        for cat in home_cats:
+        for cat in self.home_cats.get(node_id, ()):
             if cat == cat_id:
                 return False
             if self.get_relationship(cat, cat_id).value > 0:
@@ -103,8 +252,7 @@ class Simulation:
         return False
 
     def is_home_of_friend(self, node_id, cat_id):
-        home_cats = [cat.traits.id for cat in self.cats if cat.traits.home == node_id]
-        for cat in home_cats:
+        for cat in self.home_cats.get(node_id, ()):
             if cat == cat_id:
                 return False
             if self.get_relationship(cat, cat_id).value >= 0:
@@ -112,28 +260,36 @@ class Simulation:
         return False
 
     def is_neutral_node(self, node_id, cat_id):
-        home_cats = [cat.traits.id for cat in self.cats if cat.traits.home == node_id]
-        return len(home_cats) == 0
+        return node_id not in self.home_cats
+
+    def get_forbidden_nodes(self, cat_id):
+        forbidden = self.forbidden_nodes.get(cat_id)
+        if forbidden is None:
+            forbidden = {
+                node_id
+                for node_id in self.home_cats
+                if self.is_home_of_enemy(node_id, cat_id)
+            }
+            self.forbidden_nodes[cat_id] = forbidden
+        return forbidden
+
+    def invalidate_forbidden_nodes(self, *cat_ids):
+        for cat_id in cat_ids:
+            self.forbidden_nodes.pop(cat_id, None)
 
     def get_nodes_edge_partners_no_enemy_home(self, node_id, cat_id):
-        result = self.get_nodes_edge_partners(node_id)
-        result_copy = result.copy()
-        for node in result_copy:
-            if self.is_home_of_enemy(node, cat_id):
-                result.remove(node)
-        return result
+        forbidden = self.get_forbidden_nodes(cat_id)
+        return [
+            node for node in self.adjacency.get(node_id, ()) if node not in forbidden
+        ]
 
     def get_cat(self, cat_id):
-        for cat in self.cats:
-            if cat.traits.id == cat_id:
-                return cat
+        # cats are generated with ids matching their position
+        if 0 <= cat_id < len(self.cats):
+            return self.cats[cat_id]
 
     def get_cats_on_node(self, node_id):
-        result = []
-        for cat in self.cats:
-            if cat.current_node == node_id:
-                result.append(cat.traits.id)
-        return result
+        return sorted(self.occupancy.get(node_id, ()))
 
     def get_relationship(self, cat1, cat2):
         key = tuple(sorted((cat1, cat2)))
@@ -153,48 +309,136 @@ class Simulation:
                 result.append(rel.other_cat(cat1))
         return result
 
-    def generate_initial_state(self):
+    def record_sign_change(self, cat1: Cat, cat2: Cat, old_value, new_value):
+        """Update friend/enemy counters and caches after a relationship changed."""
+        old_sign = (old_value > 0) - (old_value < 0)
+        new_sign = (new_value > 0) - (new_value < 0)
+        if old_sign == new_sign:
+            return
+        for cat in (cat1, cat2):
+            cat.stats.friends += (new_sign < 0) - (old_sign < 0)
+            cat.stats.enemies += (new_sign > 0) - (old_sign > 0)
+        if (old_sign < 0) != (new_sign < 0):
+            self.snapshot_friendgroups = None
+        if (old_sign > 0) != (new_sign > 0):
+            self.invalidate_forbidden_nodes(cat1.traits.id, cat2.traits.id)
+
+    def recount_relationships(self):
+        """Rebuild the friend/enemy counters from the relationship values."""
+        for cat in self.cats:
+            cat.stats.friends = cat.stats.enemies = 0
+        self.snapshot_friendgroups = None
+        for rel in self.relationships.values():
+            cat1 = self.get_cat(rel.traits.cat1)
+            cat2 = self.get_cat(rel.traits.cat2)
+            self.record_sign_change(cat1, cat2, 0, rel.value)
+        self.forbidden_nodes.clear()
+
+    def recount_metric_aggregates(self):
+        """Rebuild the running aggregates of `SimulationStats` from the relationships."""
+        _, values, stats = self.relationship_arrays()
+        self.stats.interacted_relationships = int(np.count_nonzero(stats["interacted"]))
+        self.stats.relationship_value_sum = float(values.sum())
+        self.snapshot_friendgroups = None
+
+    def get_relationship_counts(self, cat_id):
+        """Number of friends, enemies and acquaintances of a cat."""
+        stats = self.get_cat(cat_id).stats
+        acquaintances = len(stats.interacted_with) - stats.friends - stats.enemies
+        return stats.friends, stats.enemies, acquaintances
+
+    def generate_legacy_graph(self):
         # Nodes
         edge_sigma = self.params.var_edges**0.5
         for i in range(self.params.node_amount):
             number_of_edges = max(
-                1, round(min(random.gauss(self.params.mean_edges, edge_sigma),self.params.node_amount))
+                1, round(min(self.rng.gauss(self.params.mean_edges, edge_sigma),self.params.node_amount))
             )
-            self.nodes.append(Node(id=i, number_of_edges=number_of_edges))
+            self.add_node(Node(id=i, number_of_edges=number_of_edges))
 
         # Minimal connected graph
         available_nodes = [node.id for node in self.nodes]
         connected_nodes = [available_nodes.pop(0)]
 
         while available_nodes:
-            n1 = random.choice(connected_nodes)
-            n2 = available_nodes.pop(random.randint(0, len(available_nodes) - 1))
-            self.edges.append(Edge(node1=n1, node2=n2))
+            n1 = self.rng.choice(connected_nodes)
+            n2 = available_nodes.pop(self.rng.randint(0, len(available_nodes) - 1))
+            self.add_edge(Edge(node1=n1, node2=n2))
             connected_nodes.append(n2)
 
         # Randomly connected graph
         for node in self.nodes:
-            edge_partners = self.get_nodes_edge_partners(node.id)
-            if len(edge_partners) < number_of_edges:
+            degree = len(self.adjacency[node.id])
+            if degree < number_of_edges:
                 possible_nodes = [i for i in range(self.params.node_amount)]
                 possible_nodes.remove(node.id)
-                for i in range(node.number_of_edges - len(edge_partners)):
-                    rand_node_id = random.choice(possible_nodes)
-                    other_node = self.get_node(rand_node_id)
-                    if len(self.get_nodes_edges(other_node.id)) < node.number_of_edges:
-                        self.edges.append(Edge(node1=node.id, node2=rand_node_id))
+                for i in range(node.number_of_edges - degree):
+                    rand_node_id = self.rng.choice(possible_nodes)
+                    if len(self.incident_edges[rand_node_id]) < node.number_of_edges:
+                        self.add_edge(Edge(node1=node.id, node2=rand_node_id))
                     possible_nodes.remove(rand_node_id)
 
+    def generate_fast_graph(self):
+        degrees, edges = generate_graph(
+            self.params.node_amount,
+            self.params.mean_edges,
+            self.params.var_edges,
+            self.graph_rng,
+        )
+        self.load_topology(Topology(degrees=degrees, edges=edges))
+
+    def export_topology(self):
+        return Topology(
+            degrees=np.array([node.number_of_edges for node in self.nodes]),
+            edges=np.array(
+                [(edge.node1, edge.node2) for edge in self.edges], dtype=np.int64
+            ).reshape(-1, 2),
+            rng_state=self.rng.getstate()
+            if self.params.graph_generator == "legacy"
+            else None,
+        )
+
+    def load_topology(self, topology: Topology):
+        for i, number_of_edges in enumerate(topology.degrees.tolist()):
+            self.add_node(Node(id=i, number_of_edges=number_of_edges))
+        for node1, node2 in topology.edges.tolist():
+            self.add_edge(Edge(node1=node1, node2=node2))
+        if topology.rng_state is not None:
+            self.rng.setstate(topology.rng_state)
+
+    def build_graph(self):
+        topology = None
+        if self.topology_cache is not None:
+            topology = self.topology_cache.load(self.params)
+        if topology is not None:
+            self.load_topology(topology)
+            return
+
+        if self.params.graph_generator == "fast":
+            self.generate_fast_graph()
+        else:
+            self.generate_legacy_graph()
+        if self.topology_cache is not None:
+            self.topology_cache.store(self.params, self.export_topology())
+
+    def generate_initial_state(self):
+        self.build_graph()
+
         # Cats
         aggressive_sigma = self.params.var_aggressive**0.5
         lazy_sigma = self.params.var_laziness**0.5
+        available_nodes = [node.id for node in self.nodes]
         for i in range(self.params.cat_amount):
-            available_nodes = [node.id for node in self.nodes]
-            home_id = random.choice(available_nodes)
+            stats = None if self.cat_stats is None else self.cat_stats.row(i)
+            home_id = self.rng.choice(available_nodes)
+            self.home_cats.setdefault(home_id, []).append(i)
             aggressive = max(
-                -1, min(1, random.gauss(self.params.mean_aggressive, aggressive_sigma))
+                -1,
+                min(1, self.rng.gauss(self.params.mean_aggressive, aggressive_sigma)),
+            )
+            lazy = max(
+                -1, min(1, self.rng.gauss(self.params.mean_laziness, lazy_sigma))
             )
-            lazy = max(-1, min(1, random.gauss(self.params.mean_laziness, lazy_sigma)))
             self.cats.append(
                 Cat(
                     CatTraits(
@@ -203,7 +447,9 @@ class Simulation:
                         home=home_id,
                         aggressive=aggressive,
                         lazy=lazy,
-                    )
+                    ),
+                    occupancy=self.occupancy,
+                    stats=stats,
                 )
             )
 
@@ -220,49 +466,82 @@ class Simulation:
                 )
             related_cats.append(available_cats.pop(0))
 
+    def prepare_vectorized(self):
+        if self.adjacency_csr is None:
+            self.adjacency_csr = build_csr(self.adjacency, len(self.nodes))
+        if self.cat_arrays is None:
+            self.cat_arrays = CatArrays.from_cats(self.cats, len(self.nodes))
+        return self.adjacency_csr, self.cat_arrays
+
+    def cat_positions(self):
+        """Current node of every cat by id, -1 for cats on an edge."""
+        return np.array(
+            [
+                -1 if cat.current_node is None else cat.current_node
+                for cat in self.cats
+            ],
+            dtype=np.int64,
+        )
+
+    def movement_means(self, cat):
+        """
+        Weights of the nodes `cat` can move to and of staying, before the noise.
+
+        Returns the neighbouring nodes the cat may enter (with repeats for
+        parallel edges), their weights by node and the weight of staying,
+        `None` when the cat has to run.
+        """
+        edge_partners = self.get_nodes_edge_partners_no_enemy_home(
+            cat.current_node, cat.traits.id
+        )
+        means = {}
+        for node_id in edge_partners:
+            if node_id in means:
+                continue
+            mean = (1 - cat.traits.lazy) * (1 - lazy_weight)
+            for other_cat in self.get_cats_on_node(node_id):
+                relationship = self.get_relationship(cat.traits.id, other_cat)
+                mean += cat.traits.aggressive * relationship.value * relationship_weight
+            means[node_id] = mean
+
+        if cat.needs_to_run:
+            return edge_partners, means, None
+        stay = cat.traits.lazy * lazy_weight
+        cats_at_node = self.get_cats_on_node(cat.current_node)
+        cats_at_node.remove(cat.traits.id)
+        for other_cat in cats_at_node:
+            relationship = self.get_relationship(cat.traits.id, other_cat)
+            stay += cat.traits.aggressive * relationship.value * relationship_weight
+        return edge_partners, means, stay
+
+    def choose_move(self, cat):
+        """Draw the node `cat` leaves for this iteration, or "stay"."""
+        edge_partners, means, stay = self.movement_means(cat)
+        probs = {}
+        for node_id in edge_partners:
+            probs[node_id] = means[node_id] * self.rng.uniform(0.9, 1.1)
+            probs[node_id] = max(0, min(probs[node_id], 1))
+        if stay is None:
+            prob_to_stay = 0.0
+        else:
+            prob_to_stay = stay * self.rng.uniform(0.9, 1.1)
+            prob_to_stay = max(0, min(prob_to_stay, 1))
+
+        choices = list(probs.keys()) + ["stay"]
+        weights = list(probs.values()) + [prob_to_stay]
+        if len(choices) == 1:
+            return choices[0]
+        return self.rng.choices(choices, weights=weights, k=1)[0]
+
     def movement_step(self):
+        if self.params.movement_engine == "numpy":
+            self.vectorized_movement_step()
+            return
+
         new_cats = self.cats.copy()
         for cat in new_cats:
             if not cat.is_on_the_edge():
-                edge_partners = self.get_nodes_edge_partners_no_enemy_home(
-                    cat.current_node, cat.traits.id
-                )
-                probs = {node: 0.0 for node in edge_partners}
-                for node_id in edge_partners:
-                    cats_at_node = self.get_cats_on_node(node_id)
-                    probs[node_id] = (1 - cat.traits.lazy) * (1 - lazy_weight)
-                    for other_cat in cats_at_node:
-                        relationship = self.get_relationship(cat.traits.id, other_cat)
-                        probs[node_id] += (
-                            cat.traits.aggressive
-                            * relationship.value
-                            * relationship_weight
-                        )
-                    probs[node_id] *= random.uniform(0.9, 1.1)
-                    probs[node_id] = max(0, min(probs[node_id], 1))
-                if cat.needs_to_run:
-                    prob_to_stay = 0.0
-                else:
-                    prob_to_stay = cat.traits.lazy * lazy_weight
-                    cats_at_node = self.get_cats_on_node(cat.current_node)
-                    cats_at_node.remove(cat.traits.id)
-                    for other_cat in cats_at_node:
-                        relationship = self.get_relationship(cat.traits.id, other_cat)
-                        prob_to_stay += (
-                            cat.traits.aggressive
-                            * relationship.value
-                            * relationship_weight
-                        )
-                    prob_to_stay *= random.uniform(0.9, 1.1)
-                    prob_to_stay = max(0, min(prob_to_stay, 1))
-
-                # chose action
-                choices = list(probs.keys()) + ["stay"]
-                weights = list(probs.values()) + [prob_to_stay]
-                if len(choices) == 1:
-                    source = choices[0]
-                else:
-                    source = random.choices(choices, weights=weights, k=1)[0]
+                source = self.choose_move(cat)
 
                 # set stats for cats at nodes
                 cat.time_at_current_node += 1
@@ -283,177 +562,462 @@ class Simulation:
                     pass
                 else:
                     cat.leave(source)
+                    if self.event_log is not None:
+                        self.event_log.record(MOVE, cat.traits.id, source)
             else:
                 cat.arrive()
                 cat.stats.iter_on_edge += 1
+                if self.event_log is not None:
+                    self.event_log.record(ARRIVE, cat.traits.id, cat.current_node)
+
+            cat.needs_to_run = False
+
+    def vectorized_movement_step(self):
+        """
+        Array based equivalent of the python movement step.
+
+        All cats decide on the positions at the start of the iteration, instead
+        of seeing the moves of cats with a lower id.
+        """
+        (indptr, indices), arrays = self.prepare_vectorized()
+        values = self.relationships.value
+
+        position = self.cat_positions()
+        movers = np.flatnonzero(position >= 0)
+        needs_to_run = np.array(
+            [self.cats[i].needs_to_run for i in movers], dtype=bool
+        )
+
+        # summed relationship values of every cat towards each occupied node
+        occupied, occupied_of_mover = np.unique(position[movers], return_inverse=True)
+        presence = np.zeros((len(self.cats), len(occupied)))
+        presence[movers, occupied_of_mover] = 1
+        pressure = values @ presence
+        occupied_index = np.full(len(self.nodes), -1, dtype=np.int64)
+        occupied_index[occupied] = np.arange(len(occupied))
+
+        # enemy homes a cat may not enter, see is_home_of_enemy
+        blocking = (values > 0) & arrays.home_precedes
+        blocked_homes = (blocking.astype(np.float64) @ arrays.home_onehot) > 0
+
+        owner, entries, degree = expand_rows(indptr, position[movers])
+        target = indices[entries]
+        cat_ids = movers[owner]
+
+        target_occupied = occupied_index[target]
+        target_pressure = np.where(
+            target_occupied >= 0,
+            pressure[cat_ids, np.maximum(target_occupied, 0)],
+            0.0,
+        )
+        weights = (1 - arrays.lazy[cat_ids]) * (1 - lazy_weight) + (
+            arrays.aggressive[cat_ids] * target_pressure * relationship_weight
+        )
+        weights *= self.movement_rng.uniform(0.9, 1.1, len(weights))
+        weights = np.clip(weights, 0, 1)
+        target_home = arrays.home_index[target]
+        forbidden = (target_home >= 0) & blocked_homes[
+            cat_ids, np.maximum(target_home, 0)
+        ]
+        weights[forbidden] = 0.0
+
+        stay = arrays.lazy[movers] * lazy_weight + (
+            arrays.aggressive[movers]
+            * pressure[movers, occupied_of_mover]
+            * relationship_weight
+        )
+        stay *= self.movement_rng.uniform(0.9, 1.1, len(movers))
+        stay = np.clip(stay, 0, 1)
+        stay[needs_to_run] = 0.0
+
+        choice = choose_in_segments(
+            weights, owner, degree, stay, self.movement_rng
+        )
+        moves = choice < degree
+        destination = np.full(len(movers), -1, dtype=np.int64)
+        destination[moves] = target[(np.cumsum(degree) - degree + choice)[moves]]
+
+        table = self.stats_table()
+        at_home = position[movers] == arrays.home[movers]
+        neutral = ~at_home & (arrays.home_index[position[movers]] < 0)
+        friendly = ~at_home & ~neutral
+        table.iter_on_edge[position < 0] += 1
+        table.iter_at_home[movers[at_home]] += 1
+        table.times_at_home[movers[at_home & moves]] += 1
+        table.iter_at_neutral[movers[neutral]] += 1
+        table.times_at_neutral[movers[neutral & moves]] += 1
+        table.iter_at_friendly[movers[friendly]] += 1
+        table.times_at_friendly[movers[friendly & moves]] += 1
 
+        for cat in self.cats:
+            if cat.is_on_the_edge():
+                cat.arrive()
+            else:
+                cat.time_at_current_node += 1
             cat.needs_to_run = False
+        for cat_id, node_id in zip(
+            movers[moves].tolist(), destination[moves].tolist()
+        ):
+            self.cats[cat_id].leave(node_id)
+        if self.event_log is not None:
+            arrived = np.flatnonzero(position < 0)
+            self.event_log.record_many(ARRIVE, arrived, self.cat_positions()[arrived])
+            self.event_log.record_many(MOVE, movers[moves], destination[moves])
 
     def engagement_step(self):
+        if self.params.engagement_engine == "numpy":
+            self.vectorized_engagement_step()
+            return
+
+        # every cat on a node counts as asleep, engaged or not, like in the
+        # numpy engine
+        for cat_ids in self.occupancy.values():
+            for cat_id in cat_ids:
+                self.cats[cat_id].stats.sleeps += 1
+
+        # only nodes with at least two cats can hold an encounter
+        crowded = sorted(
+            node_id for node_id, cat_ids in self.occupancy.items() if len(cat_ids) > 1
+        )
+        for c1, c2 in self.encounters(crowded):
+            self.interact(c1, c2)
+
+    def encounters(self, node_ids):
+        """Draw the pairs of cats that interact on each of `node_ids`, in order."""
         result = []
-        for node in self.nodes:
-            cats_on_node = [self.get_cat(cat) for cat in self.get_cats_on_node(node.id)]
+        for node_id in node_ids:
+            cats_on_node = [self.cats[cat] for cat in self.get_cats_on_node(node_id)]
             engaged = set()
             n = len(cats_on_node)
-            if n > 1:
-                possible_pairs = []
-                for index1, cat1 in enumerate(cats_on_node):
-                    for index2 in range(index1 + 1, n):
-                        cat2 = cats_on_node[index2]
-
-                        rel = self.get_relationship(cat1.traits.id, cat2.traits.id)
-                        mutual_intent = (
-                            cat1.traits.aggressive * rel.value
-                            + cat2.traits.aggressive * rel.value
-                            + random.uniform(-0.3, 0.3)
+            possible_pairs = []
+            for index1, cat1 in enumerate(cats_on_node):
+                for index2 in range(index1 + 1, n):
+                    cat2 = cats_on_node[index2]
+
+                    rel = self.get_relationship(cat1.traits.id, cat2.traits.id)
+                    mutual_intent = (
+                        cat1.traits.aggressive * rel.value
+                        + cat2.traits.aggressive * rel.value
+                        + self.rng.uniform(-0.3, 0.3)
+                    )
+                    if mutual_intent > 0.2:
+                        possible_pairs.append(
+                            (mutual_intent, cat1.traits.id, cat2.traits.id)
                         )
-                        if mutual_intent > 0.2:
-                            possible_pairs.append(
-                                (mutual_intent, cat1.traits.id, cat2.traits.id)
-                            )
-                possible_pairs.sort(reverse=True)
-
-                for _, i, j in possible_pairs:
-                    if i not in engaged and j not in engaged:
-                        engaged.add(i)
-                        engaged.add(j)
-                        result.append((i, j))
-
-            for cat in cats_on_node:
-                if cat not in engaged:
-                    cat.stats.sleeps += 1
-
-        for pair in result:
-            c1, c2 = pair
-            cat1 = self.get_cat(c1)
-            cat2 = self.get_cat(c2)
-            rel = self.get_relationship(c1, c2)
-
-            interaction_value = (
-                cat1.traits.aggressive + cat2.traits.aggressive + rel.value
-            )
-            rel.stats.absolute_delta += 0.05
-            self.stats.total_number_interactions += 1
-            rel.stats.interacted = True
-            if rel.value == 0:
-                rel.stats.number_of_sign_flips += 1
-            if interaction_value > 0:
-                cat1.stats.fights += 1
-                cat1.stats.interacted_with.add(c2)
-                cat2.stats.fights += 1
-                cat2.stats.interacted_with.add(c1)
-                if cat1.traits.aggressive > cat2.traits.aggressive:
-                    cat2.needs_to_run = True
-                else:
-                    cat1.needs_to_run = True
-                rel.value += 0.05
-                rel.value = min(1, rel.value)
-                if rel.value > rel.stats.max_value:
-                    rel.stats.max_value = rel.value
+            possible_pairs.sort(reverse=True)
+
+            for _, i, j in possible_pairs:
+                if i not in engaged and j not in engaged:
+                    engaged.add(i)
+                    engaged.add(j)
+                    result.append((i, j))
+        return result
+
+    def interact(self, c1, c2):
+        """
+        Let two cats interact, a fight or a friendly encounter.
+
+        Draws no random numbers, returns which of the two it was, `FIGHT` or
+        `BEFRIEND`.
+        """
+        cat1 = self.cats[c1]
+        cat2 = self.cats[c2]
+        rel = self.get_relationship(c1, c2)
+        old_value = rel.value
+
+        interaction_value = cat1.traits.aggressive + cat2.traits.aggressive + rel.value
+        rel.stats.absolute_delta += 0.05
+        self.stats.total_number_interactions += 1
+        self.stats.interacted_relationships += not rel.stats.interacted
+        rel.stats.interacted = True
+        if rel.value == 0:
+            rel.stats.number_of_sign_flips += 1
+        if interaction_value > 0:
+            cat1.stats.fights += 1
+            cat1.stats.interacted_with.add(c2)
+            cat2.stats.fights += 1
+            cat2.stats.interacted_with.add(c1)
+            if cat1.traits.aggressive > cat2.traits.aggressive:
+                cat2.needs_to_run = True
             else:
-                cat1.stats.friendly_interaction += 1
-                cat1.stats.interacted_with.add(c2)
-                cat2.stats.friendly_interaction += 1
-                cat2.stats.interacted_with.add(c1)
-                rel.value -= 0.05
-                rel.value = max(-1, rel.value)
-                if rel.value < rel.stats.min_value:
-                    rel.stats.min_value = rel.value
+                cat1.needs_to_run = True
+            rel.value += 0.05
+            rel.value = min(1, rel.value)
+            if rel.value > rel.stats.max_value:
+                rel.stats.max_value = rel.value
+        else:
+            cat1.stats.friendly_interaction += 1
+            cat1.stats.interacted_with.add(c2)
+            cat2.stats.friendly_interaction += 1
+            cat2.stats.interacted_with.add(c1)
+            rel.value -= 0.05
+            rel.value = max(-1, rel.value)
+            if rel.value < rel.stats.min_value:
+                rel.stats.min_value = rel.value
 
-    def calculate_metrics(self):
-        G = nx.Graph()
+        self.stats.relationship_value_sum += rel.value - old_value
+        self.record_sign_change(cat1, cat2, old_value, rel.value)
+        kind = FIGHT if interaction_value > 0 else BEFRIEND
+        if self.event_log is not None:
+            self.event_log.record(kind, c1, c2)
+        return kind
 
-        G.add_nodes_from(range(70))
-        for rel in self.relationships.values():
-            rel.metrics = RelationshipMetrics(
-                stability=1 / (1 + rel.stats.absolute_delta),
-                volatility=rel.stats.absolute_delta / self.params.iterations,
-                min_value=rel.stats.min_value,
-                max_value=rel.stats.max_value,
-                number_of_sign_flips=rel.stats.number_of_sign_flips,
-            )
-            if rel.value < 0:
-                G.add_edge(rel.traits.cat1, rel.traits.cat2)
+    def vectorized_engagement_step(self):
+        """Array based equivalent of the python engagement step."""
+        _, arrays = self.prepare_vectorized()
+        matrix = self.relationships
+        values = matrix.value
 
-        cliques = [clique for clique in list(nx.find_cliques(G)) if len(clique) > 2]
+        table = self.stats_table()
+        position = self.cat_positions()
+        on_node = np.flatnonzero(position >= 0)
+        table.sleeps[on_node] += 1
 
-        for cat in self.cats:
-            total_connections = len(cat.stats.interacted_with)
-            prob_friends = (
-                0
-                if total_connections == 0
-                else len(self.get_friends(cat.traits.id)) / total_connections
-            )
-            prob_enemies = (
-                0
-                if total_connections == 0
-                else len(self.get_enemies(cat.traits.id)) / total_connections
+        # all pairs of co-located cats, lower id first
+        grouped = on_node[np.argsort(position[on_node], kind="stable")]
+        _, group_start, group_size = np.unique(
+            position[grouped], return_index=True, return_counts=True
+        )
+        member = np.arange(len(grouped))
+        group_end = np.repeat(group_start + group_size, group_size)
+        partners = group_end - member - 1
+        first = np.repeat(member, partners)
+        offset = np.arange(len(first)) - np.repeat(
+            np.cumsum(partners) - partners, partners
+        )
+        cat1 = grouped[first]
+        cat2 = grouped[first + 1 + offset]
+
+        noise = self.engagement_rng.uniform(-0.3, 0.3, len(cat1))
+        mutual_intent = (
+            arrays.aggressive[cat1] + arrays.aggressive[cat2]
+        ) * values[cat1, cat2] + noise
+        candidates = np.flatnonzero(mutual_intent > 0.2)
+        candidates = candidates[
+            np.argsort(-mutual_intent[candidates], kind="stable")
+        ]
+
+        # greedy matching, candidates on different nodes never conflict
+        engaged = np.zeros(len(self.cats), dtype=bool)
+        matched = []
+        for pair, i, j in zip(
+            candidates.tolist(), cat1[candidates].tolist(), cat2[candidates].tolist()
+        ):
+            if not engaged[i] and not engaged[j]:
+                engaged[i] = engaged[j] = True
+                matched.append(pair)
+        if not matched:
+            return
+
+        c1 = cat1[matched]
+        c2 = cat2[matched]
+        value = values[c1, c2]
+        fight = arrays.aggressive[c1] + arrays.aggressive[c2] + value > 0
+        new_value = np.where(
+            fight, np.minimum(1, value + 0.05), np.maximum(-1, value - 0.05)
+        )
+
+        matrix.absolute_delta[c1, c2] += 0.05
+        self.stats.interacted_relationships += int(
+            np.count_nonzero(~matrix.interacted[c1, c2])
+        )
+        matrix.interacted[c1, c2] = True
+        matrix.number_of_sign_flips[c1, c2] += value == 0
+        values[c1, c2] = values[c2, c1] = new_value
+        max_value = matrix.max_value[c1, c2]
+        min_value = matrix.min_value[c1, c2]
+        matrix.max_value[c1, c2] = np.where(
+            fight, np.maximum(max_value, new_value), max_value
+        )
+        matrix.min_value[c1, c2] = np.where(
+            fight, min_value, np.minimum(min_value, new_value)
+        )
+        self.stats.total_number_interactions += len(matched)
+        self.stats.relationship_value_sum += float((new_value - value).sum())
+        if self.event_log is not None:
+            self.event_log.record_many(FIGHT, c1[fight], c2[fight])
+            self.event_log.record_many(BEFRIEND, c1[~fight], c2[~fight])
+
+        # matched cats are distinct, so the masked adds never collide
+        friendly = ~fight
+        for cats in (c1, c2):
+            table.fights[cats[fight]] += 1
+            table.friendly_interaction[cats[friendly]] += 1
+            table.friends[cats] += (new_value < 0).astype(np.int64) - (value < 0)
+            table.enemies[cats] += (new_value > 0).astype(np.int64) - (value > 0)
+
+        runs = np.where(arrays.aggressive[c1] > arrays.aggressive[c2], c2, c1)
+        for runner in runs[fight].tolist():
+            self.cats[runner].needs_to_run = True
+        for i, j in zip(c1.tolist(), c2.tolist()):
+            table.interacted_with[i].add(j)
+            table.interacted_with[j].add(i)
+        if ((value < 0) != (new_value < 0)).any():
+            self.snapshot_friendgroups = None
+        flipped = (value > 0) != (new_value > 0)
+        for i, j in zip(c1[flipped].tolist(), c2[flipped].tolist()):
+            self.invalidate_forbidden_nodes(i, j)
+
+    def stats_table(self):
+        if self.cat_stats is not None:
+            return self.cat_stats
+        return CatStatsTable.from_stats([cat.stats for cat in self.cats])
+
+    def cat_metric_columns(self, groups_of_cat, group_sizes_of_cat):
+        """All `CatMetrics` fields as arrays indexed by cat id."""
+        table = self.stats_table()
+        iterations = self.iterations_run()
+        total_connections = np.array([len(bits) for bits in table.interacted_with])
+        connected = total_connections > 0
+
+        prob_friends = ratio(table.friends, total_connections)
+        prob_enemies = ratio(table.enemies, total_connections)
+        prob_aqua = np.where(connected, 1 - prob_friends - prob_enemies, 0.0)
+
+        return {
+            "percent_time_spent_home": table.iter_at_home / iterations,
+            "percent_time_spent_on_edge": table.iter_on_edge / iterations,
+            "percent_time_spent_on_neutral_ground": table.iter_at_neutral / iterations,
+            "percent_time_spent_at_friends_house": table.iter_at_friendly / iterations,
+            "average_iter_spent_at_home": ratio(
+                table.iter_at_home, table.times_at_home
+            ),
+            "average_iter_spent_at_friends_home": ratio(
+                table.iter_at_friendly, table.times_at_friendly
+            ),
+            "average_iter_spent_on_neutral_node": ratio(
+                table.iter_at_neutral, table.times_at_neutral
+            ),
+            "percent_of_cats_interacted_with": total_connections
+            / (self.params.cat_amount - 1),
+            "percent_of_friends": ratio(prob_friends, total_connections),
+            "percent_of_enemies": ratio(prob_enemies, total_connections),
+            "percent_of_aquaintances": ratio(prob_aqua, total_connections),
+            "percent_time_spent_fighting": table.fights / iterations,
+            "percent_time_spent_friendly_interaction": table.friendly_interaction
+            / iterations,
+            "percent_time_spent_sleeping": table.sleeps / iterations,
+            "amount_friendgroups": groups_of_cat,
+            "average_size_friendgroup": ratio(group_sizes_of_cat, groups_of_cat),
+            "exploration_index": np.array([len(bits) for bits in table.nodes_visited])
+            / self.params.node_amount,
+            "relationship_entropy": -(
+                xlogx(prob_friends) + xlogx(prob_enemies) + xlogx(prob_aqua)
+            ),
+        }
+
+    def relationship_arrays(self):
+        """Keys, values and `RelationshipStats` fields of all relationships."""
+        if isinstance(self.relationships, RelationshipMatrix):
+            keys = self.relationships.key_array()
+            index = (keys[:, 0], keys[:, 1])
+            matrix = self.relationships
+            return (
+                keys,
+                matrix.value[index],
+                {name: getattr(matrix, name)[index] for name in RELATIONSHIP_STATS},
             )
-            prob_aqua = 0 if total_connections == 0 else 1 - prob_friends - prob_enemies
-            config = {
-                "percent_time_spent_home": cat.stats.iter_at_home
-                / self.params.iterations,
-                "percent_time_spent_on_edge": cat.stats.iter_on_edge
-                / self.params.iterations,
-                "percent_time_spent_on_neutral_ground": cat.stats.iter_at_neutral
-                / self.params.iterations,
-                "percent_time_spent_at_friends_house": cat.stats.iter_at_friendly
-                / self.params.iterations,
-                "average_iter_spent_at_home": cat.stats.iter_at_home
-                / cat.stats.times_at_home
-                if cat.stats.times_at_home > 0
-                else 0,
-                "average_iter_spent_at_friends_home": cat.stats.iter_at_friendly
-                / cat.stats.times_at_friendly
-                if cat.stats.times_at_friendly > 0
-                else 0,
-                "average_iter_spent_on_neutral_node": cat.stats.iter_at_neutral
-                / cat.stats.times_at_neutral
-                if cat.stats.times_at_neutral > 0
-                else 0,
-                "percent_of_cats_interacted_with": total_connections
-                / (self.params.cat_amount - 1),
-                "percent_of_friends": 0
-                if total_connections == 0
-                else prob_friends / total_connections,
-                "percent_of_enemies": 0
-                if total_connections == 0
-                else prob_enemies / total_connections,
-                "percent_of_aquaintances": 0
-                if total_connections == 0
-                else prob_aqua / total_connections,
-                "percent_time_spent_fighting": cat.stats.fights
-                / self.params.iterations,
-                "percent_time_spent_friendly_interaction": cat.stats.friendly_interaction
-                / self.params.iterations,
-                "percent_time_spent_sleeping": cat.stats.sleeps
-                / self.params.iterations,
-                "exploration_index": len(cat.stats.nodes_visited)
-                / self.params.node_amount,
-                "relationship_entropy": -(
-                    prob_friends * safe_log(prob_friends)
-                    + prob_enemies * safe_log(prob_enemies)
-                    + prob_aqua * safe_log(prob_aqua)
-                ),
-            }
 
-            cats_cliques = [clique for clique in cliques if cat.traits.id in clique]
+        relationships = list(self.relationships.values())
+        keys = np.array(
+            [(rel.traits.cat1, rel.traits.cat2) for rel in relationships],
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        values = np.array([rel.value for rel in relationships], dtype=np.float64)
+        get_stats = attrgetter(*RELATIONSHIP_STATS)
+        rows = np.array(
+            [get_stats(rel.stats) for rel in relationships], dtype=np.float64
+        ).reshape(-1, len(RELATIONSHIP_STATS))
+        return keys, values, dict(zip(RELATIONSHIP_STATS, rows.T))
 
-            config["amount_friendgroups"] = len(cats_cliques)
+    def relationship_metric_columns(self, stats):
+        """All `RelationshipMetrics` fields as arrays."""
+        absolute_delta = stats["absolute_delta"].astype(np.float64)
+        return {
+            "stability": 1 / (1 + absolute_delta),
+            "volatility": absolute_delta / self.iterations_run(),
+            "min_value": stats["min_value"].astype(np.float64),
+            "max_value": stats["max_value"].astype(np.float64),
+            "number_of_sign_flips": stats["number_of_sign_flips"].astype(np.int64),
+        }
 
-            config["average_size_friendgroup"] = (
-                0
-                if len(cats_cliques) == 0
-                else sum([len(clique) for clique in cats_cliques])
-                / config["amount_friendgroups"]
+    def calculate_metrics(self):
+        keys, values, stats = self.relationship_arrays()
+        relationship_columns = self.relationship_metric_columns(stats)
+        if isinstance(self.relationships, RelationshipMatrix):
+            self.relationships.metrics_iterations = self.iterations_run()
+        else:
+            # columns are in field order
+            all_metrics = map(
+                RelationshipMetrics,
+                *(column.tolist() for column in relationship_columns.values()),
             )
-            cat.metrics = CatMetrics(**config)
+            for rel, metrics in zip(self.relationships.values(), all_metrics):
+                rel.metrics = metrics
+
+        cliques = self.friendgroups(keys[values < 0].tolist())
+        groups_of_cat = np.zeros(len(self.cats), dtype=np.int64)
+        group_sizes_of_cat = np.zeros(len(self.cats), dtype=np.int64)
+        for clique in cliques:
+            groups_of_cat[clique] += 1
+            group_sizes_of_cat[clique] += len(clique)
+
+        columns = self.cat_metric_columns(groups_of_cat, group_sizes_of_cat)
+        rows = zip(*(column.tolist() for column in columns.values()))
+        for cat, row in zip(self.cats, rows):
+            cat.metrics = CatMetrics(**dict(zip(columns, row)))
+
+        self.metric_columns = MetricColumns(
+            cats=columns,
+            relationship_keys=keys,
+            relationship_values=values,
+            relationships=relationship_columns,
+        )
+
+        isolated_cats_count = int(np.count_nonzero(columns["percent_of_friends"] == 0))
+
+        # summed left to right like the builtin, not pairwise like np.sum
+        relationship_values = values[stats["interacted"].astype(bool)].tolist()
+        mean_relationship_value = (
+            0
+            if len(relationship_values) == 0
+            else sum(relationship_values) / len(relationship_values)
+        )
+
+        self.metrics = self.simulation_metrics(
+            cliques, isolated_cats_count, mean_relationship_value, self.iterations_run()
+        )
+
+    def friend_pairs(self):
+        """Keys of all friendly relationships, in insertion order."""
+        if isinstance(self.relationships, RelationshipMatrix):
+            keys = self.relationships.key_array()
+            friendly = self.relationships.value[keys[:, 0], keys[:, 1]] < 0
+            return keys[friendly].tolist()
+        return [
+            (rel.traits.cat1, rel.traits.cat2)
+            for rel in self.relationships.values()
+            if rel.value < 0
+        ]
+
+    def friendgroups(self, friend_pairs):
+        G = nx.Graph()
+        G.add_nodes_from(cat.traits.id for cat in self.cats)
+        G.add_edges_from(friend_pairs)
+        return find_friendgroups(
+            G, self.params.friendgroup_mode, self.params.clique_budget
+        )
 
+    def simulation_metrics(
+        self, cliques, isolated_cats_count, mean_relationship_value, iterations
+    ):
         max_interactions_per_iteration = self.params.cat_amount // 2  # floor division
-        max_total_interactions = self.params.iterations * max_interactions_per_iteration
+        max_total_interactions = iterations * max_interactions_per_iteration
 
         interaction_density = (
             self.stats.total_number_interactions / max_total_interactions
+            if max_total_interactions
+            else 0.0
         )
 
         average_size_friendgroups = (
@@ -466,31 +1030,115 @@ class Simulation:
             0 if len(cliques) <= 0 else max(len(clique) for clique in cliques)
         )
 
-        isolated_cats = [
-            cat for cat in self.cats if cat.metrics.percent_of_friends == 0
-        ]
-
-        relationship_values = [
-            rel.value for rel in self.relationships.values() if rel.stats.interacted
-        ]
-        mean_relationship_value = (
-            0
-            if len(relationship_values) == 0
-            else sum(relationship_values) / len(relationship_values)
-        )
-
-        self.metrics = SimulationMetrics(
+        return SimulationMetrics(
             friendgroups_total=len(cliques),
             average_size_friendgroups=average_size_friendgroups,
             largest_group_size=largest_group_size,
             interaction_density=interaction_density,
-            isolated_cats_count=len(isolated_cats),
+            isolated_cats_count=isolated_cats_count,
             mean_relationship_value=mean_relationship_value,
+            iterations_run=iterations,
+            converged=self.converged_at is not None,
+        )
+
+    def metrics_snapshot(self) -> SimulationMetrics:
+        """
+        `SimulationMetrics` of the iterations run so far, e.g. for progress.
+
+        Built from the counters and running aggregates the steps keep, without
+        the per-cat and per-relationship metrics of `calculate_metrics`. The
+        friend groups are kept from the previous snapshot unless a friendship
+        started or ended since. The mean relationship value is summed in
+        another order than there and can differ from it in the last digits.
+        """
+        if self.snapshot_friendgroups is None:
+            self.snapshot_friendgroups = self.friendgroups(self.friend_pairs())
+        friends = self.stats_table().friends
+        interacted = self.stats.interacted_relationships
+        return self.simulation_metrics(
+            self.snapshot_friendgroups,
+            int(np.count_nonzero(np.asarray(friends) == 0)),
+            self.stats.relationship_value_sum / interacted if interacted else 0,
+            self.iteration,
+        )
+
+    def relationship_values(self):
+        """Values of all relationships, in insertion order."""
+        if isinstance(self.relationships, RelationshipMatrix):
+            keys = self.relationships.key_array()
+            return self.relationships.value[keys[:, 0], keys[:, 1]]
+        return np.fromiter(
+            (rel.value for rel in self.relationships.values()),
+            dtype=np.float64,
+            count=len(self.relationships),
+        )
+
+    def check_convergence(self):
+        """
+        Whether the relationships settled since the last check.
+
+        They have when no relationship changed between friend, neutral and
+        enemy and the values moved by at most `convergence_threshold` on
+        average. Before the first interaction nothing has settled yet, a
+        world where cats have not met is never converged.
+        """
+        if not self.stats.interacted_relationships:
+            return False
+        values = self.relationship_values()
+        reference, self.convergence_reference = self.convergence_reference, values
+        if reference is None:
+            return False
+        change = np.abs(values - reference).mean() if len(values) else 0.0
+        return change <= self.params.convergence_threshold and np.array_equal(
+            np.sign(values), np.sign(reference)
         )
 
-    def run(self):
-        for i in range(self.params.iterations):
+    def iterations_run(self):
+        if self.converged_at is not None:
+            return self.converged_at
+        return self.params.iterations
+
+    def run(
+        self,
+        checkpoint: Optional[Callable[["Simulation"], None]] = None,
+        checkpoint_every: int = 100,
+        recorder: Optional["TimeSeriesRecorder"] = None,
+        event_log: Optional["EventLogWriter"] = None,
+    ):
+        """
+        Run the remaining iterations and calculate the metrics.
+
+        `checkpoint` is called with the simulation after every
+        `checkpoint_every` iterations, e.g. to save it with `save_checkpoint`.
+        A `recorder` takes samples of the state along the way, an
+        `event_log` writes down every move and interaction.
+        With a `convergence_window` the run stops at the first check that
+        finds the relationships converged, see `check_convergence`.
+        """
+        window = self.params.convergence_window
+        if window and self.convergence_reference is None:
+            self.convergence_reference = self.relationship_values()
+        if recorder is not None:
+            recorder.start(self)
+        if event_log is not None:
+            event_log.start(self)
+            self.event_log = event_log
+
+        while self.iteration < self.params.iterations and self.converged_at is None:
             self.movement_step()
             self.engagement_step()
+            self.iteration += 1
+            if recorder is not None:
+                recorder.record(self)
+            if window and self.iteration % window == 0 and self.check_convergence():
+                self.converged_at = self.iteration
+                break
+            if checkpoint is not None and self.iteration % checkpoint_every == 0:
+                checkpoint(self)
 
+        if recorder is not None:
+            recorder.finish(self)
+        if event_log is not None:
+            self.event_log = None
+            event_log.finish(self)
         self.calculate_metrics()
@@ -1,9 +1,55 @@
+from collections.abc import Iterable
 from dataclasses import dataclass, field
-from typing import Optional
+from typing import Optional, Union
 import networkx as nx
+import numpy as np
 
 
-@dataclass
+class BitSet:
+    """Set of small non-negative ints, one bit per possible member."""
+
+    __slots__ = ("bits", "count")
+
+    def __init__(self, members: Iterable[int] = ()):
+        self.bits = bytearray()
+        self.count = 0
+        for member in members:
+            self.add(member)
+
+    def add(self, member: int):
+        byte, bit = divmod(member, 8)
+        if byte >= len(self.bits):
+            self.bits.extend(bytes(byte + 1 - len(self.bits)))
+        if not self.bits[byte] >> bit & 1:
+            self.bits[byte] |= 1 << bit
+            self.count += 1
+
+    def __contains__(self, member) -> bool:
+        byte, bit = divmod(member, 8)
+        return byte < len(self.bits) and bool(self.bits[byte] >> bit & 1)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        for byte, value in enumerate(self.bits):
+            while value:
+                low = value & -value
+                yield byte * 8 + low.bit_length() - 1
+                value ^= low
+
+    def __eq__(self, other):
+        if isinstance(other, BitSet):
+            return set(self) == set(other)
+        if isinstance(other, (set, frozenset)):
+            return set(self) == other
+        return NotImplemented
+
+    def __repr__(self):
+        return f"BitSet({sorted(self)})"
+
+
+@dataclass(slots=True)
 class CatMetrics:
     percent_time_spent_home: float
     percent_time_spent_on_edge: float
@@ -25,7 +71,7 @@ class CatMetrics:
     relationship_entropy: float
 
 
-@dataclass
+@dataclass(slots=True)
 class RelationshipMetrics:
     stability: float
     volatility: float
@@ -34,7 +80,7 @@ class RelationshipMetrics:
     number_of_sign_flips: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class CatTraits:
     id: int
     name: str
@@ -43,7 +89,7 @@ class CatTraits:
     lazy: float
 
 
-@dataclass
+@dataclass(slots=True)
 class CatStats:
     iter_at_home: int = 0
     iter_on_edge: int = 0
@@ -55,19 +101,141 @@ class CatStats:
     times_at_home: float = 0
     times_at_friendly: float = 0
     times_at_neutral: float = 0
-    interacted_with: set = field(default_factory=set)
-    nodes_visited: set = field(default_factory=set)
+    # relationships with a negative / positive value
+    friends: int = 0
+    enemies: int = 0
+    interacted_with: BitSet = field(default_factory=BitSet)
+    nodes_visited: BitSet = field(default_factory=BitSet)
+
+
+CAT_COUNTERS = (
+    "iter_at_home",
+    "iter_on_edge",
+    "iter_at_friendly",
+    "iter_at_neutral",
+    "fights",
+    "friendly_interaction",
+    "sleeps",
+    "times_at_home",
+    "times_at_friendly",
+    "times_at_neutral",
+    "friends",
+    "enemies",
+)
+
+
+class CatStatsTable:
+    """The `CatStats` of all cats of a simulation, one column per counter."""
+
+    def __init__(self, cat_amount: int):
+        self.columns = {
+            name: np.zeros(cat_amount, dtype=np.int64) for name in CAT_COUNTERS
+        }
+        self.interacted_with = [BitSet() for _ in range(cat_amount)]
+        self.nodes_visited = [BitSet() for _ in range(cat_amount)]
+
+    @classmethod
+    def from_stats(cls, stats: list[CatStats]):
+        table = cls(0)
+        table.columns = {
+            name: np.array([getattr(row, name) for row in stats], dtype=np.int64)
+            for name in CAT_COUNTERS
+        }
+        table.interacted_with = [row.interacted_with for row in stats]
+        table.nodes_visited = [row.nodes_visited for row in stats]
+        return table
+
+    def __getattr__(self, name) -> np.ndarray:
+        try:
+            return self.__dict__["columns"][name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __len__(self):
+        return len(self.interacted_with)
+
+    def row(self, cat_id: int) -> "CatStatsRow":
+        return CatStatsRow(self, cat_id)
+
+
+class ColumnField:
+    """Exposes the `CatStatsTable` column entry of one cat as an attribute."""
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.table.columns[self.name][obj.cat_id].item()
+
+    def __set__(self, obj, value):
+        obj.table.columns[self.name][obj.cat_id] = value
+
+
+class CatStatsRow:
+    """`CatStats` interface onto one cat's row of a `CatStatsTable`."""
+
+    __slots__ = ("table", "cat_id")
+
+    iter_at_home = ColumnField()
+    iter_on_edge = ColumnField()
+    iter_at_friendly = ColumnField()
+    iter_at_neutral = ColumnField()
+    fights = ColumnField()
+    friendly_interaction = ColumnField()
+    sleeps = ColumnField()
+    times_at_home = ColumnField()
+    times_at_friendly = ColumnField()
+    times_at_neutral = ColumnField()
+    friends = ColumnField()
+    enemies = ColumnField()
+
+    def __init__(self, table: CatStatsTable, cat_id: int):
+        self.table = table
+        self.cat_id = cat_id
+
+    @property
+    def interacted_with(self) -> BitSet:
+        return self.table.interacted_with[self.cat_id]
+
+    @property
+    def nodes_visited(self) -> BitSet:
+        return self.table.nodes_visited[self.cat_id]
 
 
 class Cat:
-    def __init__(self, traits: CatTraits):
+    __slots__ = (
+        "traits",
+        "current_node",
+        "target_node",
+        "needs_to_run",
+        "time_at_current_node",
+        "occupancy",
+        "stats",
+        "metrics",
+    )
+
+    def __init__(
+        self,
+        traits: CatTraits,
+        occupancy: Optional[dict[int, set[int]]] = None,
+        stats: Optional[CatStatsRow] = None,
+    ):
         self.traits = traits
         self.current_node = traits.home
         self.target_node: Optional[int] = None
         self.needs_to_run = False
         self.time_at_current_node = 0
 
-        self.stats: CatStats = CatStats()
+        # shared node id -> cat ids index, kept up to date by leave/arrive
+        self.occupancy = occupancy
+        if self.occupancy is not None:
+            self.occupancy.setdefault(self.current_node, set()).add(traits.id)
+
+        self.stats: Union[CatStats, CatStatsRow] = (
+            CatStats() if stats is None else stats
+        )
         self.stats.nodes_visited.add(traits.home)
         self.metrics: Optional[CatMetrics] = None
 
@@ -88,6 +256,11 @@ class Cat:
             raise ValueError(
                 "A cat cannot leave for the same node the cat is already at"
             )
+        if self.occupancy is not None:
+            cats_on_node = self.occupancy[self.current_node]
+            cats_on_node.discard(self.traits.id)
+            if not cats_on_node:
+                del self.occupancy[self.current_node]
         self.current_node = None
         self.target_node = target_node
 
@@ -95,6 +268,8 @@ class Cat:
         self.current_node = self.target_node
         self.target_node = None
         self.stats.nodes_visited.add(self.current_node)
+        if self.occupancy is not None:
+            self.occupancy.setdefault(self.current_node, set()).add(self.traits.id)
 
     def is_on_the_edge(self):
         return self.current_node is None
@@ -103,7 +278,7 @@ class Cat:
         return self.current_node == self.traits.home
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Edge:
     node1: int
     node2: int
@@ -115,19 +290,19 @@ class Edge:
         return self.node1 if self.node2 == node_id else self.node2
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Node:
     id: int
     number_of_edges: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RelationshipTraits:
     cat1: int
     cat2: int
 
 
-@dataclass
+@dataclass(slots=True)
 class RelationshipStats:
     absolute_delta: float = 0
     min_value: float = 0
@@ -136,7 +311,18 @@ class RelationshipStats:
     interacted: bool = False
 
 
+RELATIONSHIP_STATS = (
+    "absolute_delta",
+    "min_value",
+    "max_value",
+    "number_of_sign_flips",
+    "interacted",
+)
+
+
 class Relationship:
+    __slots__ = ("traits", "value", "stats", "metrics")
+
     def __init__(self, traits: RelationshipTraits):
         self.traits = traits
         self.value = 0
@@ -156,3 +342,11 @@ class Relationship:
         return (self.traits.cat1 == cat1 and self.traits.cat2 == cat2) or (
             self.traits.cat1 == cat2 and self.traits.cat2 == cat1
         )
+
+
+# kinds of events in an event log and what their `cat` and `other` hold
+MOVE = 0  # cat left its node for the node `other`
+ARRIVE = 1  # cat arrived at the node `other`
+FIGHT = 2  # cats `cat` and `other` fought, their relationship went up
+BEFRIEND = 3  # cats `cat` and `other` got along, their relationship went down
+END = 4  # the run stopped after the iteration, `cat` is 1 if it converged
@@ -0,0 +1,202 @@
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field, fields, replace
+import hashlib
+import itertools
+import json
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from simulation.cache import TopologyCache
+from simulation.ensemble import run_replica
+from simulation.simulation import SimulationMetrics, SimulationParameters
+
+INT_PARAMETERS = {
+    f.name for f in fields(SimulationParameters) if f.type in (int, "int")
+}
+
+
+@dataclass
+class ParameterSpace:
+    """
+    Declarative set of `SimulationParameters` to run.
+
+    Every combination of the `grid` values is run, combined with `samples`
+    points drawn from the `(low, high)` `ranges` by `method`:
+
+    - `grid`: no sampling, `ranges` must be empty
+    - `lhs`: Latin hypercube, every range is split into `samples` strata
+      that are each hit exactly once
+    - `random`: independent uniform draws
+
+    Integer parameters are rounded. Put `seed` in the grid for replicas.
+    """
+
+    base: SimulationParameters = field(default_factory=SimulationParameters)
+    grid: dict[str, list] = field(default_factory=dict)
+    ranges: dict[str, tuple[float, float]] = field(default_factory=dict)
+    method: str = "grid"
+    samples: int = 10
+    sample_seed: int = 0
+
+    def __post_init__(self):
+        if self.method not in ("grid", "lhs", "random"):
+            raise ValueError("method must be 'grid', 'lhs' or 'random'")
+        if self.method == "grid" and self.ranges:
+            raise ValueError("Sampled ranges need the 'lhs' or 'random' method")
+        if self.method != "grid" and self.samples <= 0:
+            raise ValueError("samples must be greater than 0")
+        names = {f.name for f in fields(SimulationParameters)}
+        for name in itertools.chain(self.grid, self.ranges):
+            if name not in names:
+                raise ValueError(f"Unknown simulation parameter '{name}'")
+
+    @classmethod
+    def from_dict(cls, spec: dict):
+        """Build a space from its JSON form, `base` holds parameter overrides."""
+        spec = dict(spec)
+        base = SimulationParameters(**spec.pop("base", {}))
+        ranges = {
+            name: tuple(bounds) for name, bounds in spec.pop("ranges", {}).items()
+        }
+        return cls(base=base, ranges=ranges, **spec)
+
+    def sample_ranges(self) -> list[dict]:
+        if not self.ranges:
+            return [{}]
+        rng = np.random.default_rng(self.sample_seed)
+        if self.method == "lhs":
+            strata = np.column_stack(
+                [rng.permutation(self.samples) for _ in self.ranges]
+            )
+            unit = (strata + rng.random(strata.shape)) / self.samples
+        else:
+            unit = rng.random((self.samples, len(self.ranges)))
+
+        low = np.array([bounds[0] for bounds in self.ranges.values()], dtype=float)
+        high = np.array([bounds[1] for bounds in self.ranges.values()], dtype=float)
+        points = low + unit * (high - low)
+        return [dict(zip(self.ranges, row)) for row in points.tolist()]
+
+    def expand(self) -> list["SweepPoint"]:
+        grid_points = [
+            dict(zip(self.grid, values))
+            for values in itertools.product(*self.grid.values())
+        ]
+        sampled_points = self.sample_ranges()
+        points = []
+        for grid_point in grid_points:
+            for sampled in sampled_points:
+                overrides = {**grid_point, **sampled}
+                for name in INT_PARAMETERS.intersection(overrides):
+                    overrides[name] = int(round(overrides[name]))
+                points.append(SweepPoint(overrides, replace(self.base, **overrides)))
+        return points
+
+
+@dataclass
+class SweepPoint:
+    # the parameters the space sets on top of its base
+    overrides: dict
+    params: SimulationParameters
+
+    @property
+    def key(self) -> str:
+        content = json.dumps(asdict(self.params), sort_keys=True)
+        return hashlib.sha256(content.encode()).hexdigest()
+
+
+class SweepJournal:
+    """
+    Append-only JSON lines record of finished sweep points.
+
+    A sweep that is interrupted and restarted with the same journal only runs
+    the points that are not in it yet.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries: dict[str, dict] = {}
+        if not self.path.exists():
+            return
+        lines = self.path.read_text().split("\n")
+        # a crash can leave a partly written last line, drop it so the next
+        # entry starts on a line of its own
+        if lines[-1]:
+            lines[-1] = ""
+            self.path.write_text("\n".join(lines))
+        for line in lines[:-1]:
+            entry = json.loads(line)
+            self.entries[entry["key"]] = entry
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def record(self, key: str, entry: dict):
+        entry = {"key": key, **entry}
+        with self.path.open("a") as file:
+            file.write(json.dumps(entry) + "\n")
+        self.entries[key] = entry
+
+
+def sweep_table(points: list[SweepPoint], metrics: dict[str, dict]) -> list[dict]:
+    """One row per point with results: its overrides and `SimulationMetrics`."""
+    return [
+        {**point.overrides, "seed": point.params.seed, **metrics[point.key]}
+        for point in points
+        if point.key in metrics
+    ]
+
+
+def run_sweep(
+    points: Iterable[SweepPoint],
+    workers: Optional[int] = None,
+    journal: Optional[SweepJournal] = None,
+    topology_cache: Optional[TopologyCache] = None,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+) -> list[dict]:
+    """
+    Run all points not yet in the `journal` and return the `sweep_table`.
+
+    Points run on a pool of `workers` processes (one per CPU by default), with
+    `workers=1` in this process. `on_progress(done, total)` is called after
+    every finished point, counting those taken from the journal.
+    """
+    points = list(points)
+    metrics: dict[str, dict] = {}
+    if journal is not None:
+        metrics.update(
+            (key, entry["metrics"])
+            for key, entry in journal.entries.items()
+            if "metrics" in entry
+        )
+    pending = {point.key: point for point in points if point.key not in metrics}
+    done = len(points) - len(pending)
+
+    def finish(point: SweepPoint, result_metrics: SimulationMetrics):
+        nonlocal done
+        metrics[point.key] = asdict(result_metrics)
+        if journal is not None:
+            journal.record(
+                point.key,
+                {"overrides": point.overrides, "metrics": metrics[point.key]},
+            )
+        done += 1
+        if on_progress is not None:
+            on_progress(done, len(points))
+
+    if workers == 1:
+        for point in pending.values():
+            finish(point, run_replica(point.params, topology_cache).metrics)
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(run_replica, point.params, topology_cache): point
+                for point in pending.values()
+            }
+            for future in as_completed(futures):
+                finish(futures[future], future.result().metrics)
+
+    return sweep_table(points, metrics)
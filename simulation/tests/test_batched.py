@@ -0,0 +1,165 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from simulation.batched import BatchedSimulation, greedy_matching
+from simulation.ensemble import run_ensemble
+from simulation.metrics import extract_metrics
+from simulation.simulation import Simulation
+
+
+@pytest.fixture
+def params(sample_sim):
+    return replace(
+        sample_sim.params,
+        iterations=60,
+        cat_amount=8,
+        node_amount=12,
+        mean_aggressive=-0.3,
+        relationship_store="matrix",
+        movement_engine="numpy",
+        engagement_engine="numpy",
+    )
+
+
+def test_batched_single_replica_matches_numpy_engines(params):
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    sim.movement_rng = sim.engagement_rng = np.random.default_rng(7)
+    sim.run()
+
+    batch = BatchedSimulation(params, [params.seed])
+    batch.generate_initial_state()
+    batch.rng = np.random.default_rng(7)
+    batch.run()
+
+    assert sim.stats.total_number_interactions > 0
+    assert extract_metrics(batch.simulations[0]) == extract_metrics(sim)
+    replica = batch.simulations[0]
+    assert replica.cat_positions().tolist() == sim.cat_positions().tolist()
+    assert replica.occupancy == sim.occupancy
+    assert replica.iteration == sim.iteration
+    assert replica.stats.interacted_relationships == sim.stats.interacted_relationships
+    assert replica.stats.relationship_value_sum == pytest.approx(
+        sim.stats.relationship_value_sum
+    )
+
+
+def test_batched_replicas(params):
+    batch = BatchedSimulation(params, [1, 2, 3])
+    batch.generate_initial_state()
+    batch.run()
+
+    for seed, replica in zip([1, 2, 3], batch.simulations):
+        sim = Simulation(replace(params, seed=seed))
+        sim.generate_initial_state()
+        assert replica.params.seed == seed
+        assert replica.edges == sim.edges
+        assert [cat.traits for cat in replica.cats] == [cat.traits for cat in sim.cats]
+
+        table = replica.stats_table()
+        time_spent = (
+            table.iter_at_home
+            + table.iter_on_edge
+            + table.iter_at_neutral
+            + table.iter_at_friendly
+        )
+        assert time_spent.tolist() == [params.iterations] * params.cat_amount
+        assert replica.metrics is not None
+
+    again = BatchedSimulation(params, [1, 2, 3])
+    again.generate_initial_state()
+    again.run()
+    assert [sim.metrics for sim in again.simulations] == [
+        sim.metrics for sim in batch.simulations
+    ]
+
+
+def test_greedy_matching():
+    rng = np.random.default_rng(3)
+    cat1 = rng.integers(0, 20, 200)
+    cat2 = (cat1 + rng.integers(1, 20, 200)) % 20
+
+    engaged = set()
+    expected = []
+    for i, j in zip(cat1.tolist(), cat2.tolist()):
+        picked = i not in engaged and j not in engaged
+        if picked:
+            engaged.update((i, j))
+        expected.append(picked)
+
+    assert greedy_matching(cat1, cat2, 20).tolist() == expected
+
+
+def test_run_ensemble_batched(params):
+    result = run_ensemble(params, [4, 5, 6], workers=1, batched=True)
+
+    assert [replica.seed for replica in result.replicas] == [4, 5, 6]
+    assert result.summary["interaction_density"].mean > 0
+
+
+def test_batched_single_replica_converges_like_numpy_engines(params):
+    params = replace(
+        params, iterations=300, convergence_window=10, convergence_threshold=0.01
+    )
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    sim.movement_rng = sim.engagement_rng = np.random.default_rng(7)
+    sim.run()
+
+    batch = BatchedSimulation(params, [params.seed])
+    batch.generate_initial_state()
+    batch.rng = np.random.default_rng(7)
+    batch.run()
+
+    assert sim.converged_at < 300
+    assert batch.simulations[0].converged_at == sim.converged_at
+    assert extract_metrics(batch.simulations[0]) == extract_metrics(sim)
+
+
+def test_batched_replicas_converge_on_their_own(params):
+    params = replace(
+        params, iterations=300, convergence_window=10, convergence_threshold=0.01
+    )
+    batch = BatchedSimulation(params, [1, 2, 3, 4])
+    batch.generate_initial_state()
+    batch.run()
+
+    converged_at = [sim.converged_at for sim in batch.simulations]
+    assert None not in converged_at
+    assert len(set(converged_at)) > 1
+    assert batch.iteration == max(converged_at)
+    for sim in batch.simulations:
+        table = sim.stats_table()
+        assert sim.iteration == sim.converged_at
+        assert (
+            table.iter_at_home
+            + table.iter_at_neutral
+            + table.iter_at_friendly
+            + table.iter_on_edge
+            == sim.converged_at
+        ).all()
+
+    result = run_ensemble(params, [1, 2, 3, 4], workers=1, batched=True)
+    for replica, sim in zip(result.replicas, batch.simulations):
+        assert replica.metrics.converged is True
+        assert replica.metrics.iterations_run == sim.converged_at
+
+
+def test_batched_replicas_do_not_converge_before_cats_meet(params):
+    params = replace(
+        params, iterations=100, cat_amount=3, node_amount=1000, convergence_window=10
+    )
+    batch = BatchedSimulation(params, [0, 1, 2])
+    batch.generate_initial_state()
+    batch.run()
+
+    for sim in batch.simulations:
+        assert sim.converged_at is None or sim.stats.interacted_relationships > 0
+    assert any(sim.converged_at is None for sim in batch.simulations)
+
+
+def test_batched_needs_seeds(params):
+    with pytest.raises(ValueError):
+        BatchedSimulation(params, [])
@@ -0,0 +1,93 @@
+from dataclasses import replace
+import os
+from pathlib import Path
+
+from simulation import cache as cache_module
+from simulation.cache import TopologyCache
+from simulation.metrics import extract_metrics
+from simulation.simulation import Simulation
+
+
+def test_topology_cache_reproduces_uncached_run(sample_sim, tmp_path):
+    cache = TopologyCache(tmp_path)
+    sample_sim.generate_initial_state()
+    sample_sim.run()
+
+    first = Simulation(sample_sim.params, topology_cache=cache)
+    first.generate_initial_state()
+    assert len(cache) == 1
+
+    cached = Simulation(sample_sim.params, topology_cache=cache)
+    cached.generate_initial_state()
+    assert cached.edges == sample_sim.edges
+    assert [cat.traits for cat in cached.cats] == [
+        cat.traits for cat in sample_sim.cats
+    ]
+    cached.run()
+    assert extract_metrics(cached) == extract_metrics(sample_sim)
+
+
+def test_topology_cache_keys_on_graph_parameters(sample_sim, tmp_path):
+    cache = TopologyCache(tmp_path)
+    params = sample_sim.params
+
+    assert cache.key(params) == cache.key(replace(params, mean_aggressive=0.5))
+    assert cache.key(params) != cache.key(replace(params, seed=2))
+    assert cache.key(params) != cache.key(replace(params, node_amount=8))
+    assert cache.key(params) != cache.key(replace(params, graph_generator="fast"))
+
+
+def test_topology_cache_evicts_least_recently_used(sample_sim, tmp_path):
+    cache = TopologyCache(tmp_path, max_entries=2)
+    params = [replace(sample_sim.params, seed=seed) for seed in range(3)]
+
+    for i in (0, 1):
+        Simulation(params[i], topology_cache=cache).generate_initial_state()
+    assert cache.load(params[0]) is not None
+    Simulation(params[2], topology_cache=cache).generate_initial_state()
+
+    assert len(cache) == 2
+    assert cache.load(params[1]) is None
+    assert cache.load(params[0]) is not None
+    assert cache.load(params[2]) is not None
+
+
+def test_topology_cache_load_survives_concurrent_eviction(
+    sample_sim, tmp_path, monkeypatch
+):
+    cache = TopologyCache(tmp_path)
+    Simulation(sample_sim.params, topology_cache=cache).generate_initial_state()
+
+    def evicted(path):
+        os.unlink(path)
+        raise FileNotFoundError(path)
+
+    monkeypatch.setattr(cache_module.os, "utime", evicted)
+    assert cache.load(sample_sim.params) is not None
+    assert len(cache) == 0
+
+
+def test_topology_cache_evict_skips_vanished_entries(
+    sample_sim, tmp_path, monkeypatch
+):
+    cache = TopologyCache(tmp_path, max_entries=1)
+    params = [replace(sample_sim.params, seed=seed) for seed in range(3)]
+    for i in (0, 1):
+        Simulation(params[i], topology_cache=cache).generate_initial_state()
+    vanishing = cache.path(params[1])
+    os.utime(vanishing, (1, 1))
+    stat = Path.stat
+
+    # another process removes the oldest entry between listing and stat
+    def racing_stat(path, *args, **kwargs):
+        if path == vanishing:
+            path.unlink()
+            raise FileNotFoundError(path)
+        return stat(path, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "stat", racing_stat)
+    Simulation(params[2], topology_cache=cache).generate_initial_state()
+    monkeypatch.undo()
+
+    assert len(cache) == 1
+    assert cache.load(params[2]) is not None
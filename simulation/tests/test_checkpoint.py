@@ -0,0 +1,103 @@
+from dataclasses import replace
+
+import pytest
+
+from simulation.checkpoint import load_checkpoint, save_checkpoint
+from simulation.metrics import extract_metrics
+from simulation.simulation import Simulation
+
+
+@pytest.mark.parametrize(
+    "engines",
+    [
+        {},
+        {"relationship_store": "matrix"},
+        {
+            "relationship_store": "matrix",
+            "movement_engine": "numpy",
+            "engagement_engine": "numpy",
+        },
+    ],
+)
+def test_resume_from_checkpoint(sample_sim, tmp_path, engines):
+    params = replace(
+        sample_sim.params, iterations=60, cat_amount=6, mean_aggressive=-0.3, **engines
+    )
+    uninterrupted = Simulation(params)
+    uninterrupted.generate_initial_state()
+    uninterrupted.run()
+
+    path = tmp_path / "checkpoint.npz"
+    saved = []
+
+    def checkpoint(sim):
+        save_checkpoint(sim, path)
+        saved.append(sim.iteration)
+
+    interrupted = Simulation(params)
+    interrupted.generate_initial_state()
+    interrupted.run(checkpoint=checkpoint, checkpoint_every=25)
+    assert saved == [25, 50]
+
+    resumed = load_checkpoint(path)
+    assert resumed.iteration == 50
+    resumed.run()
+
+    assert uninterrupted.stats.total_number_interactions > 0
+    assert extract_metrics(resumed) == extract_metrics(uninterrupted)
+    assert resumed.occupancy == uninterrupted.occupancy
+
+
+def test_checkpoint_round_trip(sample_sim, tmp_path):
+    sample_sim.generate_initial_state()
+    for _ in range(10):
+        sample_sim.movement_step()
+        sample_sim.engagement_step()
+    sample_sim.iteration = 10
+    path = tmp_path / "checkpoint.npz"
+    save_checkpoint(sample_sim, path)
+
+    loaded = load_checkpoint(path)
+
+    assert loaded.params == sample_sim.params
+    assert loaded.edges == sample_sim.edges
+    assert [cat.traits for cat in loaded.cats] == [cat.traits for cat in sample_sim.cats]
+    assert [cat.stats for cat in loaded.cats] == [cat.stats for cat in sample_sim.cats]
+    assert loaded.home_cats == sample_sim.home_cats
+    assert loaded.stats.interacted_relationships == (
+        sample_sim.stats.interacted_relationships
+    )
+    assert loaded.rng.getstate() == sample_sim.rng.getstate()
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_resume_keeps_convergence_check(sample_sim, tmp_path):
+    params = replace(
+        sample_sim.params,
+        iterations=200,
+        cat_amount=10,
+        node_amount=5,
+        convergence_window=5,
+        convergence_threshold=0.01,
+    )
+    uninterrupted = Simulation(params)
+    uninterrupted.generate_initial_state()
+    uninterrupted.run()
+    assert uninterrupted.converged_at > 10
+
+    path = tmp_path / "checkpoint.npz"
+    interrupted = Simulation(params)
+    interrupted.generate_initial_state()
+    while interrupted.iteration < 12:
+        interrupted.movement_step()
+        interrupted.engagement_step()
+        interrupted.iteration += 1
+        if interrupted.iteration % 5 == 0:
+            interrupted.check_convergence()
+    save_checkpoint(interrupted, path)
+
+    resumed = load_checkpoint(path)
+    resumed.run()
+
+    assert resumed.converged_at == uninterrupted.converged_at
+    assert extract_metrics(resumed) == extract_metrics(uninterrupted)
@@ -0,0 +1,61 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from simulation.ensemble import iter_ensemble, run_ensemble, run_replica
+from simulation.simulation import Simulation
+
+
+def test_run_replica_matches_simulation(sample_sim):
+    sample_sim.generate_initial_state()
+    sample_sim.run()
+
+    result = run_replica(sample_sim.params, detailed=True)
+
+    assert result.seed == sample_sim.params.seed
+    assert result.metrics == sample_sim.metrics
+    assert result.details["simulation"]["friendgroups_total"] == 0
+
+
+def test_run_ensemble_serial(sample_sim):
+    streamed = []
+    result = run_ensemble(
+        sample_sim.params, [3, 1, 2], workers=1, on_result=streamed.append
+    )
+
+    assert [replica.seed for replica in result.replicas] == [3, 1, 2]
+    assert len(streamed) == 3
+    for replica in result.replicas:
+        sim = Simulation(replace(sample_sim.params, seed=replica.seed))
+        sim.generate_initial_state()
+        sim.run()
+        assert replica.metrics == sim.metrics
+
+    densities = [replica.metrics.interaction_density for replica in result.replicas]
+    summary = result.summary["interaction_density"]
+    assert summary.mean == pytest.approx(np.mean(densities))
+    assert summary.variance == pytest.approx(np.var(densities, ddof=1))
+    assert summary.quantiles[0.5] == pytest.approx(np.median(densities))
+
+
+def test_run_ensemble_pool_matches_serial(sample_sim):
+    serial = run_ensemble(sample_sim.params, range(4), workers=1)
+    pooled = run_ensemble(sample_sim.params, range(4), workers=2)
+
+    assert pooled == serial
+
+
+def test_iter_ensemble_streams_every_seed(sample_sim):
+    seeds = {result.seed for result in iter_ensemble(sample_sim.params, range(3), 2)}
+    assert seeds == {0, 1, 2}
+
+
+def test_run_ensemble_single_replica(sample_sim):
+    result = run_ensemble(sample_sim.params, [1], workers=1)
+    assert result.summary["interaction_density"].variance == 0
+
+
+def test_run_ensemble_needs_seeds(sample_sim):
+    with pytest.raises(ValueError):
+        run_ensemble(sample_sim.params, [], workers=1)
@@ -0,0 +1,137 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from simulation.eventlog import EVENT, EventLogWriter, Replay, read_event_log
+from simulation.metrics import extract_metrics
+from simulation.simulation import Simulation
+from simulation.state import BEFRIEND, END, FIGHT, MOVE
+
+ENGINES = [
+    {},
+    {"relationship_store": "matrix"},
+    {
+        "relationship_store": "matrix",
+        "movement_engine": "numpy",
+        "engagement_engine": "numpy",
+    },
+]
+
+
+def logged_run(params, path):
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    sim.run(event_log=EventLogWriter(path))
+    return sim
+
+
+@pytest.mark.parametrize("engines", ENGINES)
+def test_replay_reproduces_metrics(sample_sim, tmp_path, engines):
+    params = replace(
+        sample_sim.params, iterations=60, cat_amount=8, mean_aggressive=-0.2, **engines
+    )
+    sim = logged_run(params, tmp_path / "run.events")
+
+    replay = Replay(tmp_path / "run.events")
+    assert (replay.start, replay.end) == (0, 60)
+    assert replay.metrics_at(60) == extract_metrics(sim)
+
+
+@pytest.mark.parametrize("engines", ENGINES)
+def test_replay_at_earlier_iteration(sample_sim, tmp_path, engines):
+    params = replace(
+        sample_sim.params, iterations=60, cat_amount=8, mean_aggressive=-0.2, **engines
+    )
+    logged_run(params, tmp_path / "run.events")
+    shorter = Simulation(replace(params, iterations=25))
+    shorter.generate_initial_state()
+    shorter.run()
+
+    replay = Replay(tmp_path / "run.events")
+    replay.metrics_at(60)
+    # going back starts over from the start of the log
+    assert replay.metrics_at(25) == extract_metrics(shorter)
+    assert replay.state_at(25).cat_positions().tolist() == (
+        shorter.cat_positions().tolist()
+    )
+
+
+def test_replay_of_converged_run(sample_sim, tmp_path):
+    params = replace(
+        sample_sim.params,
+        iterations=200,
+        cat_amount=10,
+        node_amount=5,
+        convergence_window=5,
+        convergence_threshold=0.01,
+    )
+    sim = logged_run(params, tmp_path / "run.events")
+
+    replay = Replay(tmp_path / "run.events")
+    assert replay.end == sim.converged_at
+    assert replay.metrics_at(replay.end) == extract_metrics(sim)
+
+
+def test_event_log_records(sample_sim, tmp_path):
+    params = replace(sample_sim.params, cat_amount=8, mean_aggressive=-0.2)
+    sim = logged_run(params, tmp_path / "run.events")
+
+    header, events = read_event_log(tmp_path / "run.events")
+    assert events.dtype == EVENT
+    assert EVENT.itemsize == 13
+    assert (np.diff(events["iteration"].astype(int)) >= 0).all()
+    assert events[-1]["kind"] == END
+    interactions = np.isin(events["kind"], [FIGHT, BEFRIEND]).sum()
+    assert interactions == sim.stats.total_number_interactions
+    moves = events[events["kind"] == MOVE]
+    assert moves["other"].max() < params.node_amount
+
+
+def test_replay_of_cut_off_log(sample_sim, tmp_path):
+    params = replace(sample_sim.params, cat_amount=8, mean_aggressive=-0.2)
+    path = tmp_path / "run.events"
+    logged_run(params, path)
+    content = path.read_bytes()
+    # a crash in the middle of the last written record, before the end
+    path.write_bytes(content[: -EVENT.itemsize - 5])
+
+    replay = Replay(path)
+    _, events = read_event_log(path)
+    assert replay.end == events["iteration"][-1] - 1
+    replay.metrics_at(replay.end)
+
+
+def test_replay_checks_interactions_against_the_model(sample_sim, tmp_path):
+    params = replace(sample_sim.params, cat_amount=8, mean_aggressive=-0.2)
+    path = tmp_path / "run.events"
+    logged_run(params, path)
+    _, events = read_event_log(path)
+    offset = path.stat().st_size - len(events) * EVENT.itemsize
+    logged = np.memmap(path, dtype=EVENT, mode="r+", offset=offset, shape=events.shape)
+    first = np.flatnonzero(np.isin(logged["kind"], [FIGHT, BEFRIEND]))[0]
+    logged["kind"][first] = FIGHT + BEFRIEND - logged["kind"][first]
+    logged.flush()
+    del logged
+
+    replay = Replay(path)
+    with pytest.raises(ValueError):
+        replay.state_at(replay.end)
+
+
+def test_replay_has_no_metrics_before_the_first_iteration(sample_sim, tmp_path):
+    logged_run(sample_sim.params, tmp_path / "run.events")
+    replay = Replay(tmp_path / "run.events")
+
+    assert replay.start == 0
+    assert replay.state_at(0).iteration == 0
+    with pytest.raises(ValueError, match="before the first iteration"):
+        replay.metrics_at(0)
+    assert replay.metrics_at(1)["simulation"]["iterations_run"] == 1
+
+
+def test_replay_rejects_other_files(tmp_path):
+    path = tmp_path / "run.events"
+    path.write_bytes(b"not a log")
+    with pytest.raises(ValueError):
+        Replay(path)
@@ -0,0 +1,129 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from simulation.events import EventDrivenSimulation
+from simulation.simulation import Simulation
+
+
+@pytest.fixture
+def params(sample_sim):
+    return replace(
+        sample_sim.params,
+        iterations=300,
+        cat_amount=8,
+        node_amount=40,
+        mean_aggressive=-0.3,
+    )
+
+
+def counted_iterations(sim):
+    table = sim.stats_table()
+    return (
+        table.iter_at_home
+        + table.iter_at_neutral
+        + table.iter_at_friendly
+        + table.iter_on_edge
+    )
+
+
+def test_event_driven_counts_every_iteration(params):
+    events = EventDrivenSimulation(params)
+    events.generate_initial_state()
+    events.run()
+    sim = events.simulation
+
+    assert sim.iteration == 300
+    assert sim.metrics.iterations_run == 300
+    assert sim.converged_at is None
+    assert (counted_iterations(sim) == 300).all()
+    table = sim.stats_table()
+    assert (table.sleeps <= 300 - table.iter_on_edge).all()
+    assert sim.stats.total_number_interactions > 0
+
+    interacted = sim.stats.interacted_relationships
+    value_sum = sim.stats.relationship_value_sum
+    sim.recount_metric_aggregates()
+    assert sim.stats.interacted_relationships == interacted
+    assert sim.stats.relationship_value_sum == pytest.approx(value_sum)
+
+
+def test_event_driven_schedules_lone_cats_only(params):
+    events = EventDrivenSimulation(params)
+    events.generate_initial_state()
+    sim = events.simulation
+
+    for cat in sim.cats:
+        if events.crowded(cat):
+            assert cat.traits.id not in events.scheduled
+        else:
+            iteration, node_id = events.scheduled[cat.traits.id]
+            assert 0 <= iteration < params.iterations
+            assert node_id in sim.adjacency[cat.current_node]
+
+
+def test_event_driven_matches_step_model(params):
+    step_edge, event_edge = [], []
+    step_sleeps, event_sleeps = [], []
+    for seed in range(12):
+        seeded = replace(params, seed=seed)
+        sim = Simulation(seeded)
+        sim.generate_initial_state()
+        sim.run()
+        events = EventDrivenSimulation(seeded)
+        events.generate_initial_state()
+        events.run()
+
+        step_edge.append(sim.stats_table().iter_on_edge.mean())
+        event_edge.append(events.simulation.stats_table().iter_on_edge.mean())
+        step_sleeps.append(sim.stats_table().sleeps.mean())
+        event_sleeps.append(events.simulation.stats_table().sleeps.mean())
+
+    assert np.mean(event_edge) == pytest.approx(np.mean(step_edge), rel=0.05)
+    assert np.mean(event_sleeps) == pytest.approx(np.mean(step_sleeps), rel=0.05)
+
+
+def test_event_driven_stops_when_converged(params):
+    params = replace(
+        params,
+        cat_amount=10,
+        node_amount=5,
+        convergence_window=5,
+        convergence_threshold=0.01,
+    )
+    events = EventDrivenSimulation(params)
+    events.generate_initial_state()
+    events.run()
+    sim = events.simulation
+
+    assert sim.converged_at is not None
+    assert sim.converged_at % 5 == 0
+    assert sim.iteration == sim.converged_at
+    assert sim.metrics.converged is True
+    assert (counted_iterations(sim) == sim.converged_at).all()
+
+
+def test_event_driven_does_not_converge_before_cats_meet(params):
+    params = replace(
+        params, seed=0, cat_amount=3, node_amount=1000, convergence_window=10
+    )
+    events = EventDrivenSimulation(params)
+    events.generate_initial_state()
+    events.run()
+    sim = events.simulation
+
+    assert sim.stats.total_number_interactions == 0
+    assert sim.converged_at is None
+    assert sim.iteration == 300
+
+
+def test_event_driven_needs_python_engines(params):
+    with pytest.raises(ValueError):
+        EventDrivenSimulation(
+            replace(params, relationship_store="matrix", movement_engine="numpy")
+        )
+    with pytest.raises(ValueError):
+        EventDrivenSimulation(
+            replace(params, relationship_store="matrix", engagement_engine="numpy")
+        )
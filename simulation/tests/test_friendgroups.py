@@ -0,0 +1,51 @@
+import networkx as nx
+import pytest
+
+from simulation.friendgroups import find_friendgroups, greedy_clique_cover
+
+
+@pytest.fixture
+def friendship_graph():
+    G = nx.Graph()
+    G.add_nodes_from(range(9))
+    # two triangles sharing cat 2, plus a path 5 - 6 - 7
+    G.add_edges_from([(0, 1), (1, 2), (0, 2), (2, 3), (3, 4), (2, 4), (5, 6), (6, 7)])
+    return G
+
+
+def test_find_friendgroups_exact(friendship_graph):
+    groups = find_friendgroups(friendship_graph, "exact")
+    assert sorted(sorted(group) for group in groups) == [[0, 1, 2], [2, 3, 4]]
+
+
+def test_find_friendgroups_auto_matches_exact_within_budget(friendship_graph):
+    assert find_friendgroups(friendship_graph, "auto") == find_friendgroups(
+        friendship_graph, "exact"
+    )
+
+
+def test_find_friendgroups_auto_falls_back_to_greedy(friendship_graph):
+    groups = find_friendgroups(friendship_graph, "auto", clique_budget=1)
+    assert groups == find_friendgroups(friendship_graph, "greedy")
+
+
+def test_find_friendgroups_greedy_is_a_clique_cover(friendship_graph):
+    cover = greedy_clique_cover(friendship_graph)
+    assert sorted(cat for group in cover for cat in group) == list(range(9))
+    for group in cover:
+        assert all(
+            friendship_graph.has_edge(a, b) for a in group for b in group if a != b
+        )
+    assert [sorted(group) for group in find_friendgroups(friendship_graph, "greedy")] == [
+        [0, 1, 2]
+    ]
+
+
+def test_find_friendgroups_components(friendship_graph):
+    groups = find_friendgroups(friendship_graph, "components")
+    assert sorted(sorted(group) for group in groups) == [[0, 1, 2, 3, 4], [5, 6, 7]]
+
+
+def test_find_friendgroups_unknown_mode(friendship_graph):
+    with pytest.raises(ValueError):
+        find_friendgroups(friendship_graph, "fast")
@@ -0,0 +1,28 @@
+import networkx as nx
+import numpy as np
+
+from simulation.graph import generate_graph
+
+
+def test_generate_graph_is_connected_and_simple():
+    rng = np.random.default_rng(3)
+    degrees, edges = generate_graph(2000, 4, 1.0, rng)
+
+    assert len(degrees) == 2000
+    assert (degrees >= 1).all()
+    assert (edges[:, 0] != edges[:, 1]).all()
+    pairs = {tuple(sorted(edge)) for edge in edges.tolist()}
+    assert len(pairs) == len(edges)
+
+    G = nx.Graph()
+    G.add_nodes_from(range(2000))
+    G.add_edges_from(edges.tolist())
+    assert nx.is_connected(G)
+    assert 3.5 < 2 * len(edges) / 2000 < 5
+
+
+def test_generate_graph_is_reproducible():
+    _, edges1 = generate_graph(500, 4, 1.0, np.random.default_rng(7))
+    _, edges2 = generate_graph(500, 4, 1.0, np.random.default_rng(7))
+
+    assert np.array_equal(edges1, edges2)
@@ -1,3 +1,4 @@
+from dataclasses import asdict
 from simulation.metrics import extract_metrics
 
 
@@ -18,3 +19,33 @@ def test_extract_metrics(sample_sim):
 
     assert len(metrics["relationships"]) == 3
     assert len(metrics["cats"]) == 3
+
+
+def test_extract_metrics_before_run(sample_sim):
+    sample_sim.generate_initial_state()
+    metrics = extract_metrics(sample_sim)
+
+    assert metrics["simulation"] == {}
+    assert metrics["cats"][0] == {
+        "id": 0,
+        "traits": asdict(sample_sim.cats[0].traits),
+    }
+    assert metrics["relationships"][0] == {"key": (0, 1), "value": 0}
+
+
+def test_extract_metrics_matches_objects(sample_sim):
+    sample_sim.generate_initial_state()
+    sample_sim.run()
+    metrics = extract_metrics(sample_sim)
+
+    for cat, row in zip(sample_sim.cats, metrics["cats"]):
+        assert row["id"] == cat.traits.id
+        assert {k: v for k, v in row.items() if k not in ("id", "traits")} == asdict(
+            cat.metrics
+        )
+    for rel, row in zip(sample_sim.relationships.values(), metrics["relationships"]):
+        assert row["key"] == (rel.traits.cat1, rel.traits.cat2)
+        assert row["value"] == rel.value
+        assert {k: v for k, v in row.items() if k not in ("key", "value")} == asdict(
+            rel.metrics
+        )
@@ -0,0 +1,87 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from simulation.metrics import extract_metrics
+from simulation.recorder import TimeSeriesRecorder
+from simulation.simulation import Simulation
+
+
+def record(params, **kwargs):
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    recorder = TimeSeriesRecorder(**kwargs)
+    sim.run(recorder=recorder)
+    return sim, recorder
+
+
+def test_recorder_samples_every_iteration(sample_sim):
+    params = replace(sample_sim.params, cat_amount=6, mean_aggressive=-0.3)
+    sim, recorder = record(params)
+
+    assert recorder["iterations"].tolist() == list(range(1, 31))
+    assert recorder["relationship_values"].shape == (30, len(sim.relationships))
+    assert recorder["relationship_values"][-1].tolist() == (
+        sim.relationship_values().tolist()
+    )
+    assert recorder["occupancy"].shape == (30, len(sim.nodes))
+    assert (recorder["occupancy"].sum(axis=1) <= 6).all()
+    assert recorder["interactions"].sum() == sim.stats.total_number_interactions
+
+
+def test_recorder_does_not_change_the_run(sample_sim):
+    params = replace(sample_sim.params, cat_amount=6, mean_aggressive=-0.3)
+    plain = Simulation(params)
+    plain.generate_initial_state()
+    plain.run()
+    recorded, _ = record(params)
+
+    assert extract_metrics(recorded) == extract_metrics(plain)
+
+
+def test_recorder_stride(sample_sim):
+    params = replace(sample_sim.params, cat_amount=6, mean_aggressive=-0.3)
+    _, full = record(params)
+    _, strided = record(params, series=["occupancy", "interactions"], stride=7)
+
+    assert strided["iterations"].tolist() == [7, 14, 21, 28]
+    assert strided.buffers.keys() == {"occupancy", "interactions"}
+    assert np.array_equal(strided["occupancy"], full["occupancy"][6::7])
+    # interactions are summed over the stride, not sampled
+    assert strided["interactions"].tolist() == [
+        full["interactions"][i - 7 : i].sum() for i in (7, 14, 21, 28)
+    ]
+
+
+def test_recorder_on_disk(sample_sim, tmp_path):
+    params = replace(sample_sim.params, cat_amount=6, mean_aggressive=-0.3)
+    _, in_memory = record(params, stride=5)
+    _, on_disk = record(params, stride=5, directory=tmp_path / "series")
+
+    for name in ("iterations", "relationship_values", "occupancy", "interactions"):
+        saved = np.load(tmp_path / "series" / f"{name}.npy")
+        assert np.array_equal(saved, in_memory[name])
+
+
+def test_recorder_stops_with_converged_run(sample_sim):
+    params = replace(
+        sample_sim.params,
+        iterations=200,
+        cat_amount=10,
+        node_amount=5,
+        convergence_window=5,
+        convergence_threshold=0.01,
+    )
+    sim, recorder = record(params, stride=5)
+
+    assert sim.converged_at < 200
+    assert recorder["iterations"][-1] == sim.converged_at
+    assert len(recorder.iterations) == 40
+
+
+def test_recorder_validates_arguments():
+    with pytest.raises(ValueError):
+        TimeSeriesRecorder(series=["friendgroups"])
+    with pytest.raises(ValueError):
+        TimeSeriesRecorder(stride=0)
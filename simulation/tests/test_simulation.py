@@ -1,4 +1,11 @@
-from dataclasses import asdict
+from dataclasses import asdict, replace
+import random
+
+import pytest
+
+from simulation.metrics import extract_metrics
+from simulation.relationships import RelationshipMatrix
+from simulation.simulation import Simulation, SimulationParameters
 
 
 def test_simulation_instantiation(sample_sim):
@@ -13,6 +20,14 @@ def test_simulation_instantiation(sample_sim):
         "var_aggressive": 0.1,
         "mean_laziness": 0.5,
         "var_laziness": 0.05,
+        "relationship_store": "dict",
+        "movement_engine": "python",
+        "engagement_engine": "python",
+        "graph_generator": "legacy",
+        "friendgroup_mode": "auto",
+        "clique_budget": 10000,
+        "convergence_window": 0,
+        "convergence_threshold": 0.001,
     }
     assert asdict(sample_sim.params) == kwargs
     assert sample_sim.cats == []
@@ -152,3 +167,404 @@ def test_simulation_method_run(sample_sim):
     assert sample_sim.relationships[(0, 1)].metrics.max_value == 0
     assert sample_sim.relationships[(0, 1)].metrics.min_value == -0.05
     assert sample_sim.relationships[(0, 1)].metrics.number_of_sign_flips == 1
+
+
+def test_simulation_adjacency_matches_edges(sample_sim):
+    sample_sim.generate_initial_state()
+
+    for node in sample_sim.nodes:
+        expected = [
+            edge.other_node(node.id)
+            for edge in sample_sim.edges
+            if edge.node_in_edge(node.id)
+        ]
+        assert sample_sim.get_nodes_edge_partners(node.id) == expected
+        assert len(sample_sim.get_nodes_edges(node.id)) == len(expected)
+        assert sample_sim.get_node(node.id) is node
+
+
+def test_simulation_occupancy_matches_cats(sample_sim):
+    sample_sim.generate_initial_state()
+
+    for _ in range(5):
+        sample_sim.movement_step()
+        sample_sim.engagement_step()
+        for node in sample_sim.nodes:
+            expected = [
+                cat.traits.id
+                for cat in sample_sim.cats
+                if cat.current_node == node.id
+            ]
+            assert sample_sim.get_cats_on_node(node.id) == expected
+
+
+def test_simulation_get_cat(sample_sim):
+    sample_sim.generate_initial_state()
+
+    assert [sample_sim.get_cat(i).traits.id for i in range(3)] == [0, 1, 2]
+    assert sample_sim.get_cat(3) is None
+    assert sample_sim.get_cat(-1) is None
+
+
+def test_simulation_engagement_skips_lone_cats(sample_sim):
+    sample_sim.generate_initial_state()
+    # every cat alone on its own node
+    for cat, node_id in zip(sample_sim.cats, (1, 2, 3)):
+        cat.leave(node_id)
+        cat.arrive()
+    state = sample_sim.rng.getstate()
+
+    sample_sim.engagement_step()
+
+    assert sample_sim.rng.getstate() == state
+    assert sample_sim.stats.total_number_interactions == 0
+    assert [cat.stats.sleeps for cat in sample_sim.cats] == [1, 1, 1]
+
+
+def test_simulation_forbidden_nodes_follow_relationships(sample_sim):
+    sample_sim.generate_initial_state()
+    assert sample_sim.home_cats == {4: [0], 5: [1], 0: [2]}
+    assert sample_sim.get_forbidden_nodes(0) == set()
+
+    sample_sim.get_relationship(0, 1).value = 0.5
+    assert sample_sim.get_forbidden_nodes(0) == set()
+
+    sample_sim.invalidate_forbidden_nodes(0, 1)
+    assert sample_sim.get_forbidden_nodes(0) == {5}
+    assert sample_sim.get_forbidden_nodes(1) == {4}
+    assert 5 not in sample_sim.get_nodes_edge_partners_no_enemy_home(4, 0)
+
+
+def test_simulation_matrix_relationship_store(sample_sim):
+    matrix_sim = Simulation(replace(sample_sim.params, relationship_store="matrix"))
+    assert isinstance(matrix_sim.relationships, RelationshipMatrix)
+
+    sample_sim.generate_initial_state()
+    sample_sim.run()
+    matrix_sim.generate_initial_state()
+    matrix_sim.run()
+
+    assert extract_metrics(matrix_sim) == extract_metrics(sample_sim)
+    rel = matrix_sim.relationships[(0, 1)]
+    assert matrix_sim.relationships.value[1, 0] == rel.value == -0.05
+    assert rel.stats.number_of_sign_flips == 1
+    assert rel.metrics == sample_sim.relationships[(0, 1)].metrics
+
+
+def test_simulation_numpy_movement_engine_needs_matrix_store():
+    with pytest.raises(ValueError):
+        SimulationParameters(movement_engine="numpy")
+
+
+def test_simulation_numpy_movement_engine(sample_sim):
+    params = replace(
+        sample_sim.params, relationship_store="matrix", movement_engine="numpy"
+    )
+    sim = Simulation(params)
+    sim.generate_initial_state()
+
+    for _ in range(params.iterations):
+        previous = [cat.current_node for cat in sim.cats]
+        sim.movement_step()
+        for cat, node_id in zip(sim.cats, previous):
+            if node_id is None:
+                assert not cat.is_on_the_edge()
+            elif cat.is_on_the_edge():
+                assert cat.target_node in sim.get_nodes_edge_partners(node_id)
+                assert cat.target_node not in sim.get_forbidden_nodes(cat.traits.id)
+        sim.engagement_step()
+    sim.calculate_metrics()
+
+    rerun = Simulation(params)
+    rerun.generate_initial_state()
+    rerun.run()
+    assert extract_metrics(rerun) == extract_metrics(sim)
+
+
+def test_simulation_numpy_engagement_engine(sample_sim):
+    params = replace(
+        sample_sim.params,
+        mean_aggressive=-1.0,
+        var_aggressive=0.0,
+        relationship_store="matrix",
+        engagement_engine="numpy",
+    )
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    for cat in sim.cats:
+        cat.leave(6)
+        cat.arrive()
+    for rel in sim.relationships.values():
+        rel.value = -1
+
+    sim.engagement_step()
+
+    assert sim.stats.total_number_interactions == 1
+    assert [cat.stats.sleeps for cat in sim.cats] == [1, 1, 1]
+    assert sorted(cat.stats.friendly_interaction for cat in sim.cats) == [0, 1, 1]
+    assert sum(rel.stats.interacted for rel in sim.relationships.values()) == 1
+    assert all(rel.value == -1 for rel in sim.relationships.values())
+
+
+def test_simulation_owns_its_random_streams(sample_sim):
+    twin = Simulation(sample_sim.params)
+    sample_sim.generate_initial_state()
+    twin.generate_initial_state()
+
+    random.seed(42)
+    expected = random.random()
+    random.seed(42)
+    for _ in range(sample_sim.params.iterations):
+        sample_sim.movement_step()
+        twin.movement_step()
+        sample_sim.engagement_step()
+        twin.engagement_step()
+    sample_sim.calculate_metrics()
+    twin.calculate_metrics()
+
+    assert random.random() == expected
+    assert extract_metrics(twin) == extract_metrics(sample_sim)
+
+
+def test_simulation_fast_graph_generator(sample_sim):
+    sim = Simulation(replace(sample_sim.params, graph_generator="fast"))
+    sim.generate_initial_state()
+
+    assert len(sim.nodes) == 7
+    assert len(sim.cats) == 3
+    for node in sim.nodes:
+        partners = sim.get_nodes_edge_partners(node.id)
+        assert partners
+        assert len(set(partners)) == len(partners)
+    sim.run()
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_simulation_relationship_counters(sample_sim, engine):
+    params = replace(
+        sample_sim.params,
+        iterations=200,
+        cat_amount=6,
+        node_amount=20,
+        relationship_store="matrix",
+        engagement_engine=engine,
+    )
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    sim.run()
+
+    assert sim.stats.total_number_interactions > 0
+    for cat in sim.cats:
+        friends, enemies, acquaintances = sim.get_relationship_counts(cat.traits.id)
+        assert friends == len(sim.get_friends(cat.traits.id))
+        assert enemies == len(sim.get_enemies(cat.traits.id))
+        assert acquaintances >= 0
+
+    expected = [(cat.stats.friends, cat.stats.enemies) for cat in sim.cats]
+    sim.recount_relationships()
+    assert [(cat.stats.friends, cat.stats.enemies) for cat in sim.cats] == expected
+
+
+@pytest.mark.parametrize(
+    "engines",
+    [
+        {},
+        {"relationship_store": "matrix"},
+        {
+            "relationship_store": "matrix",
+            "movement_engine": "numpy",
+            "engagement_engine": "numpy",
+        },
+    ],
+)
+def test_simulation_metrics_snapshot(sample_sim, engines):
+    params = replace(
+        sample_sim.params, iterations=100, cat_amount=8, mean_aggressive=-0.2, **engines
+    )
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    sim.run()
+    snapshot = asdict(sim.metrics_snapshot())
+    metrics = asdict(sim.metrics)
+
+    assert sim.stats.interacted_relationships > 0
+    assert snapshot.pop("mean_relationship_value") == pytest.approx(
+        metrics.pop("mean_relationship_value")
+    )
+    assert snapshot == metrics
+
+    expected = (sim.stats.interacted_relationships, sim.stats.relationship_value_sum)
+    sim.recount_metric_aggregates()
+    assert sim.stats.interacted_relationships == expected[0]
+    assert sim.stats.relationship_value_sum == pytest.approx(expected[1])
+
+
+def test_simulation_metrics_snapshot_during_run(sample_sim):
+    params = replace(sample_sim.params, iterations=100, cat_amount=8)
+    shorter = Simulation(replace(params, iterations=40))
+    shorter.generate_initial_state()
+    shorter.run()
+    snapshots = {}
+
+    def checkpoint(sim):
+        snapshots[sim.iteration] = sim.metrics_snapshot()
+
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    assert sim.metrics_snapshot().interaction_density == 0
+    sim.run(checkpoint=checkpoint, checkpoint_every=20)
+
+    assert list(snapshots) == [20, 40, 60, 80, 100]
+    assert snapshots[40].iterations_run == 40
+    assert snapshots[40].interaction_density == shorter.metrics.interaction_density
+    assert snapshots[40].friendgroups_total == shorter.metrics.friendgroups_total
+
+
+@pytest.mark.parametrize(
+    "engines",
+    [
+        {},
+        {
+            "relationship_store": "matrix",
+            "movement_engine": "numpy",
+            "engagement_engine": "numpy",
+        },
+    ],
+)
+def test_simulation_metrics_snapshot_keeps_friendgroups(sample_sim, engines):
+    params = replace(
+        sample_sim.params, iterations=200, cat_amount=8, mean_aggressive=-0.2, **engines
+    )
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    friendgroups = sim.friendgroups
+    calls = []
+    sim.friendgroups = lambda pairs: calls.append(pairs) or friendgroups(pairs)
+    snapshots = []
+
+    def checkpoint(sim):
+        snapshots.append(sim.metrics_snapshot())
+        expected = friendgroups(sim.friend_pairs())
+        assert sorted(map(sorted, sim.snapshot_friendgroups)) == sorted(
+            map(sorted, expected)
+        )
+
+    sim.run(checkpoint=checkpoint, checkpoint_every=2)
+
+    assert len(snapshots) == 100
+    # the friend groups were only rebuilt after friendships changed
+    assert 0 < len(calls) < len(snapshots)
+    assert snapshots[-1].friendgroups_total == sim.metrics.friendgroups_total
+
+
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_simulation_cat_stats_columns(sample_sim, engine):
+    params = replace(
+        sample_sim.params,
+        relationship_store="matrix",
+        movement_engine=engine,
+        engagement_engine=engine,
+    )
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    sim.run()
+
+    table = sim.stats_table()
+    assert (
+        table.iter_at_home
+        + table.iter_at_neutral
+        + table.iter_at_friendly
+        + table.iter_on_edge
+        == params.iterations
+    ).all()
+    for cat in sim.cats:
+        assert table.sleeps[cat.traits.id] == cat.stats.sleeps
+        assert table.nodes_visited[cat.traits.id] == cat.stats.nodes_visited
+        assert cat.metrics.percent_time_spent_sleeping == cat.stats.sleeps / 30
+
+
+def test_simulation_runs_all_iterations_without_convergence_window(sample_sim):
+    sample_sim.generate_initial_state()
+    sample_sim.run()
+
+    assert sample_sim.converged_at is None
+    assert sample_sim.iteration == 30
+    assert sample_sim.metrics.iterations_run == 30
+    assert sample_sim.metrics.converged is False
+
+
+def test_simulation_stops_when_converged(sample_sim):
+    params = replace(
+        sample_sim.params,
+        iterations=200,
+        cat_amount=6,
+        mean_aggressive=-0.5,
+        convergence_window=10,
+        convergence_threshold=0.01,
+    )
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    sim.run()
+
+    assert sim.converged_at is not None
+    assert sim.converged_at < params.iterations
+    assert sim.converged_at % 10 == 0
+    assert sim.iteration == sim.converged_at
+    assert sim.metrics.iterations_run == sim.converged_at
+    assert sim.metrics.converged is True
+
+    table = sim.stats_table()
+    assert (
+        table.iter_at_home
+        + table.iter_at_neutral
+        + table.iter_at_friendly
+        + table.iter_on_edge
+        == sim.converged_at
+    ).all()
+    for cat in sim.cats:
+        assert cat.metrics.percent_time_spent_home == (
+            cat.stats.iter_at_home / sim.converged_at
+        )
+
+
+def test_simulation_does_not_converge_before_cats_meet(sample_sim):
+    params = replace(
+        sample_sim.params,
+        iterations=300,
+        seed=0,
+        cat_amount=3,
+        node_amount=1000,
+        convergence_window=10,
+    )
+    sim = Simulation(params)
+    sim.generate_initial_state()
+    sim.run()
+
+    assert sim.stats.total_number_interactions == 0
+    assert sim.converged_at is None
+    assert sim.iteration == 300
+
+
+def test_simulation_check_convergence(sample_sim):
+    sample_sim.generate_initial_state()
+    # cats that have not met yet have not settled
+    assert sample_sim.check_convergence() is False
+    assert sample_sim.check_convergence() is False
+
+    sample_sim.relationships[(0, 1)].stats.interacted = True
+    sample_sim.stats.interacted_relationships = 1
+    assert sample_sim.check_convergence() is False
+    assert sample_sim.check_convergence()
+
+    sample_sim.relationships[(0, 1)].value = -0.0001
+    assert not sample_sim.check_convergence()
+    sample_sim.relationships[(0, 1)].value = -0.5
+    assert not sample_sim.check_convergence()
+    assert sample_sim.check_convergence()
+
+
+def test_simulation_convergence_parameters():
+    with pytest.raises(ValueError):
+        SimulationParameters(convergence_window=-1)
+    with pytest.raises(ValueError):
+        SimulationParameters(convergence_threshold=-0.1)
@@ -1,7 +1,16 @@
 from dataclasses import asdict
 import dataclasses
 import pytest
-from simulation.state import Cat, CatMetrics, Relationship, RelationshipMetrics
+from simulation.state import (
+    BitSet,
+    Cat,
+    CatMetrics,
+    CatStats,
+    CatStatsTable,
+    CatTraits,
+    Relationship,
+    RelationshipMetrics,
+)
 
 
 def test_cat_instantiation(sample_cat: Cat):
@@ -158,3 +167,52 @@ def test_edge_method_node_in_edge(sample_edge):
 def test_edge_method_other_node(sample_edge):
     assert sample_edge.other_node(0) == 1
     assert sample_edge.other_node(1) == 0
+
+
+def test_cat_keeps_occupancy_up_to_date():
+    occupancy = {}
+    cat = Cat(CatTraits(id=4, name="Felix", home=2, aggressive=0.1, lazy=0.4), occupancy)
+    assert occupancy == {2: {4}}
+
+    cat.leave(3)
+    assert occupancy == {}
+
+    cat.arrive()
+    assert occupancy == {3: {4}}
+
+
+def test_bitset():
+    bits = BitSet([3, 17])
+    bits.add(3)
+    bits.add(1000)
+
+    assert len(bits) == 3
+    assert 17 in bits
+    assert 4 not in bits
+    assert 5000 not in bits
+    assert list(bits) == [3, 17, 1000]
+    assert bits == {3, 17, 1000}
+    assert bits == BitSet([1000, 17, 3])
+
+
+def test_state_classes_use_slots(sample_cat: Cat, sample_rel: Relationship):
+    for obj in (sample_cat, sample_cat.stats, sample_rel, sample_rel.stats):
+        assert not hasattr(obj, "__dict__")
+
+
+def test_cat_stats_table_rows():
+    table = CatStatsTable(2)
+    cat = Cat(
+        CatTraits(id=1, name="Felix", home=2, aggressive=0.1, lazy=0.4),
+        stats=table.row(1),
+    )
+    cat.stats.fights += 2
+    table.fights[0] += 1
+
+    assert table.fights.tolist() == [1, 2]
+    assert cat.stats.fights == 2
+    assert cat.stats.nodes_visited == {2}
+    assert table.nodes_visited[1] == {2}
+
+    gathered = CatStatsTable.from_stats([CatStats(sleeps=3), CatStats(sleeps=4)])
+    assert gathered.sleeps.tolist() == [3, 4]
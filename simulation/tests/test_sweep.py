@@ -0,0 +1,115 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from simulation.ensemble import run_replica
+from simulation.simulation import SimulationParameters
+from simulation.sweep import ParameterSpace, SweepJournal, run_sweep
+
+
+@pytest.fixture
+def space(sample_sim):
+    return ParameterSpace(
+        base=sample_sim.params,
+        grid={"seed": [1, 2], "mean_aggressive": [-0.5, 0.5]},
+    )
+
+
+def test_parameter_space_grid(space):
+    points = space.expand()
+
+    assert [point.overrides for point in points] == [
+        {"seed": 1, "mean_aggressive": -0.5},
+        {"seed": 1, "mean_aggressive": 0.5},
+        {"seed": 2, "mean_aggressive": -0.5},
+        {"seed": 2, "mean_aggressive": 0.5},
+    ]
+    assert points[1].params == replace(space.base, seed=1, mean_aggressive=0.5)
+    assert len({point.key for point in points}) == 4
+
+
+def test_parameter_space_latin_hypercube():
+    space = ParameterSpace(
+        ranges={"mean_laziness": (0.0, 1.0), "cat_amount": (2, 20)},
+        method="lhs",
+        samples=5,
+    )
+    points = space.expand()
+
+    laziness = np.array([point.params.mean_laziness for point in points])
+    assert sorted((laziness * 5).astype(int)) == [0, 1, 2, 3, 4]
+    assert all(isinstance(point.params.cat_amount, int) for point in points)
+    assert [p.overrides for p in space.expand()] == [p.overrides for p in points]
+
+
+def test_parameter_space_random():
+    space = ParameterSpace(
+        grid={"seed": [0, 1]},
+        ranges={"mean_aggressive": (-1.0, 0.0)},
+        method="random",
+        samples=3,
+    )
+    points = space.expand()
+
+    assert len(points) == 6
+    assert all(-1.0 <= point.params.mean_aggressive <= 0.0 for point in points)
+
+
+def test_parameter_space_validation():
+    with pytest.raises(ValueError):
+        ParameterSpace(grid={"unknown": [1]})
+    with pytest.raises(ValueError):
+        ParameterSpace(ranges={"mean_laziness": (0.0, 1.0)})
+    with pytest.raises(ValueError):
+        ParameterSpace(method="sobol")
+
+
+def test_parameter_space_from_dict():
+    space = ParameterSpace.from_dict(
+        {
+            "base": {"iterations": 5},
+            "ranges": {"mean_laziness": [0.2, 0.4]},
+            "method": "lhs",
+            "samples": 2,
+        }
+    )
+    assert space.base == SimulationParameters(iterations=5)
+    assert space.ranges == {"mean_laziness": (0.2, 0.4)}
+
+
+def test_run_sweep(space):
+    progress = []
+    table = run_sweep(space.expand(), workers=1, on_progress=lambda *p: progress.append(p))
+
+    assert progress == [(1, 4), (2, 4), (3, 4), (4, 4)]
+    assert len(table) == 4
+    metrics = run_replica(replace(space.base, seed=2, mean_aggressive=0.5)).metrics
+    assert table[3]["seed"] == 2
+    assert table[3]["mean_aggressive"] == 0.5
+    assert table[3]["interaction_density"] == metrics.interaction_density
+
+
+def test_run_sweep_pool_matches_serial(space):
+    assert run_sweep(space.expand(), workers=2) == run_sweep(space.expand(), workers=1)
+
+
+def test_run_sweep_resumes_from_journal(space, tmp_path):
+    points = space.expand()
+    path = tmp_path / "sweep.jsonl"
+    first = run_sweep(points[:3], workers=1, journal=SweepJournal(path))
+    # an interrupted write leaves a partial line behind
+    with path.open("a") as file:
+        file.write('{"key": "trunc')
+
+    progress = []
+    table = run_sweep(
+        points,
+        workers=1,
+        journal=SweepJournal(path),
+        on_progress=lambda *p: progress.append(p),
+    )
+
+    assert progress == [(4, 4)]
+    assert table[:3] == first
+    assert len(SweepJournal(path).entries) == 4
@@ -0,0 +1,41 @@
+import numpy as np
+
+from simulation.vectorized import build_csr, choose_in_segments, expand_rows
+
+
+def test_build_csr_drops_multi_edges():
+    indptr, indices = build_csr({0: [1, 2, 1], 1: [0, 0], 2: [0]}, 4)
+
+    assert indptr.tolist() == [0, 2, 3, 4, 4]
+    assert indices.tolist() == [1, 2, 0, 0]
+
+
+def test_expand_rows():
+    indptr, indices = build_csr({0: [1, 2], 1: [0], 2: [0]}, 3)
+    owner, entries, degree = expand_rows(indptr, np.array([2, 0]))
+
+    assert owner.tolist() == [0, 1, 1]
+    assert indices[entries].tolist() == [0, 1, 2]
+    assert degree.tolist() == [1, 2]
+
+
+def test_choose_in_segments_respects_zero_weights():
+    rng = np.random.default_rng(0)
+    weights = np.array([0.0, 1.0, 0.5, 0.0])
+    owner = np.array([0, 0, 2, 2])
+    degree = np.array([2, 0, 2])
+    extra = np.array([0.0, 0.0, 0.0])
+
+    for _ in range(50):
+        choice = choose_in_segments(weights, owner, degree, extra, rng)
+        assert choice.tolist() == [1, 0, 0]
+
+
+def test_choose_in_segments_picks_extra_option():
+    rng = np.random.default_rng(0)
+    weights = np.array([0.0, 0.0])
+    owner = np.array([0, 0])
+    degree = np.array([2])
+
+    choice = choose_in_segments(weights, owner, degree, np.array([0.3]), rng)
+    assert choice.tolist() == [2]
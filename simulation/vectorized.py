@@ -0,0 +1,99 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from simulation.state import Cat
+
+
+@dataclass(frozen=True)
+class CatArrays:
+    """Per-cat traits as arrays indexed by cat id, built once per simulation."""
+
+    home: np.ndarray
+    aggressive: np.ndarray
+    lazy: np.ndarray
+    # node id -> index into the list of distinct homes, -1 for neutral nodes
+    home_index: np.ndarray
+    # one-hot (cat, home index) matrix
+    home_onehot: np.ndarray
+    # [c, h] is True when cat h's home counts against cat c, i.e. h lives
+    # somewhere else or comes before c in the list of cats sharing that home
+    home_precedes: np.ndarray
+
+    @classmethod
+    def from_cats(cls, cats: list[Cat], node_amount: int):
+        ids = np.array([cat.traits.id for cat in cats])
+        if not np.array_equal(ids, np.arange(len(cats))):
+            raise ValueError("Vectorized engines require cats ordered by id")
+
+        home = np.array([cat.traits.home for cat in cats], dtype=np.int64)
+        homes, inverse = np.unique(home, return_inverse=True)
+        home_index = np.full(node_amount, -1, dtype=np.int64)
+        home_index[homes] = np.arange(len(homes))
+        home_onehot = np.zeros((len(cats), len(homes)))
+        home_onehot[ids, inverse] = 1
+
+        return cls(
+            home=home,
+            aggressive=np.array([cat.traits.aggressive for cat in cats]),
+            lazy=np.array([cat.traits.lazy for cat in cats]),
+            home_index=home_index,
+            home_onehot=home_onehot,
+            home_precedes=(home[None, :] != home[:, None])
+            | (ids[None, :] < ids[:, None]),
+        )
+
+
+def build_csr(adjacency: dict[int, list[int]], node_amount: int):
+    """Compressed sparse row form of the adjacency lists, without multi-edges."""
+    indptr = np.zeros(node_amount + 1, dtype=np.int64)
+    neighbours = []
+    for node_id in range(node_amount):
+        partners = list(dict.fromkeys(adjacency.get(node_id, ())))
+        indptr[node_id + 1] = indptr[node_id] + len(partners)
+        neighbours.extend(partners)
+    return indptr, np.array(neighbours, dtype=np.int64)
+
+
+def expand_rows(indptr: np.ndarray, rows: np.ndarray):
+    """
+    Flatten the CSR rows `rows` into one entry list.
+
+    Returns the position in `rows` each entry belongs to, the entries' offsets
+    into the CSR index array and the number of entries per row.
+    """
+    start = indptr[rows]
+    degree = indptr[rows + 1] - start
+    owner = np.repeat(np.arange(len(rows)), degree)
+    first = np.repeat(np.cumsum(degree) - degree, degree)
+    entries = np.repeat(start, degree) + np.arange(len(owner)) - first
+    return owner, entries, degree
+
+
+def choose_in_segments(
+    weights: np.ndarray,
+    owner: np.ndarray,
+    degree: np.ndarray,
+    extra: np.ndarray,
+    rng: np.random.Generator,
+):
+    """
+    Sample one option per segment with probability proportional to its weight.
+
+    Segment `i` holds the `degree[i]` entries of `weights` owned by `i` plus an
+    extra option weighted `extra[i]`. Returns the chosen offset inside each
+    segment, where `degree[i]` stands for the extra option; segments without
+    any weight pick the extra option as well.
+    """
+    cumulative = np.cumsum(weights)
+    segment_end = np.cumsum(degree)
+    before = np.concatenate(([0.0], cumulative))[segment_end - degree]
+    local = cumulative - np.repeat(before, degree)
+
+    last = np.concatenate(([0.0], local))[segment_end]
+    segment_weight = np.where(degree > 0, last, 0.0)
+    draw = rng.random(len(degree)) * (segment_weight + extra)
+
+    return np.bincount(
+        owner, weights=local <= draw[owner], minlength=len(degree)
+    ).astype(np.int64)